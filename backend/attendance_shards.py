@@ -0,0 +1,42 @@
+"""Year shards of the attendance table: 'Asistencia_2025', 'Asistencia_2026', ...
+
+With ATTENDANCE_SHARDING=year each attendance row lives in the shard of its fecha's
+year, so reads and report scans only touch the years they need. Without sharding
+everything stays in the single 'Asistencia' table.
+"""
+import re
+from typing import Iterable, List, Optional
+
+ATTENDANCE_TABLE = 'Asistencia'
+
+_SHARD_RE = re.compile(rf'^{ATTENDANCE_TABLE}_(\d{{4}})$')
+
+def shard_for(fecha: str) -> str:
+    """Shard holding a YYYY-MM-DD fecha"""
+    year = str(fecha or '')[:4]
+    if not year.isdigit() or len(year) != 4:
+        raise ValueError(f"Invalid fecha '{fecha}'")
+    return f'{ATTENDANCE_TABLE}_{year}'
+
+def shard_year(table: str) -> Optional[int]:
+    match = _SHARD_RE.match(table)
+    return int(match.group(1)) if match else None
+
+def is_attendance_table(table: str) -> bool:
+    return table == ATTENDANCE_TABLE or shard_year(table) is not None
+
+def base_table(table: str) -> str:
+    """Logical table of a (possibly sharded) table name"""
+    return ATTENDANCE_TABLE if shard_year(table) is not None else table
+
+def shards_between(tables: Iterable[str], start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+    """Shards among `tables` whose year overlaps [start, end] (open ends allowed), oldest first"""
+    first = int(start[:4]) if start and start[:4].isdigit() else None
+    last = int(end[:4]) if end and end[:4].isdigit() else None
+    shards = []
+    for table in tables:
+        year = shard_year(table)
+        if year is None or (first is not None and year < first) or (last is not None and year > last):
+            continue
+        shards.append(table)
+    return sorted(shards, key=shard_year)
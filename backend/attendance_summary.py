@@ -0,0 +1,128 @@
+"""Per-person attendance summaries (totals, last seen, streaks) maintained from the attendance tables"""
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+def is_present(record: Dict) -> bool:
+    return str(record.get('presente', 'FALSE')).upper() == 'TRUE'
+
+def person_key(tipo: str, person_id: str) -> Tuple[str, str]:
+    """(tipo, person id): member and friend ids are separate id spaces; legacy 'visitor' rows are friends"""
+    tipo = str(tipo or '')
+    return ('friend' if tipo == 'visitor' else tipo, str(person_id))
+
+def record_key(record: Dict) -> Tuple[str, str]:
+    return person_key(record.get('tipo', ''), record.get('person_id', ''))
+
+class _TableView:
+    """Cache index that forwards incremental writes of one attendance table to the summaries"""
+    def __init__(self, summaries: 'AttendanceSummaries', table: str, records: List[Dict]):
+        self.summaries = summaries
+        self.table = table
+        summaries.load(table, records)
+
+    def add(self, record: Dict):
+        self.summaries.add(self.table, record)
+
+    def remove(self, record: Dict):
+        self.summaries.remove(self.table, record)
+
+    def memory_roots(self):
+        """Only this table's rows count towards the cache entry, not every table's summaries"""
+        return [self.summaries.rows.get(self.table, {})]
+
+class AttendanceSummaries:
+    def __init__(self):
+        # attendance table (or year shard) -> (tipo, person id) -> that person's rows, in write order
+        self.rows: Dict[str, Dict[Tuple[str, str], List[Dict]]] = {}
+        # Service dates: every fecha with at least one person present, across all tables
+        self.present_rows_by_date: Counter = Counter()
+        self.service_dates: Optional[List[str]] = None  # sorted, rebuilt lazily when dates come or go
+        self.summaries: Dict[Tuple[str, str], Dict] = {}  # (tipo, person id) -> computed summary
+
+    def load(self, table: str, records: List[Dict]):
+        """Replace a table's rows (the table was (re)read)"""
+        for person_rows in self.rows.pop(table, {}).values():
+            for record in person_rows:
+                self._count(record, -1)
+        self.rows[table] = defaultdict(list)
+        for record in records:
+            self.rows[table][record_key(record)].append(record)
+            self._count(record, 1)
+        self.summaries.clear()
+
+    def add(self, table: str, record: Dict):
+        key = record_key(record)
+        self.rows.setdefault(table, defaultdict(list))[key].append(record)
+        self._count(record, 1)
+        self.summaries.pop(key, None)
+
+    def remove(self, table: str, record: Dict):
+        key = record_key(record)
+        person_rows = self.rows.get(table, {}).get(key, [])
+        for idx, row in enumerate(person_rows):
+            if row is record:
+                del person_rows[idx]
+                self._count(record, -1)
+                break
+        self.summaries.pop(key, None)
+
+    def _count(self, record: Dict, delta: int):
+        if not is_present(record):
+            return
+        fecha = record.get('fecha', '')
+        self.present_rows_by_date[fecha] += delta
+        count = self.present_rows_by_date[fecha]
+        if (delta > 0 and count == 1) or count <= 0:
+            # A service date appeared or disappeared: every streak may have changed
+            if count <= 0:
+                del self.present_rows_by_date[fecha]
+            self.service_dates = None
+            self.summaries.clear()
+
+    def records_for(self, tipo: str, person_id: str, tables: Optional[Iterable[str]] = None) -> List[Dict]:
+        """A member's or friend's attendance rows in the given tables (all loaded tables by default)"""
+        key = person_key(tipo, person_id)
+        tables = self.rows.keys() if tables is None else tables
+        return [record for table in tables for record in self.rows.get(table, {}).get(key, ())]
+
+    def summary(self, tipo: str, person_id: str) -> Dict:
+        """Totals, last date present and streaks (consecutive service dates present) for a member or friend"""
+        key = person_key(tipo, person_id)
+        person_id = key[1]
+        cached = self.summaries.get(key)
+        if cached is not None:
+            return cached
+        if self.service_dates is None:
+            self.service_dates = sorted(fecha for fecha in self.present_rows_by_date if fecha)
+
+        records = self.records_for(tipo, person_id)
+        present_dates = sorted({record.get('fecha', '') for record in records if is_present(record)} - {''})
+        present = sum(1 for record in records if is_present(record))
+        positions = [bisect_left(self.service_dates, fecha) for fecha in present_dates]
+        longest = current = run = 0
+        for idx, position in enumerate(positions):
+            run = run + 1 if idx and position == positions[idx - 1] + 1 else 1
+            longest = max(longest, run)
+        if positions and positions[-1] == len(self.service_dates) - 1:
+            current = run
+        summary = {
+            'person_id': person_id,
+            'total': len(records),
+            'present': present,
+            'absent': len(records) - present,
+            'attendance_rate': round((present / len(records) * 100) if records else 0, 2),
+            'last_seen': present_dates[-1] if present_dates else None,
+            'current_streak': current,
+            'longest_streak': longest
+        }
+        self.summaries[key] = summary
+        return summary
+
+    # Cache index builder
+    def track(self, table: str, records: List[Dict]) -> _TableView:
+        """Builder for Asistencia (or one of its year shards)"""
+        return _TableView(self, table, records)
+
+# Global summaries instance
+attendance_summaries = AttendanceSummaries()
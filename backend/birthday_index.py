@@ -0,0 +1,95 @@
+"""Sorted month-day index over Miembros birthdays for fast range queries"""
+from bisect import bisect_left, bisect_right
+from calendar import isleap
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+# Sorts after every "MM-DD" key
+_MAX_KEY = '\uffff'
+
+class BirthdayIndex:
+    def __init__(self, members: List[Dict]):
+        """Build the index from Miembros records, skipping rows without a valid fecha_nacimiento"""
+        entries = []
+        for member in members:
+            month_day = self.month_day(member.get('fecha_nacimiento', ''))
+            if not member.get('id') or month_day is None:
+                continue
+            entries.append((month_day, {
+                'id': member.get('id'),
+                'nombre': member.get('nombre', ''),
+                'apellido': member.get('apellido', ''),
+                'fecha_nacimiento': str(member.get('fecha_nacimiento', '')),
+                'telefono': member.get('telefono', ''),
+                'direccion': member.get('direccion', '')
+            }))
+        # Stable sort keeps sheet order for members sharing a birthday
+        entries.sort(key=lambda entry: entry[0])
+        self.keys = [month_day for month_day, _ in entries]
+        self.members = [member for _, member in entries]
+
+    @staticmethod
+    def month_day(fecha: str) -> Optional[str]:
+        """Return the 'MM-DD' part of a YYYY-MM-DD string, or None if it is not a date"""
+        parts = str(fecha or '').split('-')
+        if len(parts) != 3:
+            return None
+        try:
+            _, month, day = (int(part) for part in parts)
+            date(2000, month, day)  # a leap year, so Feb 29 is valid
+        except ValueError:
+            return None
+        return f"{month:02d}-{day:02d}"
+
+    def _slice(self, start_month_day: str, end_month_day: str) -> List[Dict]:
+        lo = bisect_left(self.keys, start_month_day)
+        hi = bisect_right(self.keys, end_month_day)
+        return self.members[lo:hi]
+
+    def between(self, start_month_day: str, end_month_day: str) -> List[Dict]:
+        """Members with birthdays in [start, end] sorted by month-day; handles year-wrap ranges"""
+        if start_month_day <= end_month_day:
+            return self._slice(start_month_day, end_month_day)
+        # Cross-year case: e.g., Dec 25 to Jan 5
+        return self._slice('', end_month_day) + self._slice(start_month_day, _MAX_KEY)
+
+    def upcoming(self, today: date, days: int) -> List[Dict]:
+        """Members with birthdays in the next `days` days, in chronological order.
+        
+        Outside leap years, Feb 29 birthdays are counted on Mar 1.
+        """
+        start = today.strftime('%m-%d')
+        if start == '03-01' and not isleap(today.year):
+            start = '02-29'
+        if days >= 365:
+            # The whole year, starting from today
+            split = bisect_left(self.keys, start)
+            matches = self.members[split:] + self.members[:split]
+        else:
+            end = (today + timedelta(days=days)).strftime('%m-%d')
+            if start <= end:
+                matches = self._slice(start, end)
+            else:
+                matches = self._slice(start, _MAX_KEY) + self._slice('', end)
+
+        result = []
+        for member in matches:
+            month, day = (int(part) for part in self.month_day(member['fecha_nacimiento']).split('-'))
+            days_until = self._days_until(today, month, day)
+            # Feb 29 sorts before Mar 1, which may be just past the window
+            if days_until <= days:
+                result.append({**member, 'dias_faltantes': days_until})
+        return result
+
+    @staticmethod
+    def _days_until(today: date, month: int, day: int) -> int:
+        for year in (today.year, today.year + 1):
+            if (month, day) == (2, 29) and not isleap(year):
+                birthday = date(year, 3, 1)
+            else:
+                birthday = date(year, month, day)
+            if birthday >= today:
+                return (birthday - today).days
+
+    def __len__(self) -> int:
+        return len(self.keys)
@@ -0,0 +1,34 @@
+"""Cheap "has the spreadsheet changed?" checks used to revalidate cached sheets"""
+import threading
+from typing import Optional
+
+class ChangeProbe:
+    """Returns an opaque token that changes whenever the underlying data may have changed"""
+
+    def token(self) -> Optional[str]:
+        raise NotImplementedError
+
+class SheetsChangeProbe(ChangeProbe):
+    """Drive file version of the spreadsheet: one small metadata request, no cell data"""
+
+    def __init__(self, service):
+        self.service = service
+
+    def token(self) -> Optional[str]:
+        return self.service.change_token()
+
+class LocalChangeProbe(ChangeProbe):
+    """In-process stand-in for tests and local runs: call bump() to simulate an outside edit"""
+
+    def __init__(self):
+        self.version = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def bump(self):
+        with self.lock:
+            self.version += 1
+
+    def token(self) -> Optional[str]:
+        self.calls += 1
+        return str(self.version)
@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
 """Initialize Google Sheets with headers"""
-from sheets_service import sheets_service
+from sheets_service import sheets_service, TOMBSTONE_COLUMN
+
+def ensure_tombstone_column(ws, sheet_name, headers):
+    """Add the soft-delete column header to sheets created before it existed"""
+    if TOMBSTONE_COLUMN not in headers:
+        col = sheets_service.expected_headers[sheet_name].index(TOMBSTONE_COLUMN) + 1
+        ws.update_cell(1, col, TOMBSTONE_COLUMN)
+        print(f"✅ {sheet_name} sheet: added '{TOMBSTONE_COLUMN}' column")
 
 def init_sheets():
     try:
@@ -10,10 +17,11 @@ def init_sheets():
             headers = ws.row_values(1)
             if not headers or headers[0] != 'id':
                 ws.clear()
-                ws.append_row(['id', 'nombre', 'apellido', 'direccion', 'telefono', 'fecha_registro'])
+                ws.append_row(sheets_service.expected_headers['Miembros'])
                 print("✅ Miembros sheet initialized with headers")
             else:
                 print("✅ Miembros sheet already has headers")
+                ensure_tombstone_column(ws, 'Miembros', headers)
         except Exception as e:
             print(f"❌ Error initializing Miembros: {e}")
         
@@ -23,10 +31,11 @@ def init_sheets():
             headers = ws.row_values(1)
             if not headers or headers[0] != 'id':
                 ws.clear()
-                ws.append_row(['id', 'nombre', 'de_donde_viene', 'fecha_registro'])
+                ws.append_row(sheets_service.expected_headers['Amigos'])
                 print("✅ Amigos sheet initialized with headers")
             else:
                 print("✅ Amigos sheet already has headers")
+                ensure_tombstone_column(ws, 'Amigos', headers)
         except Exception as e:
             print(f"❌ Error initializing Amigos: {e}")
         
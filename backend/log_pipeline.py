@@ -0,0 +1,106 @@
+"""Queue-based, sampled, structured logging.
+
+Log calls on the request path only build a record and put it on a queue; a
+QueueListener thread formats and writes it. Records are JSON lines (or the classic
+text format), carry the route they were emitted from, and INFO/DEBUG records of
+noisy routes can be sampled. Warnings and errors are never sampled.
+"""
+import contextvars
+import json
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# Route (path template) of the request being handled, set by the route class once routing matched
+current_route: contextvars.ContextVar = contextvars.ContextVar('current_route', default='')
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """'/api/attendance/today=0.05,/api/members/{member_id}=1' -> {route template prefix: rate}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        route, _, rate = item.rpartition('=')
+        rates[route.strip()] = float(rate)
+    return rates
+
+class RouteSamplingFilter(logging.Filter):
+    def __init__(self, sample_rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        # Longest prefix wins, so '/api/members' covers '/api/members/{id}' unless overridden
+        self.sample_rates = sorted((sample_rates or {}).items(), key=lambda item: -len(item[0]))
+        self.rate_by_route: Dict[str, float] = {}
+
+    def rate_for(self, route: str) -> float:
+        rate = self.rate_by_route.get(route)
+        if rate is None:
+            rate = next((r for prefix, r in self.sample_rates if route.startswith(prefix)), 1.0)
+            if len(self.rate_by_route) < 1024:
+                self.rate_by_route[route] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.route = current_route.get()
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.route)
+        return rate >= 1.0 or random.random() < rate
+
+class StructuredQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        # Never block a request on a backed-up writer: drop and count instead
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only render the message here; formatting happens on the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'route', ''):
+            entry['route'] = record.route
+        # Structured fields passed as logger.info(..., extra={'fields': {...}})
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+def setup_logging(level: str = 'INFO', sample_rates: Optional[Dict[str, float]] = None,
+                  json_output: bool = True, target: Optional[logging.Handler] = None,
+                  max_queue: int = 10000) -> QueueListener:
+    """Route the root logger through a queue; returns the started listener (stop it on shutdown)"""
+    target = target or logging.StreamHandler()
+    target.setFormatter(JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT))
+    log_queue: queue.Queue = queue.Queue(max_queue)
+    handler = StructuredQueueHandler(log_queue)
+    handler.addFilter(RouteSamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    listener = QueueListener(log_queue, target, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,76 @@
+"""Bulk import of members and friends: parsing, validation and deduplication of uploaded rows"""
+import csv
+import io
+import json
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from people_search import normalize_phone, normalize_text
+
+# Columns accepted per person type; the first ones are required (non-empty)
+IMPORT_COLUMNS = {
+    'member': (('nombre', 'apellido'), ('direccion', 'telefono', 'fecha_nacimiento')),
+    'friend': (('nombre',), ('de_donde_viene',)),
+}
+
+def parse_upload(body: bytes, content_type: str) -> List[Dict]:
+    """Rows of a CSV file (header row first) or of a JSON array of objects"""
+    text = body.decode('utf-8-sig')
+    if 'json' in content_type or text.lstrip().startswith('['):
+        rows = json.loads(text)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("JSON body must be an array of objects")
+        return rows
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise ValueError("CSV body must start with a header row")
+    # Extra cells beyond the header end up under None
+    return [{(key or '').strip(): value for key, value in row.items() if key} for row in reader]
+
+def ignored_columns(tipo: str, rows: Iterable[Dict]) -> List[str]:
+    """Uploaded columns the import does not use (usually a misspelled header)"""
+    required, optional = IMPORT_COLUMNS[tipo]
+    return sorted({column for row in rows for column in row} - set(required + optional))
+
+def person_key(tipo: str, record: Dict) -> Tuple:
+    """Dedup key: accent/case-insensitive name, plus phone digits (members) or origin (friends)"""
+    if tipo == 'member':
+        return (normalize_text(record.get('nombre')), normalize_text(record.get('apellido')),
+                normalize_phone(record.get('telefono')))
+    return (normalize_text(record.get('nombre')), normalize_text(record.get('de_donde_viene')))
+
+def validate(tipo: str, row: Dict) -> Tuple[Optional[Dict], List[str]]:
+    """(cleaned record, errors): known columns only, stripped, with the required ones present"""
+    required, optional = IMPORT_COLUMNS[tipo]
+    record = {column: str(row.get(column) or '').strip() for column in required + optional}
+    errors = [f"{column} is required" for column in required if not record[column]]
+    if record.get('fecha_nacimiento'):
+        try:
+            date.fromisoformat(record['fecha_nacimiento'])
+        except ValueError:
+            errors.append("fecha_nacimiento must be YYYY-MM-DD")
+    return (None if errors else record), errors
+
+def plan_import(tipo: str, rows: Iterable[Dict], existing: List[Dict],
+                new_record: Callable[[Dict], Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """Validate and deduplicate uploaded rows against the existing records and each other.
+
+    Returns (records to create, built by new_record from each cleaned row; per-row results in
+    upload order, row numbers counting from 1, status 'new', 'duplicate' or 'invalid').
+    """
+    seen = {person_key(tipo, record): record.get('id') for record in existing}
+    to_create, results = [], []
+    for number, row in enumerate(rows, start=1):
+        record, errors = validate(tipo, row)
+        if errors:
+            results.append({'row': number, 'status': 'invalid', 'errors': errors})
+            continue
+        key = person_key(tipo, record)
+        if key in seen:
+            results.append({'row': number, 'status': 'duplicate', 'id': seen[key]})
+            continue
+        created = new_record(record)
+        seen[key] = created['id']
+        to_create.append(created)
+        results.append({'row': number, 'status': 'new', 'id': created['id']})
+    return to_create, results
@@ -0,0 +1,108 @@
+"""Deleting and merging members or friends: planned against freshly read rows, written in storage batches"""
+import asyncio
+from typing import Dict, List, Tuple
+
+class PersonNotFound(LookupError):
+    pass
+
+class InvalidMerge(ValueError):
+    pass
+
+def display_name(tipo: str, person: Dict) -> str:
+    if tipo == 'member':
+        return f"{person.get('nombre', '')} {person.get('apellido', '')}".strip()
+    return person.get('nombre', '')
+
+def merge_targets(people: Dict[str, Dict], groups: List[Tuple[str, List[str]]]) -> Dict[str, str]:
+    """merged id -> kept id for (keep, merge) groups; PersonNotFound or InvalidMerge if a group is unusable"""
+    keeps = {keep for keep, _ in groups}
+    target_of = {}
+    for keep, merged in groups:
+        if keep not in people:
+            raise PersonNotFound(f"Person {keep} not found")
+        for merged_id in merged:
+            if merged_id not in people:
+                raise PersonNotFound(f"Person {merged_id} not found")
+            if merged_id in keeps or merged_id in target_of:
+                raise InvalidMerge(f"Person {merged_id} appears in more than one place")
+            target_of[merged_id] = keep
+    return target_of
+
+def plan_merge(tipo: str, people: Dict[str, Dict], target_of: Dict[str, str],
+               records: List[Dict]) -> Tuple[List[Tuple[Dict, Dict]], List[Dict], int]:
+    """(updates, deletes, reassigned) folding the attendance of merged ids into the kept ones.
+
+    Each merged row is reassigned to the kept id unless the kept person already has a row that
+    date; then it is deleted, and the remaining row is marked present if either was.
+    """
+    keeps = set(target_of.values())
+    # (kept id, fecha) -> row that stays; pending: id(row) -> (row, new values)
+    survivors, pending, deletes = {}, {}, []
+    for r in records:
+        if str(r.get('person_id', '')) in keeps:
+            survivors.setdefault((str(r['person_id']), r.get('fecha', '')), r)
+    reassigned = 0
+    for r in records:
+        keep = target_of.get(str(r.get('person_id', '')))
+        if keep is None:
+            continue
+        key = (keep, r.get('fecha', ''))
+        survivor = survivors.get(key)
+        if survivor is None:
+            values = {k: v for k, v in r.items() if not k.startswith('_')}
+            pending[id(r)] = (r, {**values, 'person_id': keep, 'person_name': display_name(tipo, people[keep])})
+            survivors[key] = r
+            reassigned += 1
+            continue
+        deletes.append(r)
+        if str(r.get('presente', '')).upper() == 'TRUE':
+            current, values = pending.get(id(survivor), (survivor, {k: v for k, v in survivor.items() if not k.startswith('_')}))
+            pending[id(survivor)] = (current, {**values, 'presente': 'TRUE'})
+    return list(pending.values()), deletes, reassigned
+
+async def write_batch(storage, cache, table: str, updates: List[Tuple[Dict, Dict]], deletes: List[Dict], deleted_at: str):
+    """One batch update, then one batch delete, then one cache update"""
+    if not updates and not deletes:
+        return
+    # Updates first: they address rows by position, which the deletes may shift
+    stored = await asyncio.to_thread(storage.update_many, table, updates)
+    if deletes and await asyncio.to_thread(storage.delete_many, table, deletes, deleted_at):
+        # Later rows moved up: cached row numbers are stale
+        cache.invalidate(table)
+    else:
+        cache.apply_batch(table, stored, [r.get('id') for r in deletes])
+
+async def read_fresh(storage, cache, tables: List[str]) -> Dict[str, List[Dict]]:
+    """Current rows of the tables (one request where the backend allows), also put in the cache.
+
+    Batch writes address rows by the '_row' they were read with, so they are planned on these
+    rather than on cached rows a compaction or another worker may have moved.
+    """
+    data = await asyncio.to_thread(storage.read_many, tables)
+    return {table: cache.set(table, data[table]) for table in tables}
+
+async def delete_by_ids(storage, cache, table: str, ids: List[str], deleted_at: str) -> Tuple[List[str], List[str]]:
+    """(deleted ids, ids not found) after deleting the people with one batch write"""
+    ids = list(dict.fromkeys(ids))
+    by_id = {str(record.get('id', '')): record for record in (await read_fresh(storage, cache, [table]))[table]}
+    found = [by_id[person_id] for person_id in ids if person_id in by_id]
+    await write_batch(storage, cache, table, [], found, deleted_at)
+    return [record['id'] for record in found], [person_id for person_id in ids if person_id not in by_id]
+
+async def merge_duplicates(storage, cache, tipo: str, table: str, attendance_tables: List[str],
+                           groups: List[Tuple[str, List[str]]], deleted_at: str) -> Dict[str, int]:
+    """Fold each group's merged people into the kept one: attendance first, then the people are deleted.
+
+    Returns the counts of merged people, reassigned rows and removed duplicate rows.
+    """
+    data = await read_fresh(storage, cache, [table, *attendance_tables])
+    people = {str(record.get('id', '')): record for record in data[table]}
+    target_of = merge_targets(people, groups)
+    reassigned = duplicates = 0
+    for attendance_table in attendance_tables:
+        updates, deletes, moved = plan_merge(tipo, people, target_of, data[attendance_table])
+        await write_batch(storage, cache, attendance_table, updates, deletes, deleted_at)
+        reassigned += moved
+        duplicates += len(deletes)
+    await write_batch(storage, cache, table, [], [people[merged_id] for merged_id in target_of], deleted_at)
+    return {'merged': len(target_of), 'reassigned': reassigned, 'duplicates': duplicates}
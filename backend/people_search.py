@@ -0,0 +1,170 @@
+"""In-memory people search index (accent-insensitive prefix, trigram and phone matching)"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+MIN_TRIGRAM_SIMILARITY = 0.4
+MIN_PHONE_DIGITS = 3
+
+def normalize_text(text) -> str:
+    """Lowercase and strip accents: 'José Peña' -> 'jose pena'"""
+    decomposed = unicodedata.normalize('NFKD', str(text or ''))
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^\w\s]', ' ', stripped.lower()).split())
+
+def normalize_phone(phone) -> str:
+    """Keep only digits, dropping the US country code: '+1 (203) 555-0101' -> '2035550101'"""
+    digits = re.sub(r'\D', '', str(phone or ''))
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of each word, padded so short words and word starts still match"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class PeopleSearchIndex:
+    def __init__(self, tipo: str, records: Optional[List[Dict]] = None):
+        """Index the records of one sheet; tipo is 'member' or 'friend'"""
+        self.tipo = tipo
+        self.people: Dict[str, Dict] = {}
+        self.tokens: List[Tuple[str, str]] = []  # sorted (token, id) pairs for prefix search
+        self.name_trigrams: Dict[str, Set[str]] = defaultdict(set)
+        self.phone_trigrams: Dict[str, Set[str]] = defaultdict(set)
+        self._entries: Dict[str, Dict] = {}
+        pairs = []
+        for record in records or []:
+            if str(record.get('id', '') or '') in self._entries:
+                continue  # Keep the first row, like find_row_by_id
+            entry = self._index_entry(record)
+            if entry is None:
+                continue
+            pairs.extend((token, entry['id']) for token in entry['tokens'])
+        # Bulk build: one sort instead of an insort per token
+        pairs.sort()
+        self.tokens = pairs
+
+    def _index_entry(self, record: Dict) -> Optional[Dict]:
+        person_id = str(record.get('id', '') or '')
+        if not person_id:
+            return None
+        name = f"{record.get('nombre', '')} {record.get('apellido', '')}"
+        normalized = normalize_text(name)
+        phone = normalize_phone(record.get('telefono', ''))
+        entry = {
+            'id': person_id,
+            'tokens': sorted(set(normalized.split())),
+            'name_trigrams': trigrams(normalized),
+            'phone_trigrams': {phone[i:i + 3] for i in range(len(phone) - 2)},
+            'phone': phone
+        }
+        person = {'id': person_id, 'tipo': self.tipo, 'nombre': record.get('nombre', '')}
+        if self.tipo == 'member':
+            person['apellido'] = record.get('apellido', '')
+            person['telefono'] = str(record.get('telefono', ''))
+        else:
+            person['de_donde_viene'] = record.get('de_donde_viene', '')
+        self.people[person_id] = person
+        self._entries[person_id] = entry
+        for gram in entry['name_trigrams']:
+            self.name_trigrams[gram].add(person_id)
+        for gram in entry['phone_trigrams']:
+            self.phone_trigrams[gram].add(person_id)
+        return entry
+
+    def add(self, record: Dict):
+        """Index a new or changed record"""
+        self.remove(record)
+        entry = self._index_entry(record)
+        if entry is not None:
+            for token in entry['tokens']:
+                insort(self.tokens, (token, entry['id']))
+
+    def remove(self, record: Dict):
+        """Drop a record from the index (no-op if it is not indexed)"""
+        person_id = str(record.get('id', '') or '')
+        entry = self._entries.pop(person_id, None)
+        if entry is None:
+            return
+        del self.people[person_id]
+        for token in entry['tokens']:
+            pos = bisect_left(self.tokens, (token, person_id))
+            if pos < len(self.tokens) and self.tokens[pos] == (token, person_id):
+                del self.tokens[pos]
+        for gram in entry['name_trigrams']:
+            self.name_trigrams[gram].discard(person_id)
+        for gram in entry['phone_trigrams']:
+            self.phone_trigrams[gram].discard(person_id)
+
+    def _prefix_matches(self, prefix: str) -> Set[str]:
+        matches = set()
+        pos = bisect_left(self.tokens, (prefix, ''))
+        while pos < len(self.tokens) and self.tokens[pos][0].startswith(prefix):
+            matches.add(self.tokens[pos][1])
+            pos += 1
+        return matches
+
+    def scores(self, query: str, limit: int = 10) -> Dict[str, float]:
+        """Score matching people: prefix matches rank first, fuzzy matches fill in when there are fewer than `limit`"""
+        scores: Dict[str, float] = defaultdict(float)
+        normalized = normalize_text(query)
+        words = normalized.split()
+
+        if words:
+            # Every query word must start some word of the name
+            prefix_ids = None
+            for word in words:
+                matches = self._prefix_matches(word)
+                prefix_ids = matches if prefix_ids is None else prefix_ids & matches
+                if not prefix_ids:
+                    break
+            for person_id in prefix_ids or ():
+                scores[person_id] += 2.0 + sum(0.5 for word in words if word in self._entries[person_id]['tokens'])
+
+        if words and len(scores) < limit:
+            # Fuzzy: share of the query trigrams found in the name
+            query_grams = trigrams(normalized)
+            counts: Dict[str, int] = defaultdict(int)
+            for gram in query_grams:
+                for person_id in self.name_trigrams.get(gram, ()):
+                    counts[person_id] += 1
+            for person_id, count in counts.items():
+                similarity = count / len(query_grams)
+                if similarity >= MIN_TRIGRAM_SIMILARITY:
+                    scores[person_id] += similarity
+
+        digits = normalize_phone(query)
+        if len(digits) >= MIN_PHONE_DIGITS:
+            candidates = None
+            for i in range(len(digits) - 2):
+                ids = self.phone_trigrams.get(digits[i:i + 3], set())
+                candidates = set(ids) if candidates is None else candidates & ids
+                if not candidates:
+                    break
+            for person_id in candidates or ():
+                if digits in self._entries[person_id]['phone']:
+                    scores[person_id] += 3.0
+        return scores
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Top `limit` matches for a query, best first"""
+        return top_matches([self], query, limit)
+
+    def __len__(self) -> int:
+        return len(self.people)
+
+def top_matches(indexes: List[PeopleSearchIndex], query: str, limit: int = 10) -> List[Dict]:
+    """Merge the scores of several indexes (e.g. Miembros and Amigos) and keep the best `limit`"""
+    scored = []
+    for index in indexes:
+        for person_id, score in index.scores(query, limit).items():
+            scored.append((score, index, person_id))
+    best = heapq.nlargest(limit, scored, key=lambda item: (item[0], -len(item[1].people[item[2]]['nombre'])))
+    return [{**index.people[person_id], 'score': round(score, 3)} for score, index, person_id in best]
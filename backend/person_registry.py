@@ -0,0 +1,101 @@
+"""Live registry of existing people (members and friends) and attendance-row validity flags"""
+from collections import defaultdict
+from typing import Dict, List, Set
+
+class AttendanceValidity:
+    def __init__(self, registry: 'PersonRegistry', records: List[Dict]):
+        """Flag the people with Asistencia records as existing (valid rows) or deleted (orphaned rows)"""
+        self.registry = registry
+        self.valid: Dict[str, bool] = {}  # person_id -> whether their rows are valid
+        self.rows_by_person: Dict[str, int] = defaultdict(int)
+        for record in records:
+            self.add(record)
+
+    def is_valid(self, record: Dict) -> bool:
+        return self.valid.get(str(record.get('person_id', '')), False)
+
+    def add(self, record: Dict):
+        """Count a new attendance row; only a person's first row asks the registry"""
+        person_id = str(record.get('person_id', ''))
+        if person_id not in self.valid:
+            self.valid[person_id] = self.registry.is_valid(person_id)
+        self.rows_by_person[person_id] += 1
+
+    def remove(self, record: Dict):
+        person_id = str(record.get('person_id', ''))
+        self.rows_by_person[person_id] -= 1
+        if self.rows_by_person[person_id] <= 0:
+            del self.rows_by_person[person_id]
+            self.valid.pop(person_id, None)
+
+    def mark(self, person_id: str, valid: bool):
+        """Flip the flag of every attendance row belonging to a person"""
+        if person_id in self.valid:
+            self.valid[person_id] = valid
+
+    def memory_roots(self):
+        """The flags only, not the registry they are checked against"""
+        return [self.valid, self.rows_by_person]
+
+class _SheetView:
+    """Cache index that forwards incremental writes of one sheet to the registry"""
+    def __init__(self, registry: 'PersonRegistry', sheet_name: str, records: List[Dict]):
+        self.registry = registry
+        self.sheet_name = sheet_name
+        registry.load(sheet_name, records)
+
+    def add(self, record: Dict):
+        self.registry.add(self.sheet_name, str(record.get('id', '')))
+
+    def remove(self, record: Dict):
+        self.registry.remove(self.sheet_name, str(record.get('id', '')))
+
+    def memory_roots(self):
+        """Only this sheet's ids count towards the cache entry, not the whole registry"""
+        return [self.registry.person_ids.get(self.sheet_name, set())]
+
+class PersonRegistry:
+    def __init__(self):
+        self.person_ids: Dict[str, Set[str]] = {}  # sheet name -> ids
+        self.attendance: Dict[str, AttendanceValidity] = {}  # attendance table (or year shard) -> flags
+
+    def is_loaded(self, sheet_name: str) -> bool:
+        return sheet_name in self.person_ids
+
+    def is_valid(self, person_id: str) -> bool:
+        return any(person_id in ids for ids in self.person_ids.values())
+
+    def load(self, sheet_name: str, records: List[Dict]):
+        """Replace a sheet's ids, flipping attendance flags only for people that changed"""
+        old_ids = self.person_ids.get(sheet_name, set())
+        new_ids = {str(r['id']) for r in records if r.get('id')}
+        self.person_ids[sheet_name] = new_ids
+        for person_id in old_ids ^ new_ids:
+            self.mark(person_id, self.is_valid(person_id))
+
+    def add(self, sheet_name: str, person_id: str):
+        if not person_id:
+            return
+        self.person_ids.setdefault(sheet_name, set()).add(person_id)
+        self.mark(person_id, True)
+
+    def remove(self, sheet_name: str, person_id: str):
+        self.person_ids.get(sheet_name, set()).discard(person_id)
+        self.mark(person_id, self.is_valid(person_id))
+
+    def mark(self, person_id: str, valid: bool):
+        for validity in self.attendance.values():
+            validity.mark(person_id, valid)
+
+    # Cache index builders
+    def track(self, sheet_name: str, records: List[Dict]) -> _SheetView:
+        """Builder for a people sheet (Miembros, Amigos)"""
+        return _SheetView(self, sheet_name, records)
+
+    def attendance_validity(self, table: str, records: List[Dict]) -> AttendanceValidity:
+        """Builder for Asistencia (or one of its year shards)"""
+        self.attendance[table] = AttendanceValidity(self, records)
+        return self.attendance[table]
+
+# Global registry instance
+person_registry = PersonRegistry()
@@ -0,0 +1,46 @@
+"""Bounded LRU memo of report results, keyed by endpoint, parameters and sheet data versions"""
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+class ReportCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        # Keys carry the data versions the result was computed from, so writes never need to
+        # invalidate anything: results for older versions just stop being asked for and age out
+        self.entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Memoized result for key, or None"""
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key: Hashable, result: Any) -> Any:
+        """Memoize a result and return it"""
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,115 @@
+"""Opt-in profiling of single requests: span timings and, on demand, a cProfile dump.
+
+Spans are only recorded while a RequestProfile is active for the current request
+(a context variable), so instrumented calls cost one lookup when nobody is profiling.
+"""
+import cProfile
+import functools
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional
+
+current_profile: ContextVar[Optional['RequestProfile']] = ContextVar('current_profile', default=None)
+
+# cProfile can only profile one request at a time
+_cprofile_lock = threading.Lock()
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = defaultdict(float)  # name -> seconds
+        self.counts = defaultdict(int)  # name -> calls
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] += seconds
+        self.counts[name] += 1
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: one metric per span plus the request total (ms)"""
+        metrics = [
+            f'{re.sub(r"[^A-Za-z0-9_.-]", "_", name)};desc="{self.counts[name]} calls";dur={seconds * 1000:.2f}'
+            for name, seconds in sorted(self.spans.items(), key=lambda item: -item[1])
+        ]
+        metrics.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.2f}')
+        return ', '.join(metrics)
+
+@contextmanager
+def span(name: str):
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+def timed(name: str, func: Callable) -> Callable:
+    """Wrap a sync function so its calls are recorded as a span"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.add(name, time.perf_counter() - start)
+    return wrapper
+
+def timed_async(name: str, func: Callable) -> Callable:
+    """Wrap a coroutine function so its calls are recorded as a span"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return await func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            profile.add(name, time.perf_counter() - start)
+    return wrapper
+
+def instrument(obj, methods: Iterable[str], prefix: str):
+    """Record calls to obj's methods as '<prefix>.<method>' spans"""
+    for method in methods:
+        setattr(obj, method, timed(f'{prefix}.{method}', getattr(obj, method)))
+
+def instrument_fastapi():
+    """Spans for response validation/encoding ('serialize') and JSON rendering ('render')"""
+    import fastapi.routing
+    from fastapi.responses import JSONResponse
+    fastapi.routing.serialize_response = timed_async('serialize', fastapi.routing.serialize_response)
+    JSONResponse.render = timed('render', JSONResponse.render)
+
+async def profile_call(call_next, request, mode: str, output_dir: str):
+    """Run one request under a RequestProfile; mode 'cprofile' also dumps a .prof file"""
+    profile = RequestProfile()
+    token = current_profile.set(profile)
+    profiler = None
+    if mode == 'cprofile' and _cprofile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        response = await call_next(request)
+    finally:
+        current_profile.reset(token)
+        if profiler is not None:
+            profiler.disable()
+            _cprofile_lock.release()
+    if profiler is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', request.url.path).strip('_')
+        path = os.path.join(output_dir, f'{time.strftime("%Y%m%d-%H%M%S")}-{slug}.prof')
+        profiler.dump_stats(path)
+        response.headers['X-Profile-File'] = path
+    response.headers['Server-Timing'] = profile.server_timing()
+    return response
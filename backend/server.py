@@ -1,29 +1,85 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, status
+from fastapi.routing import APIRoute
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
+import time
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
+import csv
 import uuid
 from datetime import datetime, timezone, timedelta
+from functools import partial
 import jwt
 from jwt.exceptions import InvalidTokenError
 from passlib.context import CryptContext
-from sheets_service import sheets_service
+from storage import create_storage
+from sheets_mirror import SheetsMirror
 from sheets_cache import sheets_cache
+from shared_cache import SharedCacheStore
+from change_probe import SheetsChangeProbe
+from birthday_index import BirthdayIndex
+from people_search import PeopleSearchIndex, top_matches
+from people_import import ignored_columns, parse_upload, plan_import
+from people_merge import InvalidMerge, PersonNotFound, delete_by_ids, merge_duplicates
+from person_registry import person_registry
+from attendance_summary import attendance_summaries
+from attendance_shards import ATTENDANCE_TABLE, shard_for, shard_year, shards_between
+from concurrent.futures import ThreadPoolExecutor
+from token_cache import TokenCache
+from report_cache import ReportCache
+from log_pipeline import current_route, parse_sample_rates, setup_logging
+from request_profiler import instrument, instrument_fastapi, profile_call
+from user_store import UserStore, UsernameTaken
+from warmup_schedule import WarmupSchedule, parse_windows
 import pytz
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Storage backend for members, friends and attendance: 'sheets' (default), 'mongo' or 'sqlite'
+storage = create_storage(os.environ.get('STORAGE_BACKEND', 'sheets'))
+
+# With SQLite as the primary store, Google Sheets becomes a mirror updated in the background.
+# Every worker runs it; a lease in the SQLite file lets one process at a time replicate and compact.
+SHEETS_MIRROR_INTERVAL_SECONDS = float(os.environ.get('SHEETS_MIRROR_INTERVAL_SECONDS', '5'))
+sheets_mirror = SheetsMirror(storage.path, create_storage('sheets')) if storage.name == 'sqlite' else None
+
+# Sheets cache: with SHEETS_CACHE_PATH set, all uvicorn workers share one SQLite-backed copy,
+# so a longer TTL is safe (writes and invalidations made by any worker are seen by all)
+sheets_cache.configure(
+    cache_duration_seconds=int(os.environ.get('SHEETS_CACHE_TTL_SECONDS', '60')),
+    store=SharedCacheStore(os.environ['SHEETS_CACHE_PATH']) if os.environ.get('SHEETS_CACHE_PATH') else None,
+    # Approximate memory for cached sheets plus their indexes; when over it, the least recently
+    # used rebuildable indexes (birthdays, search) are dropped. 0 means no limit
+    memory_budget_bytes=int(float(os.environ.get('SHEETS_CACHE_MEMORY_BUDGET_MB', '0')) * 1024 * 1024)
+)
+
+# Per-sheet TTLs overriding SHEETS_CACHE_TTL_SECONDS, e.g. "Amigos=600,Asistencia=30";
+# the Asistencia TTL also applies to its year shards unless they are listed themselves
+SHEETS_CACHE_TTLS = {name.strip(): float(ttl) for name, _, ttl in
+                     (item.rpartition('=') for item in os.environ.get('SHEETS_CACHE_TTLS', '').split(',') if item.strip())}
+
+# Hand edits to the spreadsheet: once the TTL runs out, cached sheets are revalidated against
+# the Drive file version (one small request, at most every SHEETS_CHANGE_PROBE_INTERVAL_SECONDS)
+# and only reloaded if the spreadsheet actually changed
+if storage.name == 'sheets' and os.environ.get('SHEETS_CHANGE_PROBE', 'on') != 'off':
+    sheets_cache.configure(
+        probe=SheetsChangeProbe(storage.service),
+        probe_interval_seconds=int(os.environ.get('SHEETS_CHANGE_PROBE_INTERVAL_SECONDS', '5'))
+    )
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
+# Users are read on every login; cache them in-process
+user_store = UserStore(db.users, ttl_seconds=float(os.environ.get('USER_CACHE_TTL_SECONDS', '300')))
 
 # Timezone configuration
 EASTERN_TZ = pytz.timezone('America/New_York')
@@ -53,9 +109,233 @@ SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-product
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 
+# bcrypt costs tens of milliseconds of CPU: run it off the event loop, in its own small pool
+# so logins never queue behind (or stall) check-ins
+password_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('PASSWORD_HASH_WORKERS', '2')), thread_name_prefix='bcrypt')
+# Verified tokens, so most requests skip the JWT signature check
+token_cache = TokenCache(max_size=int(os.environ.get('TOKEN_CACHE_SIZE', '1024')))
+
+# Report results, keyed by their parameters and the data versions of the sheets they read
+report_cache = ReportCache(max_entries=int(os.environ.get('REPORT_CACHE_SIZE', '256')))
+
+# ATTENDANCE_SHARDING=year keeps attendance in one table per year (Asistencia_2026, ...);
+# split an existing Asistencia table with shard_attendance.py first
+ATTENDANCE_SHARDING = os.environ.get('ATTENDANCE_SHARDING', 'off') == 'year'
+# Shards created by other workers (or by hand) are picked up when the shard list is refreshed
+SHARD_LIST_INTERVAL_SECONDS = float(os.environ.get('SHARD_LIST_INTERVAL_SECONDS', '300'))
+# Reads of a shard that is not listed look again at most this often (until it is created)
+SHARD_MISS_RELIST_SECONDS = 10
+
+# Soft-deleted rows are physically removed by a background job (hours between runs)
+COMPACTION_INTERVAL_HOURS = float(os.environ.get('SHEETS_COMPACTION_INTERVAL_HOURS', '24'))
+
+# Caches are kept warm from WARMUP_LEAD_MINUTES before each service window (Eastern time) until it
+# ends, e.g. WARMUP_WINDOWS="sun 09:00-13:00, wed 18:30-21:00, mon 08:00-12:00"; empty disables it
+WARMUP_WINDOWS = parse_windows(os.environ.get('WARMUP_WINDOWS', ''))
+WARMUP_LEAD_MINUTES = float(os.environ.get('WARMUP_LEAD_MINUTES', '15'))
+# Seconds between warm-ups inside a window; sheets expiring before the next one are re-read early
+WARMUP_INTERVAL_SECONDS = float(os.environ.get('WARMUP_INTERVAL_SECONDS', '30'))
+
+class LogRouteTagging(APIRoute):
+    """Tags the log records of a request with its path template ('/api/members/{member_id}'),
+    which is only known once routing has matched, so LOG_SAMPLE_RATES rules can name routes"""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def tagged(request: Request) -> Response:
+            token = current_route.set(self.path)
+            try:
+                return await handler(request)
+            finally:
+                current_route.reset(token)
+        return tagged
+
 # Create the main app
 app = FastAPI()
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=LogRouteTagging)
+
+# Derived structures rebuilt whenever a sheet is (re)cached. The registry and attendance
+# views feed shared structures on every write, so only the others may be evicted
+sheets_cache.register_index('Miembros', 'birthdays', BirthdayIndex, evictable=True)
+sheets_cache.register_index('Miembros', 'search', partial(PeopleSearchIndex, 'member'), evictable=True)
+sheets_cache.register_index('Amigos', 'search', partial(PeopleSearchIndex, 'friend'), evictable=True)
+sheets_cache.register_index('Miembros', 'registry', partial(person_registry.track, 'Miembros'))
+sheets_cache.register_index('Amigos', 'registry', partial(person_registry.track, 'Amigos'))
+
+for people_sheet in ('Miembros', 'Amigos'):
+    sheets_cache.set_policy(people_sheet, ttl_seconds=SHEETS_CACHE_TTLS.get(people_sheet))
+
+def register_attendance_indexes(table: str):
+    # Attendance is only appended to in normal use: refreshed by reading just its new rows
+    sheets_cache.set_policy(table, ttl_seconds=SHEETS_CACHE_TTLS.get(table, SHEETS_CACHE_TTLS.get(ATTENDANCE_TABLE)),
+                            refresh='tail')
+    sheets_cache.register_index(table, 'valid', partial(person_registry.attendance_validity, table))
+    sheets_cache.register_index(table, 'summary', partial(attendance_summaries.track, table))
+
+register_attendance_indexes(ATTENDANCE_TABLE)
+
+def get_records(sheet_name: str) -> List[dict]:
+    """Get a sheet's live records from cache.
+    
+    Handlers prefetch first so this is a cache hit; only an entry dropped in between (another
+    worker's write) is reread here, inline.
+    """
+    records = sheets_cache.get(sheet_name)
+    if records is None:
+        records = sheets_cache.set(sheet_name, storage.read_all(sheet_name))
+    return records
+
+async def load_records(sheet_name: str) -> List[dict]:
+    """get_records after filling the sheet off the event loop"""
+    await prefetch(sheet_name)
+    return get_records(sheet_name)
+
+async def get_records_since(sheet_name: str, min_version: Optional[str]) -> List[dict]:
+    """Cached records that include every write made before min_version, refreshing only when older.
+    
+    min_version is an X-Data-Version token from a write response; without one, always revalidate.
+    """
+    if not min_version:
+        # A fresh probe (past its rate limit), made off the event loop
+        token = await asyncio.to_thread(sheets_cache.current_token, True)
+        records = sheets_cache.get(sheet_name, revalidate=True, token=token)
+    else:
+        # A missing or expired entry is checked against a token probed off the event loop
+        token = await asyncio.to_thread(sheets_cache.current_token) if sheets_cache.expires_within(sheet_name, 0) else None
+        records = sheets_cache.get(sheet_name, token=token)
+        if records is not None and not sheets_cache.is_fresh(sheet_name, min_version):
+            records = None
+    if records is None:
+        records = await refresh_records(sheet_name)
+    return records
+
+async def read_new_rows(sheet_name: str) -> Optional[List[dict]]:
+    """Refresh a cached attendance table by reading only its new rows; None if a full read is needed"""
+    if sheets_cache.refresh_policy(sheet_name) != 'tail':
+        return None
+    cached = sheets_cache.peek(sheet_name)
+    if cached is None:
+        return None
+    tail = await asyncio.to_thread(storage.read_tail, sheet_name, cached)
+    # Only applied to the entry it was read against (not one replaced meanwhile)
+    if sheets_cache.refresh_tail(sheet_name, lambda current: tail if current is cached else None):
+        return sheets_cache.get(sheet_name)  # None: another worker published meanwhile and the entry was dropped
+    return None
+
+async def refresh_records(sheet_name: str) -> List[dict]:
+    """Re-read a sheet: just its new rows when possible, the whole sheet otherwise"""
+    records = await read_new_rows(sheet_name)
+    if records is None:
+        records = sheets_cache.set(sheet_name, await asyncio.to_thread(storage.read_all, sheet_name))
+    return records
+
+async def prefetch(*sheet_names: str, horizon_seconds: Optional[float] = None) -> List[str]:
+    """Fill every listed sheet that is not cached, off the event loop; returns the sheets read in full.
+    
+    With horizon_seconds, sheets whose entries expire within it are revalidated now (with a fresh
+    probe), or re-read. Sheets reads them all in one batch request; backends with concurrent_reads
+    read them in parallel.
+    """
+    warming = horizon_seconds is not None
+    stale = [name for name in sheet_names if sheets_cache.expires_within(name, horizon_seconds or 0)]
+    if not stale:
+        return []
+    # Expired entries are revalidated against a token probed here rather than on the event loop
+    token = await asyncio.to_thread(sheets_cache.current_token, warming)
+    missing = [name for name in stale
+               if sheets_cache.get(name, revalidate=warming, token=token) is None and await read_new_rows(name) is None]
+    if not missing:
+        return []
+    if storage.concurrent_reads and len(missing) > 1:
+        results = await asyncio.gather(*(asyncio.to_thread(storage.read_all, name) for name in missing))
+        data = dict(zip(missing, results))
+    else:
+        data = await asyncio.to_thread(storage.read_many, missing)
+    for sheet_name in missing:
+        sheets_cache.set(sheet_name, data[sheet_name])
+    return missing
+
+# Attendance shards known to exist (None until first listed) and when they were last listed
+known_attendance_shards: Optional[set] = None
+shards_listed_at = 0.0
+
+def list_attendance_shards() -> set:
+    """List the attendance shards that exist now, registering indexes for new ones"""
+    global known_attendance_shards, shards_listed_at
+    shards = {table for table in storage.list_tables() if shard_year(table) is not None}
+    for table in shards - (known_attendance_shards or set()):
+        register_attendance_indexes(table)
+    known_attendance_shards, shards_listed_at = shards, time.monotonic()
+    return shards
+
+def attendance_tables(start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+    """Attendance tables holding rows with fecha in [start, end] (open ends allowed)"""
+    if not ATTENDANCE_SHARDING:
+        return [ATTENDANCE_TABLE]
+    shards = known_attendance_shards if known_attendance_shards is not None else list_attendance_shards()
+    return shards_between(shards, start, end)
+
+async def attendance_table_for(fecha: str, create: bool = True) -> Optional[str]:
+    """Table a fecha's attendance is in, creating its year shard on first use.
+    
+    A shard missing from the known list is looked up again first (another worker may have
+    created it). With create=False (reads) a shard that does not exist yet gives None, and is
+    looked up again at most every SHARD_MISS_RELIST_SECONDS.
+    """
+    if not ATTENDANCE_SHARDING:
+        return ATTENDANCE_TABLE
+    table = shard_for(fecha)
+    if table in attendance_tables():
+        return table
+    if not create and time.monotonic() - shards_listed_at < SHARD_MISS_RELIST_SECONDS:
+        return None
+    if table in await asyncio.to_thread(list_attendance_shards):
+        return table
+    if not create:
+        return None
+    await asyncio.to_thread(storage.ensure_table, table)
+    register_attendance_indexes(table)
+    known_attendance_shards.add(table)
+    return table
+
+async def shard_listing_loop():
+    while True:
+        await asyncio.sleep(SHARD_LIST_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(list_attendance_shards)
+        except Exception as e:
+            logger.error(f"Error listing attendance shards: {str(e)}")
+
+async def get_attendance(start: Optional[str] = None, end: Optional[str] = None) -> List[dict]:
+    """Attendance records of every table overlapping [start, end], loaded concurrently"""
+    tables = attendance_tables(start, end)
+    await prefetch(*tables)
+    if len(tables) == 1:
+        return get_records(tables[0])
+    return [record for table in tables for record in get_records(table)]
+
+async def find_record(sheet_name: str, record_id: str) -> Optional[dict]:
+    """Find a live record (with its stable '_row') by id; soft deletes keep cached row numbers valid"""
+    for record in await load_records(sheet_name):
+        if str(record.get('id', '')) == str(record_id):
+            return record
+    return None
+
+def report_key(endpoint: str, params: tuple, sheet_names) -> tuple:
+    """Memo key for a report over already cached sheets; any write to them changes the key"""
+    return (endpoint, params, tuple((name, sheets_cache.version(name)) for name in sheet_names))
+
+def ensure_person_registry():
+    """Load the person registry once; afterwards member/friend writes keep it current"""
+    for sheet_name in ('Miembros', 'Amigos'):
+        if not person_registry.is_loaded(sheet_name):
+            get_records(sheet_name)
+
+async def get_sheet_index(sheet_name: str, index_name: str):
+    """Get a derived index, first reading (or revalidating) the sheet off the event loop if needed"""
+    await load_records(sheet_name)
+    return sheets_cache.get_index(sheet_name, index_name)
 
 # Models
 class User(BaseModel):
@@ -122,12 +402,26 @@ class AttendanceCreate(BaseModel):
     fecha: str
     presente: bool
 
+class PeopleDelete(BaseModel):
+    tipo: str  # 'member' or 'friend'
+    ids: List[str]
+
+class MergeGroup(BaseModel):
+    keep: str  # id that survives
+    merge: List[str]  # duplicate ids folded into it
+
+class PeopleMerge(BaseModel):
+    tipo: str  # 'member' or 'friend'
+    groups: List[MergeGroup]
+
 # Helper functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_pool, pwd_context.verify, plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_pool, pwd_context.hash, password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -136,14 +430,22 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def username_from_token(token: str) -> str:
+    """Username of a valid access token (verified tokens are cached); raises InvalidTokenError"""
+    username = token_cache.get(token)
+    if username is not None:
+        return username
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    username = payload.get("sub")
+    if username is None:
+        raise InvalidTokenError("Token has no subject")
+    if "exp" in payload:
+        token_cache.put(token, username, payload["exp"])
+    return username
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        return username
+        return username_from_token(credentials.credentials)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
     except (InvalidTokenError, Exception):
@@ -152,20 +454,18 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
 # Auth endpoints
 @api_router.post("/auth/register", response_model=Token)
 async def register(user_input: UserCreate):
-    # Check if user exists
-    existing_user = await db.users.find_one({"username": user_input.username})
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username already registered")
-    
-    # Create user
+    # Create user (the unique username index rejects duplicates atomically)
     user_dict = user_input.model_dump()
-    user_dict["password"] = get_password_hash(user_dict["password"])
+    user_dict["password"] = await get_password_hash(user_dict["password"])
     user_obj = User(**user_dict)
     
     doc = user_obj.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     
-    await db.users.insert_one(doc)
+    try:
+        await user_store.create(doc)
+    except UsernameTaken:
+        raise HTTPException(status_code=400, detail="Username already registered")
     
     # Create token
     access_token = create_access_token(data={"sub": user_obj.username})
@@ -173,11 +473,11 @@ async def register(user_input: UserCreate):
 
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_input: UserLogin):
-    user = await db.users.find_one({"username": user_input.username})
+    user = await user_store.get(user_input.username)
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     
-    if not verify_password(user_input.password, user["password"]):
+    if not await verify_password(user_input.password, user["password"]):
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     
     access_token = create_access_token(data={"sub": user["username"]})
@@ -187,14 +487,12 @@ async def login(user_input: UserLogin):
 @api_router.post("/members", response_model=Member)
 async def create_member(member_input: MemberCreate, current_user: str = Depends(get_current_user)):
     member_obj = Member(**member_input.model_dump())
-    values = [member_obj.id, member_obj.nombre, member_obj.apellido, member_obj.direccion, member_obj.fecha_nacimiento or '', member_obj.telefono, member_obj.fecha_registro.isoformat()]
-    logger.info(f"Creating member: {member_obj.nombre} {member_obj.apellido}, ID: {member_obj.id}")
-    logger.info(f"Values to append: {values}")
+    record = {'id': member_obj.id, 'nombre': member_obj.nombre, 'apellido': member_obj.apellido, 'direccion': member_obj.direccion, 'fecha_nacimiento': member_obj.fecha_nacimiento or '', 'telefono': member_obj.telefono, 'fecha_registro': member_obj.fecha_registro.isoformat()}
     try:
-        result = sheets_service.append_row('Miembros', values)
-        logger.info(f"Append result: {result}")
-        sheets_cache.invalidate('Miembros')  # Invalidar caché
-        logger.info(f"Member created successfully: {member_obj.nombre}")
+        stored = await asyncio.to_thread(storage.insert, 'Miembros', record)
+        # Update cache (and its indexes) in-memory instead of invalidating
+        sheets_cache.append_record('Miembros', stored)
+        logger.info("Member created", extra={'fields': {'member_id': member_obj.id}})
     except Exception as e:
         logger.error(f"Error creating member: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error saving member: {str(e)}")
@@ -203,12 +501,7 @@ async def create_member(member_input: MemberCreate, current_user: str = Depends(
 @api_router.get("/members", response_model=List[Member])
 async def get_members(current_user: str = Depends(get_current_user)):
     # Intentar obtener del caché
-    cached_data = sheets_cache.get('Miembros')
-    if cached_data is not None:
-        records = cached_data
-    else:
-        records = sheets_service.read_all('Miembros')
-        sheets_cache.set('Miembros', records)
+    records = await load_records('Miembros')
     
     members = []
     for record in records:
@@ -236,7 +529,7 @@ async def get_members(current_user: str = Depends(get_current_user)):
 
 @api_router.get("/members/{member_id}", response_model=Member)
 async def get_member(member_id: str, current_user: str = Depends(get_current_user)):
-    record = sheets_service.find_row_by_id('Miembros', member_id)
+    record = await find_record('Miembros', member_id)
     if not record:
         raise HTTPException(status_code=404, detail="Member not found")
     return Member(
@@ -251,33 +544,31 @@ async def get_member(member_id: str, current_user: str = Depends(get_current_use
 
 @api_router.put("/members/{member_id}", response_model=Member)
 async def update_member(member_id: str, member_input: MemberCreate, current_user: str = Depends(get_current_user)):
-    record = sheets_service.find_row_by_id('Miembros', member_id)
+    record = await find_record('Miembros', member_id)
     if not record:
         raise HTTPException(status_code=404, detail="Member not found")
     fecha_registro_str = record.get('fecha_registro', '').strip()
     if not fecha_registro_str:
         fecha_registro_str = get_eastern_now().isoformat()
-    values = [member_id, member_input.nombre, member_input.apellido, member_input.direccion, member_input.fecha_nacimiento or '', member_input.telefono, fecha_registro_str]
-    sheets_service.update_row('Miembros', record['_row'], values)
-    sheets_cache.invalidate('Miembros')
+    values = {'id': member_id, 'nombre': member_input.nombre, 'apellido': member_input.apellido, 'direccion': member_input.direccion, 'fecha_nacimiento': member_input.fecha_nacimiento or '', 'telefono': member_input.telefono, 'fecha_registro': fecha_registro_str}
+    sheets_cache.update_record('Miembros', member_id, await asyncio.to_thread(storage.update, 'Miembros', record, values))
     return Member(id=member_id, nombre=member_input.nombre, apellido=member_input.apellido, direccion=member_input.direccion, fecha_nacimiento=member_input.fecha_nacimiento, telefono=member_input.telefono, fecha_registro=parse_fecha_registro(fecha_registro_str))
 
 @api_router.delete("/members/{member_id}")
 async def delete_member(member_id: str, current_user: str = Depends(get_current_user)):
-    record = sheets_service.find_row_by_id('Miembros', member_id)
+    record = await find_record('Miembros', member_id)
     if not record:
         raise HTTPException(status_code=404, detail="Member not found")
-    sheets_service.delete_row('Miembros', record['_row'])
-    sheets_cache.invalidate('Miembros')
+    await asyncio.to_thread(storage.delete, 'Miembros', record, get_eastern_now().isoformat())
+    sheets_cache.remove_record('Miembros', member_id)
     return {"message": "Member deleted successfully"}
 
 # Visitor endpoints (Google Sheets con caché)
 @api_router.post("/visitors", response_model=Visitor)
 async def create_visitor(visitor_input: VisitorCreate, current_user: str = Depends(get_current_user)):
     visitor_obj = Visitor(**visitor_input.model_dump())
-    values = [visitor_obj.id, visitor_obj.nombre, visitor_obj.de_donde_viene, visitor_obj.fecha_registro.isoformat()]
-    sheets_service.append_row('Amigos', values)
-    sheets_cache.invalidate('Amigos')
+    record = {'id': visitor_obj.id, 'nombre': visitor_obj.nombre, 'de_donde_viene': visitor_obj.de_donde_viene, 'fecha_registro': visitor_obj.fecha_registro.isoformat()}
+    sheets_cache.append_record('Amigos', await asyncio.to_thread(storage.insert, 'Amigos', record))
     
     # Automatically mark attendance for today
     today = get_eastern_today()
@@ -288,17 +579,18 @@ async def create_visitor(visitor_input: VisitorCreate, current_user: str = Depen
         fecha=today,
         presente=True
     )
-    attendance_values = [
-        attendance_obj.tipo,
-        attendance_obj.person_id,
-        attendance_obj.person_name,
-        attendance_obj.fecha,
-        'TRUE',
-        attendance_obj.id,
-        attendance_obj.created_at.isoformat()
-    ]
-    sheets_service.append_row('Asistencia', attendance_values)
-    sheets_cache.invalidate('Asistencia')
+    attendance_record = {
+        'tipo': attendance_obj.tipo,
+        'person_id': attendance_obj.person_id,
+        'person_name': attendance_obj.person_name,
+        'fecha': attendance_obj.fecha,
+        'presente': 'TRUE',
+        'id': attendance_obj.id,
+        'created_at': attendance_obj.created_at.isoformat()
+    }
+    attendance_table = await attendance_table_for(today)
+    await asyncio.to_thread(storage.insert, attendance_table, attendance_record)
+    sheets_cache.invalidate(attendance_table)
     
     logger.info(f"Auto-attendance created for new friend: {visitor_obj.nombre} on {today}")
     
@@ -306,12 +598,7 @@ async def create_visitor(visitor_input: VisitorCreate, current_user: str = Depen
 
 @api_router.get("/visitors", response_model=List[Visitor])
 async def get_visitors(current_user: str = Depends(get_current_user)):
-    cached_data = sheets_cache.get('Amigos')
-    if cached_data is not None:
-        records = cached_data
-    else:
-        records = sheets_service.read_all('Amigos')
-        sheets_cache.set('Amigos', records)
+    records = await load_records('Amigos')
     
     visitors = []
     for record in records:
@@ -326,60 +613,189 @@ async def get_visitors(current_user: str = Depends(get_current_user)):
 
 @api_router.get("/visitors/{visitor_id}", response_model=Visitor)
 async def get_visitor(visitor_id: str, current_user: str = Depends(get_current_user)):
-    record = sheets_service.find_row_by_id('Amigos', visitor_id)
+    record = await find_record('Amigos', visitor_id)
     if not record:
         raise HTTPException(status_code=404, detail="Visitor not found")
     return Visitor(id=record['id'], nombre=record.get('nombre', ''), de_donde_viene=record.get('de_donde_viene', ''), fecha_registro=parse_fecha_registro(record.get('fecha_registro')))
 
 @api_router.put("/visitors/{visitor_id}", response_model=Visitor)
 async def update_visitor(visitor_id: str, visitor_input: VisitorCreate, current_user: str = Depends(get_current_user)):
-    record = sheets_service.find_row_by_id('Amigos', visitor_id)
+    record = await find_record('Amigos', visitor_id)
     if not record:
         raise HTTPException(status_code=404, detail="Visitor not found")
     fecha_registro_str = record.get('fecha_registro', '').strip()
     if not fecha_registro_str:
         fecha_registro_str = get_eastern_now().isoformat()
-    values = [visitor_id, visitor_input.nombre, visitor_input.de_donde_viene, fecha_registro_str]
-    sheets_service.update_row('Amigos', record['_row'], values)
-    sheets_cache.invalidate('Amigos')
+    values = {'id': visitor_id, 'nombre': visitor_input.nombre, 'de_donde_viene': visitor_input.de_donde_viene, 'fecha_registro': fecha_registro_str}
+    sheets_cache.update_record('Amigos', visitor_id, await asyncio.to_thread(storage.update, 'Amigos', record, values))
     return Visitor(id=visitor_id, nombre=visitor_input.nombre, de_donde_viene=visitor_input.de_donde_viene, fecha_registro=parse_fecha_registro(fecha_registro_str))
 
 @api_router.delete("/visitors/{visitor_id}")
 async def delete_visitor(visitor_id: str, current_user: str = Depends(get_current_user)):
-    record = sheets_service.find_row_by_id('Amigos', visitor_id)
+    record = await find_record('Amigos', visitor_id)
     if not record:
         raise HTTPException(status_code=404, detail="Visitor not found")
-    sheets_service.delete_row('Amigos', record['_row'])
-    sheets_cache.invalidate('Amigos')
+    await asyncio.to_thread(storage.delete, 'Amigos', record, get_eastern_now().isoformat())
+    sheets_cache.remove_record('Amigos', visitor_id)
     return {"message": "Visitor deleted successfully"}
 
+# People search (check-in)
+@api_router.get("/people/search")
+async def search_people(q: str, tipo: str = "all", limit: int = 10, current_user: str = Depends(get_current_user)):
+    """Accent-insensitive prefix/fuzzy search over members and friends, plus phone lookup"""
+    if not q.strip():
+        return []
+    limit = max(1, min(limit, 50))
+    indexes = []
+    if tipo in ("all", "member"):
+        indexes.append(await get_sheet_index('Miembros', 'search'))
+    if tipo in ("all", "friend", "visitor"):
+        indexes.append(await get_sheet_index('Amigos', 'search'))
+    return top_matches(indexes, q, limit)
+
+@api_router.get("/people/summary")
+async def get_people_summary(tipo: str = "all", current_user: str = Depends(get_current_user)):
+    """Attendance summary (totals, rate, last seen, current/longest streak) of every member and friend"""
+    sheets = []
+    if tipo in ("all", "member"):
+        sheets.append(('Miembros', 'member'))
+    if tipo in ("all", "friend", "visitor"):
+        sheets.append(('Amigos', 'friend'))
+    tables = attendance_tables()
+    await prefetch(*(sheet for sheet, _ in sheets), *tables)
+    key = report_key('people-summary', (tipo,), [*(sheet for sheet, _ in sheets), *tables])
+    cached = report_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    people = []
+    for sheet, person_tipo in sheets:
+        for p in get_records(sheet):
+            if not p.get('id'):
+                continue
+            name = f"{p.get('nombre', '')} {p.get('apellido', '')}".strip() if person_tipo == 'member' else p.get('nombre', '')
+            people.append({**attendance_summaries.summary(person_tipo, p['id']), 'tipo': person_tipo, 'nombre': name})
+    return report_cache.put(key, people)
+
+def people_table(tipo: str) -> str:
+    if tipo not in ("member", "friend"):
+        raise HTTPException(status_code=400, detail="tipo must be member or friend")
+    return 'Miembros' if tipo == 'member' else 'Amigos'
+
+# Largest upload accepted by /people/import, in rows and in bytes
+IMPORT_MAX_ROWS = int(os.environ.get('IMPORT_MAX_ROWS', '5000'))
+IMPORT_MAX_BYTES = int(float(os.environ.get('IMPORT_MAX_MB', '5')) * 1024 * 1024)
+
+async def read_upload(request: Request, max_bytes: int) -> bytes:
+    """Request body, refused with 413 once it is over max_bytes (declared or actually sent)"""
+    declared = request.headers.get('content-length')
+    if declared is not None:
+        try:
+            too_large = int(declared) > max_bytes
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Content-Length")
+        if too_large:
+            raise HTTPException(status_code=413, detail=f"Uploads are limited to {max_bytes} bytes")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Uploads are limited to {max_bytes} bytes")
+    return bytes(body)
+
+@api_router.post("/people/import")
+async def import_people(request: Request, tipo: str = "member", dry_run: bool = False, current_user: str = Depends(get_current_user)):
+    """Create many members or friends from a CSV file or JSON array, in one storage write.
+    
+    Rows are validated and deduplicated against the cached sheet and each other; the result
+    reports every row as created, duplicate (with the existing id) or invalid (with errors).
+    """
+    table = people_table(tipo)
+    try:
+        rows = parse_upload(await read_upload(request, IMPORT_MAX_BYTES), request.headers.get('content-type', ''))
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse upload: {e}")
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {IMPORT_MAX_ROWS} rows per import")
+    
+    fecha_registro = get_eastern_now().isoformat()
+    # Same fields, in the same order, as POST /members and /visitors write
+    columns = ('nombre', 'apellido', 'direccion', 'fecha_nacimiento', 'telefono') if tipo == 'member' else ('nombre', 'de_donde_viene')
+    
+    def new_record(row: dict) -> dict:
+        return {'id': str(uuid.uuid4()), **{column: row[column] for column in columns}, 'fecha_registro': fecha_registro}
+    
+    to_create, results = plan_import(tipo, rows, await load_records(table), new_record)
+    
+    if to_create and not dry_run:
+        try:
+            # One range write on Sheets (one bulk insert elsewhere), then one cache update
+            sheets_cache.append_records(table, await asyncio.to_thread(storage.insert_many, table, to_create))
+        except Exception as e:
+            logger.error(f"Error importing people: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error saving import: {str(e)}")
+        for result in results:
+            if result['status'] == 'new':
+                result['status'] = 'created'
+    
+    counts = {outcome: sum(1 for r in results if r['status'] == outcome) for outcome in ('new', 'created', 'duplicate', 'invalid')}
+    logger.info("People imported", extra={'fields': {'tipo': tipo, 'rows': len(rows), 'dry_run': dry_run, **counts}})
+    return {"tipo": tipo, "dry_run": dry_run, "rows": len(rows), **counts, "ignored_columns": ignored_columns(tipo, rows), "results": results}
+
+@api_router.post("/people/delete")
+async def delete_people(payload: PeopleDelete, current_user: str = Depends(get_current_user)):
+    """Delete many members or friends with one batch write"""
+    table = people_table(payload.tipo)
+    deleted, not_found = await delete_by_ids(storage, sheets_cache, table, payload.ids, get_eastern_now().isoformat())
+    logger.info("People deleted", extra={'fields': {'tipo': payload.tipo, 'deleted': len(deleted)}})
+    return {"deleted": deleted, "not_found": not_found}
+
+@api_router.post("/people/merge")
+async def merge_people(payload: PeopleMerge, current_user: str = Depends(get_current_user)):
+    """Fold duplicate members or friends into the record kept for each group.
+    
+    Attendance rows of merged ids are reassigned to the kept id; where that leaves two rows for
+    the same person and date, one is kept (present if either was) and the other deleted. Each
+    attendance table takes one batch update and one batch delete, then the merged people are
+    deleted in one batch; the cache is updated once per table.
+    """
+    table = people_table(payload.tipo)
+    groups = [(group.keep, group.merge) for group in payload.groups]
+    try:
+        counts = await merge_duplicates(storage, sheets_cache, payload.tipo, table, attendance_tables(), groups,
+                                        get_eastern_now().isoformat())
+    except PersonNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidMerge as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error merging people: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error merging people: {str(e)}")
+    
+    logger.info("People merged", extra={'fields': {'tipo': payload.tipo, **counts}})
+    return {"merged": counts['merged'], "reassigned": counts['reassigned'], "duplicates_removed": counts['duplicates'],
+            "groups": [{"keep": group.keep, "merged": group.merge} for group in payload.groups]}
+
 # Attendance endpoints (Google Sheets con caché)
 @api_router.post("/attendance", response_model=Attendance)
-async def create_attendance(attendance_input: AttendanceCreate, current_user: str = Depends(get_current_user)):
+async def create_attendance(attendance_input: AttendanceCreate, response: Response, current_user: str = Depends(get_current_user)):
+    try:
+        table = await attendance_table_for(attendance_input.fecha)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
         # Get cached data or read from sheets
-        cached_data = sheets_cache.get('Asistencia')
-        if not cached_data:
-            cached_data = sheets_service.read_all('Asistencia')
-            sheets_cache.set('Asistencia', cached_data)
+        records = await load_records(table)
         
-        records = list(cached_data)  # Make a copy
-        
-        existing_row = None
-        existing_record_idx = None
-        for idx, record in enumerate(records):
+        existing = None
+        for record in records:
             if str(record.get('person_id', '')) == str(attendance_input.person_id) and record.get('fecha') == attendance_input.fecha:
-                existing_row = idx + 2  # Sheet row number
-                existing_record_idx = idx
+                existing = record
                 break
         
-        if existing_row:
-            record_id = records[existing_record_idx].get('id', str(uuid.uuid4()))
-            values = [attendance_input.tipo, attendance_input.person_id, attendance_input.person_name, attendance_input.fecha, 'TRUE' if attendance_input.presente else 'FALSE', record_id, get_eastern_now().isoformat()]
-            sheets_service.update_row('Asistencia', existing_row, values)
-            
-            # Update cache in-memory instead of invalidating
-            records[existing_record_idx] = {
+        if existing:
+            record_id = existing.get('id', str(uuid.uuid4()))
+            values = {
                 'tipo': attendance_input.tipo,
                 'person_id': attendance_input.person_id,
                 'person_name': attendance_input.person_name,
@@ -388,18 +804,14 @@ async def create_attendance(attendance_input: AttendanceCreate, current_user: st
                 'id': record_id,
                 'created_at': get_eastern_now().isoformat()
             }
-            sheets_cache.set('Asistencia', records)
+            # Update cache in-memory instead of invalidating
+            sheets_cache.update_record(table, record_id, await asyncio.to_thread(storage.update, table, existing, values))
+            # Pass back as min_version to read this write
+            response.headers['X-Data-Version'] = sheets_cache.version_token(table)
             
             return Attendance(id=record_id, tipo=attendance_input.tipo, person_id=attendance_input.person_id, person_name=attendance_input.person_name, fecha=attendance_input.fecha, presente=attendance_input.presente, created_at=get_eastern_now())
         
         attendance_obj = Attendance(**attendance_input.model_dump())
-        values = [attendance_obj.tipo, attendance_obj.person_id, attendance_obj.person_name, attendance_obj.fecha, 'TRUE' if attendance_obj.presente else 'FALSE', attendance_obj.id, attendance_obj.created_at.isoformat()]
-        
-        logger.info(f"Saving attendance: tipo={attendance_obj.tipo}, person_id={attendance_obj.person_id}, person_name={attendance_obj.person_name}, fecha={attendance_obj.fecha}, presente={attendance_obj.presente}")
-        
-        sheets_service.append_row('Asistencia', values)
-        
-        # Add to cache instead of invalidating
         new_record = {
             'tipo': attendance_obj.tipo,
             'person_id': attendance_obj.person_id,
@@ -409,10 +821,12 @@ async def create_attendance(attendance_input: AttendanceCreate, current_user: st
             'id': attendance_obj.id,
             'created_at': attendance_obj.created_at.isoformat()
         }
-        records.append(new_record)
-        sheets_cache.set('Asistencia', records)
         
-        logger.info(f"Attendance saved successfully. Cache updated with {len(records)} records")
+        # Add to cache instead of invalidating
+        sheets_cache.append_record(table, await asyncio.to_thread(storage.insert, table, new_record))
+        response.headers['X-Data-Version'] = sheets_cache.version_token(table)
+        
+        logger.info("Attendance saved", extra={'fields': {'person_id': attendance_obj.person_id, 'tipo': attendance_obj.tipo, 'fecha': attendance_obj.fecha, 'presente': attendance_obj.presente}})
         
         return attendance_obj
     except Exception as e:
@@ -421,117 +835,104 @@ async def create_attendance(attendance_input: AttendanceCreate, current_user: st
 
 @api_router.get("/attendance")
 async def get_attendance_by_date(fecha: str, current_user: str = Depends(get_current_user)):
-    cached_data = sheets_cache.get('Asistencia')
-    records = cached_data if cached_data else sheets_service.read_all('Asistencia')
-    if not cached_data:
-        sheets_cache.set('Asistencia', records)
+    records = await get_attendance(fecha, fecha)
     return [{'id': r.get('id',''), 'tipo': r.get('tipo',''), 'person_id': r.get('person_id',''), 'person_name': r.get('person_name',''), 'fecha': r.get('fecha',''), 'presente': r.get('presente','FALSE').upper()=='TRUE', 'created_at': r.get('created_at',get_eastern_now().isoformat())} for r in records if r.get('fecha')==fecha]
 
 @api_router.get("/attendance/person/{person_id}")
 async def get_person_attendance(person_id: str, tipo: str, current_user: str = Depends(get_current_user)):
-    cached_data = sheets_cache.get('Asistencia')
-    records = cached_data if cached_data else sheets_service.read_all('Asistencia')
-    if not cached_data:
-        sheets_cache.set('Asistencia', records)
+    records = await get_attendance()
     return [{'id': r.get('id',''), 'tipo': r.get('tipo',''), 'person_id': r.get('person_id',''), 'person_name': r.get('person_name',''), 'fecha': r.get('fecha',''), 'presente': r.get('presente','FALSE').upper()=='TRUE', 'created_at': r.get('created_at',get_eastern_now().isoformat())} for r in records if str(r.get('person_id',''))==str(person_id) and r.get('tipo')==tipo]
 
 @api_router.get("/attendance/today")
-async def get_today_attendance(current_user: str = Depends(get_current_user)):
-    """Get list of people who have attendance marked for today"""
-    today = get_eastern_today()
-    logger.info(f"Getting attendance for today: {today}")
+async def get_today_attendance(response: Response, min_version: Optional[str] = None, current_user: str = Depends(get_current_user)):
+    """Get list of people who have attendance marked for today.
     
-    # Force refresh from sheets to ensure latest data
-    records = sheets_service.read_all('Asistencia')
-    sheets_cache.set('Asistencia', records)
+    min_version is the X-Data-Version of the client's last save: the cache is served as long as
+    it already holds that save. Without it, check-ins made elsewhere are always picked up (no read
+    if the spreadsheet is unchanged, otherwise only the new rows).
+    """
+    today = get_eastern_today()
     
-    logger.info(f"Total attendance records: {len(records)}")
+    # Reading must not create this year's shard; none yet means no check-ins yet
+    table = await attendance_table_for(today, create=False)
+    if table is None:
+        return []
+    records = await get_records_since(table, min_version)
+    response.headers['X-Data-Version'] = sheets_cache.version_token(table)
     
     # Return list of person_ids with attendance today (both present and absent)
     today_people = []
     for r in records:
-        fecha_record = r.get('fecha', '')
-        logger.info(f"Checking record: person_id={r.get('person_id')}, tipo={r.get('tipo')}, fecha={fecha_record}, today={today}")
-        if fecha_record == today:
+        if r.get('fecha', '') == today:
             today_people.append({
                 'person_id': r.get('person_id', ''),
                 'tipo': r.get('tipo', ''),
                 'presente': r.get('presente', 'FALSE').upper() == 'TRUE'
             })
     
-    logger.info(f"Attendance for today ({today}): {len(today_people)} people - {today_people}")
+    # One summary line, not one per record scanned
+    logger.info("Attendance for today", extra={'fields': {'fecha': today, 'scanned': len(records), 'people': len(today_people)}})
     return today_people
 
 # Reports endpoints (Google Sheets con caché)
 @api_router.get("/reports/by-date-range")
 async def get_report_by_date_range(start: str, end: str, tipo: str = "all", current_user: str = Depends(get_current_user)):
-    cached_data = sheets_cache.get('Asistencia')
-    records = cached_data if cached_data else sheets_service.read_all('Asistencia')
-    if not cached_data:
-        sheets_cache.set('Asistencia', records)
-    
-    # Get valid person IDs to filter out deleted records
-    valid_person_ids = set()
-    
-    # Get valid member IDs
-    members_cached = sheets_cache.get('Miembros')
-    members = members_cached if members_cached else sheets_service.read_all('Miembros')
-    if not members_cached:
-        sheets_cache.set('Miembros', members)
-    for m in members:
-        if m.get('id'):
-            valid_person_ids.add(m.get('id'))
-    
-    # Get valid friend IDs
-    friends_cached = sheets_cache.get('Amigos')
-    friends = friends_cached if friends_cached else sheets_service.read_all('Amigos')
-    if not friends_cached:
-        sheets_cache.set('Amigos', friends)
-    for f in friends:
-        if f.get('id'):
-            valid_person_ids.add(f.get('id'))
+    # Only the attendance tables (year shards) overlapping the range are read, concurrently
+    tables = attendance_tables(start, end)
+    await prefetch('Miembros', 'Amigos', *tables)
+    # Rows are pre-flagged as valid/orphaned (person deleted) by the person registry
+    ensure_person_registry()
+    key = report_key('by-date-range', (start, end, tipo), ('Miembros', 'Amigos', *tables))
+    cached = report_cache.get(key)
+    if cached is not None:
+        return cached
     
     filtered = []
-    for r in records:
-        if start <= r.get('fecha','') <= end:
-            rt = r.get('tipo','')
-            person_id = r.get('person_id','')
-            
-            # Filter out attendance records for deleted people
-            if person_id not in valid_person_ids:
-                continue
-            
-            if tipo=="all" or (tipo=="visitor" and rt in ['visitor','friend']) or tipo==rt:
-                filtered.append({'tipo':rt, 'person_id':person_id, 'person_name':r.get('person_name',''), 'fecha':r.get('fecha',''), 'presente':r.get('presente','FALSE').upper()=='TRUE'})
+    for table in tables:
+        validity = await get_sheet_index(table, 'valid')
+        for r in get_records(table):
+            if start <= r.get('fecha','') <= end and validity.is_valid(r):
+                rt = r.get('tipo','')
+                person_id = r.get('person_id','')
+                
+                if tipo=="all" or (tipo=="visitor" and rt in ['visitor','friend']) or tipo==rt:
+                    filtered.append({'tipo':rt, 'person_id':person_id, 'person_name':r.get('person_name',''), 'fecha':r.get('fecha',''), 'presente':r.get('presente','FALSE').upper()=='TRUE'})
     
     total_records = len(filtered)
     present_count = sum(1 for r in filtered if r['presente'])
-    return {"records": filtered, "statistics": {"total": total_records, "present": present_count, "absent": total_records-present_count, "attendance_rate": round((present_count/total_records*100) if total_records>0 else 0, 2)}}
+    return report_cache.put(key, {"records": filtered, "statistics": {"total": total_records, "present": present_count, "absent": total_records-present_count, "attendance_rate": round((present_count/total_records*100) if total_records>0 else 0, 2)}})
 
 @api_router.get("/reports/individual/{person_id}")
 async def get_individual_report(person_id: str, tipo: str, start: Optional[str] = None, end: Optional[str] = None, current_user: str = Depends(get_current_user)):
-    cached_data = sheets_cache.get('Asistencia')
-    records = cached_data if cached_data else sheets_service.read_all('Asistencia')
-    if not cached_data:
-        sheets_cache.set('Asistencia', records)
+    window = (start, end) if start and end else (None, None)
+    tables = attendance_tables(*window)
+    # The summary covers the whole history, so every table is loaded
+    all_tables = attendance_tables()
+    await prefetch(*all_tables)
+    key = report_key('individual', (person_id, tipo, start, end), all_tables)
+    cached = report_cache.get(key)
+    if cached is not None:
+        return cached
     
+    # Only this person's rows, from the per-person summaries index
     filtered = []
-    for r in records:
-        if str(r.get('person_id',''))==str(person_id) and r.get('tipo')==tipo:
+    for r in sorted(attendance_summaries.records_for(tipo, person_id, tables), key=lambda r: r.get('fecha','')):
+        if r.get('tipo')==tipo:
             rd = r.get('fecha','')
             if (not start or not end) or (start <= rd <= end):
                 filtered.append({'fecha':rd, 'presente':r.get('presente','FALSE').upper()=='TRUE'})
     
     total_records = len(filtered)
     present_count = sum(1 for r in filtered if r['presente'])
-    return {"person_id": person_id, "tipo": tipo, "records": filtered, "statistics": {"total": total_records, "present": present_count, "absent": total_records-present_count, "attendance_rate": round((present_count/total_records*100) if total_records>0 else 0, 2)}}
+    return report_cache.put(key, {"person_id": person_id, "tipo": tipo, "records": filtered, "statistics": {"total": total_records, "present": present_count, "absent": total_records-present_count, "attendance_rate": round((present_count/total_records*100) if total_records>0 else 0, 2)}, "summary": attendance_summaries.summary(tipo, person_id)})
 
 @api_router.get("/reports/collective")
 async def get_collective_report(start: str, end: str, current_user: str = Depends(get_current_user)):
-    cached_data = sheets_cache.get('Asistencia')
-    records = cached_data if cached_data else sheets_service.read_all('Asistencia')
-    if not cached_data:
-        sheets_cache.set('Asistencia', records)
+    records = await get_attendance(start, end)
+    key = report_key('collective', (start, end), attendance_tables(start, end))
+    cached = report_cache.get(key)
+    if cached is not None:
+        return cached
     
     dates = {}
     for r in records:
@@ -549,90 +950,76 @@ async def get_collective_report(start: str, end: str, current_user: str = Depend
     
     total_records = sum(1 for r in records if start <= r.get('fecha','') <= end)
     total_present = sum(dates[d]['total'] for d in dates)
-    return {"date_range": {"start": start, "end": end}, "by_date": dates, "total_records": total_records, "total_present": total_present}
+    return report_cache.put(key, {"date_range": {"start": start, "end": end}, "by_date": dates, "total_records": total_records, "total_present": total_present})
 
 @api_router.get("/reports/birthdays")
 async def get_birthdays_report(start: str, end: str, current_user: str = Depends(get_current_user)):
     """Get members with birthdays in a date range (month-day comparison)"""
-    members_cached = sheets_cache.get('Miembros')
-    members = members_cached if members_cached else sheets_service.read_all('Miembros')
-    if not members_cached:
-        sheets_cache.set('Miembros', members)
-    
-    # Parse start and end dates to get month-day ranges
-    start_parts = start.split('-')
-    end_parts = end.split('-')
-    
-    if len(start_parts) != 3 or len(end_parts) != 3:
+    start_month_day = BirthdayIndex.month_day(start)
+    end_month_day = BirthdayIndex.month_day(end)
+    if start_month_day is None or end_month_day is None:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    start_month_day = f"{start_parts[1]}-{start_parts[2]}"
-    end_month_day = f"{end_parts[1]}-{end_parts[2]}"
+    index = await get_sheet_index('Miembros', 'birthdays')
+    key = report_key('birthdays', (start, end), ('Miembros',))
+    cached = report_cache.get(key)
+    if cached is not None:
+        return cached
+    birthdays = index.between(start_month_day, end_month_day)
     
-    birthdays = []
-    for member in members:
-        if not member.get('id') or not member.get('fecha_nacimiento'):
-            continue
-        
-        birth_date = member.get('fecha_nacimiento', '')
-        birth_parts = birth_date.split('-')
-        
-        if len(birth_parts) != 3:
-            continue
-        
-        birth_month_day = f"{birth_parts[1]}-{birth_parts[2]}"
-        
-        # Check if birthday falls within range (handles same month or cross-month)
-        if start_month_day <= end_month_day:
-            # Normal case: both dates in same year span
-            if start_month_day <= birth_month_day <= end_month_day:
-                birthdays.append({
-                    'id': member.get('id'),
-                    'nombre': member.get('nombre', ''),
-                    'apellido': member.get('apellido', ''),
-                    'fecha_nacimiento': birth_date,
-                    'telefono': member.get('telefono', ''),
-                    'direccion': member.get('direccion', '')
-                })
-        else:
-            # Cross-year case: e.g., Dec 25 to Jan 5
-            if birth_month_day >= start_month_day or birth_month_day <= end_month_day:
-                birthdays.append({
-                    'id': member.get('id'),
-                    'nombre': member.get('nombre', ''),
-                    'apellido': member.get('apellido', ''),
-                    'fecha_nacimiento': birth_date,
-                    'telefono': member.get('telefono', ''),
-                    'direccion': member.get('direccion', '')
-                })
-    
-    # Sort by month-day
-    birthdays.sort(key=lambda x: x['fecha_nacimiento'].split('-')[1] + '-' + x['fecha_nacimiento'].split('-')[2])
-    
-    return {
+    return report_cache.put(key, {
         "date_range": {"start": start, "end": end},
         "birthdays": birthdays,
         "total": len(birthdays)
+    })
+
+@api_router.get("/reports/birthdays/upcoming")
+async def get_upcoming_birthdays(days: int = 30, current_user: str = Depends(get_current_user)):
+    """Get members with birthdays in the next N days (Eastern time), soonest first"""
+    if days < 0:
+        raise HTTPException(status_code=400, detail="days must be zero or positive")
+    birthdays = (await get_sheet_index('Miembros', 'birthdays')).upcoming(get_eastern_now().date(), days)
+    return {
+        "days": days,
+        "birthdays": birthdays,
+        "total": len(birthdays)
     }
 
+@api_router.get("/reports/cache-stats")
+async def get_report_cache_stats(current_user: str = Depends(get_current_user)):
+    """Hit/miss counters of the report memo"""
+    return report_cache.stats()
+
+@api_router.get("/cache/footprint")
+async def get_cache_footprint(current_user: str = Depends(get_current_user)):
+    """Approximate memory use of the sheets cache per sheet (data and indexes), its budget and policies"""
+    return {**sheets_cache.footprint(), "reports": report_cache.stats()}
+
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats(current_user: str = Depends(get_current_user)):
-    members = sheets_cache.get('Miembros') or sheets_service.read_all('Miembros')
-    visitors = sheets_cache.get('Amigos') or sheets_service.read_all('Amigos')
-    attendance = sheets_cache.get('Asistencia') or sheets_service.read_all('Asistencia')
+    today = get_eastern_today()
+    eastern_now = get_eastern_now()
+    first_day = eastern_now.replace(day=1).strftime('%Y-%m-%d')
+    last_day = eastern_now.strftime('%Y-%m-%d')
+    
+    tables = attendance_tables(first_day, last_day)
+    await prefetch('Miembros', 'Amigos', *tables)
+    key = report_key('dashboard', (today,), ('Miembros', 'Amigos', *tables))
+    cached = report_cache.get(key)
+    if cached is not None:
+        return cached
+    members = get_records('Miembros')
+    visitors = get_records('Amigos')
+    attendance = await get_attendance(first_day, last_day)
     
     total_members = len([m for m in members if m.get('id')])
     total_visitors = len([v for v in visitors if v.get('id')])
     
-    today = get_eastern_today()
     today_attendance = sum(1 for a in attendance if a.get('fecha')==today and a.get('presente','FALSE').upper()=='TRUE')
     
-    eastern_now = get_eastern_now()
-    first_day = eastern_now.replace(day=1).strftime('%Y-%m-%d')
-    last_day = eastern_now.strftime('%Y-%m-%d')
     month_attendance = sum(1 for a in attendance if first_day <= a.get('fecha','') <= last_day and a.get('presente','FALSE').upper()=='TRUE')
     
-    return {"total_members": total_members, "total_visitors": total_visitors, "today_attendance": today_attendance, "month_attendance": month_attendance}
+    return report_cache.put(key, {"total_members": total_members, "total_visitors": total_visitors, "today_attendance": today_attendance, "month_attendance": month_attendance})
 
 # Include router
 app.include_router(api_router)
@@ -643,14 +1030,124 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Data-Version"],
 )
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Logging goes through a queue drained by a background thread. LOG_SAMPLE_RATES samples
+# INFO/DEBUG per route template prefix, e.g. "/api/attendance/today=0.05" or
+# "/api/members/{member_id}=0.1" (records are tagged by LogRouteTagging); warnings are always kept
+log_listener = setup_logging(
+    level=os.environ.get('LOG_LEVEL', 'INFO'),
+    sample_rates=parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', '')),
+    json_output=os.environ.get('LOG_FORMAT', 'json') == 'json'
 )
 logger = logging.getLogger(__name__)
 
+# Per-request profiling for the users in PROFILING_ADMINS: send "X-Profile: spans" (or ?profile=spans)
+# to get a Server-Timing header with time spent in the cache, storage (Sheets) calls, response
+# validation and rendering; "cprofile" also writes a .prof file to PROFILE_DIR.
+# Nothing is installed unless PROFILING_ADMINS is set.
+PROFILING_ADMINS = {name.strip() for name in os.environ.get('PROFILING_ADMINS', '').split(',') if name.strip()}
+PROFILE_DIR = os.environ.get('PROFILE_DIR', str(ROOT_DIR / 'profiles'))
+
+if PROFILING_ADMINS:
+    instrument(storage, ['read_all', 'read_many', 'read_tail', 'insert', 'insert_many', 'update', 'delete'], storage.name)
+    instrument(sheets_cache, ['get', 'set', 'refresh_tail'], 'cache')
+    instrument_fastapi()
+
+    @app.middleware("http")
+    async def profile_request(request, call_next):
+        mode = request.headers.get('x-profile') or request.query_params.get('profile')
+        if mode not in ('spans', 'cprofile'):
+            return await call_next(request)
+        scheme, _, token = request.headers.get('authorization', '').partition(' ')
+        try:
+            username = username_from_token(token) if scheme.lower() == 'bearer' else None
+        except InvalidTokenError:
+            username = None
+        if username not in PROFILING_ADMINS:
+            return await call_next(request)
+        return await profile_call(call_next, request, mode, PROFILE_DIR)
+
+def compact_sheets() -> List[str]:
+    """Rewrite Miembros and Amigos without their tombstoned rows (blocking: run it in a thread).
+    
+    Returns the sheets whose cached row numbers are now stale.
+    """
+    moved = []
+    for sheet_name in ('Miembros', 'Amigos'):
+        try:
+            if sheets_mirror is not None:
+                # SQLite deletes rows outright; only the mirrored tabs keep tombstones
+                result = sheets_mirror.compact(sheet_name)
+                logger.info(f"Compacted {sheet_name}: removed {result['removed']} deleted rows")
+                continue
+            result = storage.compact(sheet_name)
+            if result['removed']:
+                moved.append(sheet_name)
+            logger.info(f"Compacted {sheet_name}: removed {result['removed']} deleted rows")
+        except Exception as e:
+            logger.error(f"Error compacting {sheet_name}: {str(e)}")
+    return moved
+
+async def compaction_loop():
+    while True:
+        await asyncio.sleep(COMPACTION_INTERVAL_HOURS * 3600)
+        for sheet_name in await asyncio.to_thread(compact_sheets):
+            # Row numbers changed, so cached '_row' values are stale
+            sheets_cache.invalidate(sheet_name)
+
+async def warm_caches(horizon_seconds: float = 0):
+    """Load every sheet and index, and precompute the reports the first requests of a service ask for.
+    
+    Sheets whose entries expire within horizon_seconds are revalidated or re-read now.
+    """
+    sheet_names = ['Miembros', 'Amigos', *attendance_tables()]
+    reread = await prefetch(*sheet_names, horizon_seconds=horizon_seconds)
+    ensure_person_registry()
+    
+    today = get_eastern_now().date()
+    month_start = today.replace(day=1)
+    month_end = (month_start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    previous_month_end = month_start - timedelta(days=1)
+    week_start = today - timedelta(days=today.weekday())
+    # Current and previous month and week (Monday to Sunday)
+    ranges = [(month_start, month_end), (previous_month_end.replace(day=1), previous_month_end),
+              (week_start, week_start + timedelta(days=6)), (week_start - timedelta(days=7), week_start - timedelta(days=1))]
+    for start, end in ((start.isoformat(), end.isoformat()) for start, end in ranges):
+        await get_collective_report(start, end, current_user=None)
+        await get_report_by_date_range(start, end, tipo="all", current_user=None)
+        await get_birthdays_report(start, end, current_user=None)
+    # Today's visitors, as the reports page asks for them
+    await get_report_by_date_range(today.isoformat(), today.isoformat(), tipo="visitor", current_user=None)
+    await get_dashboard_stats(current_user=None)
+    logger.info("Warmed caches", extra={'fields': {'sheets': len(sheet_names), 'reread': len(reread), 'reports': report_cache.stats()['entries']}})
+
+@app.on_event("startup")
+async def start_background_jobs():
+    try:
+        await user_store.ensure_indexes()
+    except Exception as e:
+        # Registration checks for existing usernames itself until the index is created
+        logger.error(f"Error creating users index: {str(e)}")
+    if sheets_mirror is not None and await asyncio.to_thread(storage.is_empty):
+        # First start on SQLite: seed it from the current Sheets tabs (one worker does, the rest see rows)
+        counts = await asyncio.to_thread(storage.import_from, sheets_mirror.sheets, True)
+        if counts is not None:
+            logger.info(f"Imported Sheets into SQLite: {counts}")
+    if sheets_mirror is not None and SHEETS_MIRROR_INTERVAL_SECONDS > 0:
+        asyncio.create_task(sheets_mirror.run(SHEETS_MIRROR_INTERVAL_SECONDS))
+    if COMPACTION_INTERVAL_HOURS > 0:
+        asyncio.create_task(compaction_loop())
+    if ATTENDANCE_SHARDING and SHARD_LIST_INTERVAL_SECONDS > 0:
+        asyncio.create_task(shard_listing_loop())
+    if WARMUP_WINDOWS:
+        schedule = WarmupSchedule(WARMUP_WINDOWS, WARMUP_LEAD_MINUTES)
+        asyncio.create_task(schedule.run(partial(warm_caches, WARMUP_INTERVAL_SECONDS), WARMUP_INTERVAL_SECONDS,
+                                         lambda: get_eastern_now().replace(tzinfo=None)))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    client.close()
+    password_pool.shutdown(wait=False)
+    log_listener.stop()
@@ -1,4 +1,6 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -9,6 +11,7 @@ from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
 import uuid
+import json
 from datetime import datetime, timezone, timedelta
 import jwt
 from passlib.context import CryptContext
@@ -122,6 +125,53 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.JWTError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
 
+def parse_datetime_field(doc: dict, field: str) -> dict:
+    if isinstance(doc.get(field), str):
+        doc[field] = datetime.fromisoformat(doc[field])
+    return doc
+
+def dump_json(value) -> str:
+    return json.dumps(jsonable_encoder(value))
+
+async def stream_json_array(cursor, model=None, date_field: str = 'created_at'):
+    """Serialize a cursor as a JSON array one document at a time (no cap, no full list in memory)"""
+    yield '['
+    first = True
+    async for doc in cursor:
+        parse_datetime_field(doc, date_field)
+        item = model(**doc).model_dump_json() if model else dump_json(doc)
+        yield item if first else ',' + item
+        first = False
+    yield ']'
+
+async def stream_report(cursor, head: dict, tail: dict):
+    """Stream {**head, "records": [...], **tail} with the records coming straight from a cursor"""
+    yield dump_json(head)[:-1] + (', ' if head else '') + '"records": '
+    async for chunk in stream_json_array(cursor):
+        yield chunk
+    yield (', ' + dump_json(tail)[1:]) if tail else '}'
+
+def stats_pipeline(query: dict) -> list:
+    return [
+        {"$match": query},
+        {"$group": {
+            "_id": None,
+            "total": {"$sum": 1},
+            "present": {"$sum": {"$cond": ["$presente", 1, 0]}}
+        }}
+    ]
+
+async def attendance_statistics(query: dict) -> dict:
+    result = await db.attendance.aggregate(stats_pipeline(query)).to_list(1)
+    total_records = result[0]['total'] if result else 0
+    present_count = result[0]['present'] if result else 0
+    return {
+        "total": total_records,
+        "present": present_count,
+        "absent": total_records - present_count,
+        "attendance_rate": round((present_count / total_records * 100) if total_records > 0 else 0, 2)
+    }
+
 # Auth endpoints
 @api_router.post("/auth/register", response_model=Token)
 async def register(user_input: UserCreate):
@@ -167,11 +217,8 @@ async def create_member(member_input: MemberCreate, current_user: str = Depends(
 
 @api_router.get("/members", response_model=List[Member])
 async def get_members(current_user: str = Depends(get_current_user)):
-    members = await db.members.find({}, {"_id": 0}).to_list(1000)
-    for member in members:
-        if isinstance(member['fecha_registro'], str):
-            member['fecha_registro'] = datetime.fromisoformat(member['fecha_registro'])
-    return members
+    cursor = db.members.find({}, {"_id": 0})
+    return StreamingResponse(stream_json_array(cursor, Member, 'fecha_registro'), media_type="application/json")
 
 @api_router.get("/members/{member_id}", response_model=Member)
 async def get_member(member_id: str, current_user: str = Depends(get_current_user)):
@@ -212,11 +259,8 @@ async def create_visitor(visitor_input: VisitorCreate, current_user: str = Depen
 
 @api_router.get("/visitors", response_model=List[Visitor])
 async def get_visitors(current_user: str = Depends(get_current_user)):
-    visitors = await db.visitors.find({}, {"_id": 0}).to_list(1000)
-    for visitor in visitors:
-        if isinstance(visitor['fecha_registro'], str):
-            visitor['fecha_registro'] = datetime.fromisoformat(visitor['fecha_registro'])
-    return visitors
+    cursor = db.visitors.find({}, {"_id": 0})
+    return StreamingResponse(stream_json_array(cursor, Visitor, 'fecha_registro'), media_type="application/json")
 
 @api_router.get("/visitors/{visitor_id}", response_model=Visitor)
 async def get_visitor(visitor_id: str, current_user: str = Depends(get_current_user)):
@@ -274,19 +318,13 @@ async def create_attendance(attendance_input: AttendanceCreate, current_user: st
 
 @api_router.get("/attendance")
 async def get_attendance_by_date(fecha: str, current_user: str = Depends(get_current_user)):
-    attendance_records = await db.attendance.find({"fecha": fecha}, {"_id": 0}).to_list(1000)
-    for record in attendance_records:
-        if isinstance(record.get('created_at'), str):
-            record['created_at'] = datetime.fromisoformat(record['created_at'])
-    return attendance_records
+    cursor = db.attendance.find({"fecha": fecha}, {"_id": 0})
+    return StreamingResponse(stream_json_array(cursor), media_type="application/json")
 
 @api_router.get("/attendance/person/{person_id}")
 async def get_person_attendance(person_id: str, tipo: str, current_user: str = Depends(get_current_user)):
-    records = await db.attendance.find({"person_id": person_id, "tipo": tipo}, {"_id": 0}).to_list(1000)
-    for record in records:
-        if isinstance(record.get('created_at'), str):
-            record['created_at'] = datetime.fromisoformat(record['created_at'])
-    return records
+    cursor = db.attendance.find({"person_id": person_id, "tipo": tipo}, {"_id": 0}).sort("fecha", 1)
+    return StreamingResponse(stream_json_array(cursor), media_type="application/json")
 
 # Reports endpoints
 @api_router.get("/reports/by-date-range")
@@ -300,22 +338,10 @@ async def get_report_by_date_range(
     if tipo != "all":
         query["tipo"] = tipo
     
-    records = await db.attendance.find(query, {"_id": 0}).to_list(10000)
-    
-    # Calculate statistics
-    total_records = len(records)
-    present_count = sum(1 for r in records if r['presente'])
-    absent_count = total_records - present_count
-    
-    return {
-        "records": records,
-        "statistics": {
-            "total": total_records,
-            "present": present_count,
-            "absent": absent_count,
-            "attendance_rate": round((present_count / total_records * 100) if total_records > 0 else 0, 2)
-        }
-    }
+    # Statistics are computed server-side; records are streamed from the (fecha, tipo, presente) index
+    statistics = await attendance_statistics(query)
+    cursor = db.attendance.find(query, {"_id": 0}).sort("fecha", 1)
+    return StreamingResponse(stream_report(cursor, {}, {"statistics": statistics}), media_type="application/json")
 
 @api_router.get("/reports/individual/{person_id}")
 async def get_individual_report(
@@ -329,23 +355,13 @@ async def get_individual_report(
     if start and end:
         query["fecha"] = {"$gte": start, "$lte": end}
     
-    records = await db.attendance.find(query, {"_id": 0}).to_list(10000)
-    
-    total_records = len(records)
-    present_count = sum(1 for r in records if r['presente'])
-    absent_count = total_records - present_count
-    
-    return {
-        "person_id": person_id,
-        "tipo": tipo,
-        "records": records,
-        "statistics": {
-            "total": total_records,
-            "present": present_count,
-            "absent": absent_count,
-            "attendance_rate": round((present_count / total_records * 100) if total_records > 0 else 0, 2)
-        }
-    }
+    # Served by the (person_id, tipo, fecha) index
+    statistics = await attendance_statistics(query)
+    cursor = db.attendance.find(query, {"_id": 0}).sort("fecha", 1)
+    return StreamingResponse(
+        stream_report(cursor, {"person_id": person_id, "tipo": tipo}, {"statistics": statistics}),
+        media_type="application/json"
+    )
 
 @api_router.get("/reports/collective")
 async def get_collective_report(
@@ -353,27 +369,32 @@ async def get_collective_report(
     end: str,
     current_user: str = Depends(get_current_user)
 ):
-    query = {"fecha": {"$gte": start, "$lte": end}}
-    records = await db.attendance.find(query, {"_id": 0}).to_list(10000)
-    
-    # Group by date
+    # Group by date on the server
+    pipeline = [
+        {"$match": {"fecha": {"$gte": start, "$lte": end}}},
+        {"$group": {
+            "_id": "$fecha",
+            "records": {"$sum": 1},
+            "total": {"$sum": {"$cond": ["$presente", 1, 0]}},
+            "members": {"$sum": {"$cond": [{"$and": ["$presente", {"$eq": ["$tipo", "member"]}]}, 1, 0]}}
+        }},
+        {"$sort": {"_id": 1}}
+    ]
     dates = {}
-    for record in records:
-        fecha = record['fecha']
-        if fecha not in dates:
-            dates[fecha] = {'members': 0, 'visitors': 0, 'total': 0}
-        if record['presente']:
-            dates[fecha]['total'] += 1
-            if record['tipo'] == 'member':
-                dates[fecha]['members'] += 1
-            else:
-                dates[fecha]['visitors'] += 1
+    total_records = 0
+    async for group in db.attendance.aggregate(pipeline):
+        total_records += group['records']
+        dates[group['_id']] = {
+            'members': group['members'],
+            'visitors': group['total'] - group['members'],
+            'total': group['total']
+        }
     
     return {
         "date_range": {"start": start, "end": end},
         "by_date": dates,
-        "total_records": len(records),
-        "total_present": sum(1 for r in records if r['presente'])
+        "total_records": total_records,
+        "total_present": sum(d['total'] for d in dates.values())
     }
 
 @api_router.get("/dashboard/stats")
@@ -382,23 +403,24 @@ async def get_dashboard_stats(current_user: str = Depends(get_current_user)):
     total_members = await db.members.count_documents({})
     total_visitors = await db.visitors.count_documents({})
     
-    # Get today's attendance
+    # Today's and this month's attendance in one pass (today is inside the month range)
     today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
-    today_attendance = await db.attendance.find({"fecha": today, "presente": True}, {"_id": 0}).to_list(1000)
-    
-    # Get this month's stats
     first_day = datetime.now(timezone.utc).replace(day=1).strftime('%Y-%m-%d')
-    last_day = datetime.now(timezone.utc).strftime('%Y-%m-%d')
-    month_attendance = await db.attendance.find({
-        "fecha": {"$gte": first_day, "$lte": last_day},
-        "presente": True
-    }, {"_id": 0}).to_list(10000)
+    pipeline = [
+        {"$match": {"fecha": {"$gte": first_day, "$lte": today}, "presente": True}},
+        {"$group": {
+            "_id": None,
+            "month": {"$sum": 1},
+            "today": {"$sum": {"$cond": [{"$eq": ["$fecha", today]}, 1, 0]}}
+        }}
+    ]
+    result = await db.attendance.aggregate(pipeline).to_list(1)
     
     return {
         "total_members": total_members,
         "total_visitors": total_visitors,
-        "today_attendance": len(today_attendance),
-        "month_attendance": len(month_attendance)
+        "today_attendance": result[0]['today'] if result else 0,
+        "month_attendance": result[0]['month'] if result else 0
     }
 
 # Include router
@@ -418,6 +440,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    # Date-range, collective and dashboard reports filter on fecha (+ tipo, presente)
+    await db.attendance.create_index([("fecha", 1), ("tipo", 1), ("presente", 1)])
+    # Individual reports and the create_attendance existence check filter on person_id
+    await db.attendance.create_index([("person_id", 1), ("tipo", 1), ("fecha", 1)])
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
\ No newline at end of file
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Split the single Asistencia table into per-year shards (Asistencia_2025, Asistencia_2026, ...)
+
+Usage: python shard_attendance.py [--dry-run]
+
+Uses the backend selected by STORAGE_BACKEND (default: sheets). Each shard is written
+with one bulk write; re-running skips rows already copied (matched by id). The original
+Asistencia table is left untouched as a backup. Stop the server (or pause check-ins)
+while it runs, then start it with ATTENDANCE_SHARDING=year.
+"""
+import argparse
+import os
+from collections import defaultdict
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from attendance_shards import ATTENDANCE_TABLE, shard_for
+
+def plan_shards(records):
+    """Group attendance records by shard; rows without a usable fecha fall back to created_at"""
+    shards = defaultdict(list)
+    skipped = []
+    for record in records:
+        for field in ('fecha', 'created_at'):
+            try:
+                shards[shard_for(str(record.get(field, '')))].append(record)
+                break
+            except ValueError:
+                continue
+        else:
+            skipped.append(record)
+    return shards, skipped
+
+def public(record):
+    return {k: v for k, v in record.items() if not k.startswith('_')}
+
+def shard_attendance(storage, dry_run=False):
+    records = storage.read_all(ATTENDANCE_TABLE)
+    shards, skipped = plan_shards(records)
+    print(f"📋 {len(records)} attendance rows in {ATTENDANCE_TABLE} -> {len(shards)} shards")
+    for table in sorted(shards):
+        rows = shards[table]
+        if dry_run:
+            print(f"   {table}: {len(rows)} rows")
+            continue
+        storage.ensure_table(table)
+        copied = {str(r.get('id', '')) for r in storage.read_all(table)}
+        pending = [public(r) for r in rows if not r.get('id') or str(r.get('id')) not in copied]
+        storage.insert_many(table, pending)
+        print(f"✅ {table}: wrote {len(pending)} rows ({len(rows) - len(pending)} already there)")
+    for record in skipped:
+        print(f"⚠️  Skipped row without a valid fecha/created_at: {public(record)}")
+    return {table: len(rows) for table, rows in shards.items()}
+
+if __name__ == "__main__":
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Split Asistencia into per-year shards")
+    parser.add_argument('--dry-run', action='store_true', help="only print how many rows each shard would get")
+    args = parser.parse_args()
+
+    from storage import create_storage
+    shard_attendance(create_storage(os.environ.get('STORAGE_BACKEND', 'sheets')), dry_run=args.dry_run)
@@ -0,0 +1,148 @@
+"""SQLite-backed store that lets every uvicorn worker share one copy of the Sheets cache"""
+import json
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class SharedCacheStore:
+    def __init__(self, path: str, max_changes: int = 100):
+        """Open (or create) the shared cache file; safe to open from many processes.
+        
+        A sheet's entry is a full snapshot (data, at base_version) plus a log of the small
+        changes published since; once max_changes pile up, the next publisher folds them
+        into a new snapshot.
+        """
+        self.path = path
+        self.max_changes = max_changes
+        self.conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS sheets ('
+            'name TEXT PRIMARY KEY, version INTEGER NOT NULL, timestamp REAL, data TEXT, base_version INTEGER)'
+        )
+        if 'base_version' not in [row[1] for row in self.conn.execute('PRAGMA table_info(sheets)')]:
+            # Files from before the change log: their snapshots are at their current version
+            self.conn.execute('ALTER TABLE sheets ADD COLUMN base_version INTEGER')
+            self.conn.execute('UPDATE sheets SET base_version = version')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS changes ('
+            'name TEXT NOT NULL, version INTEGER NOT NULL, change TEXT NOT NULL, PRIMARY KEY (name, version))'
+        )
+
+    def version(self, sheet_name: str) -> Optional[int]:
+        """Current version of a sheet's shared entry, or None if nobody has cached it"""
+        row = self.conn.execute(
+            'SELECT version FROM sheets WHERE name = ? AND data IS NOT NULL', (sheet_name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def load(self, sheet_name: str) -> Optional[Tuple[int, float, List[Dict]]]:
+        """(version, timestamp, data) of a sheet's snapshot; changes_since(version) brings it up to date"""
+        row = self.conn.execute(
+            'SELECT base_version, timestamp, data FROM sheets WHERE name = ? AND data IS NOT NULL', (sheet_name,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def changes_since(self, sheet_name: str, version: int) -> Optional[Tuple[int, float, List[Dict]]]:
+        """(version, timestamp, changes) published after `version`, oldest first.
+        
+        None if the entry was invalidated or its snapshot is newer than `version` (the
+        older changes were folded away): the caller loads the snapshot instead.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN')
+        try:
+            row = cursor.execute(
+                'SELECT version, timestamp, base_version FROM sheets WHERE name = ? AND data IS NOT NULL', (sheet_name,)
+            ).fetchone()
+            if row is None or row[2] > version:
+                return None
+            changes = [json.loads(change) for change, in cursor.execute(
+                'SELECT change FROM changes WHERE name = ? AND version > ? ORDER BY version', (sheet_name, version)
+            )]
+            return row[0], row[1], changes
+        finally:
+            cursor.execute('COMMIT')
+
+    def store(self, sheet_name: str, data: List[Dict], timestamp: Optional[float] = None,
+              expected_version: Optional[int] = None) -> Optional[int]:
+        """Publish a sheet's full data (a new snapshot) and return its new version.
+
+        With expected_version, the write only succeeds if no other worker published in between
+        (returns None on conflict, so the caller can drop its copy instead of clobbering theirs).
+        """
+        payload = json.dumps(data, default=str)
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            row = cursor.execute('SELECT version FROM sheets WHERE name = ?', (sheet_name,)).fetchone()
+            current = row[0] if row else 0
+            if expected_version is not None and current != expected_version:
+                cursor.execute('COMMIT')
+                return None
+            cursor.execute(
+                'INSERT INTO sheets (name, version, timestamp, data, base_version) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET version = excluded.version, '
+                'timestamp = excluded.timestamp, data = excluded.data, base_version = excluded.base_version',
+                (sheet_name, current + 1, timestamp or time.time(), payload, current + 1)
+            )
+            cursor.execute('DELETE FROM changes WHERE name = ?', (sheet_name,))
+            cursor.execute('COMMIT')
+            return current + 1
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+
+    def publish_change(self, sheet_name: str, change: Dict[str, Any], timestamp: float, expected_version: int,
+                       snapshot: Callable[[], List[Dict]]) -> Optional[int]:
+        """Append a change to a sheet's log and return its new version.
+        
+        Only succeeds if the entry is still at expected_version (None otherwise, as in store).
+        snapshot() gives the data with the change applied; it is only called, and written,
+        when the log is due to be folded into a new snapshot.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            row = cursor.execute(
+                'SELECT version, base_version FROM sheets WHERE name = ? AND data IS NOT NULL', (sheet_name,)
+            ).fetchone()
+            if row is None or row[0] != expected_version:
+                cursor.execute('COMMIT')
+                return None
+            version = row[0] + 1
+            if version - row[1] >= self.max_changes:
+                cursor.execute(
+                    'UPDATE sheets SET version = ?, base_version = ?, timestamp = ?, data = ? WHERE name = ?',
+                    (version, version, timestamp, json.dumps(snapshot(), default=str), sheet_name)
+                )
+                cursor.execute('DELETE FROM changes WHERE name = ?', (sheet_name,))
+            else:
+                cursor.execute('UPDATE sheets SET version = ?, timestamp = ? WHERE name = ?', (version, timestamp, sheet_name))
+                cursor.execute('INSERT INTO changes (name, version, change) VALUES (?, ?, ?)',
+                               (sheet_name, version, json.dumps(change, default=str)))
+            cursor.execute('COMMIT')
+            return version
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+
+    def invalidate(self, sheet_name: str):
+        """Drop a sheet's data and bump its version so every worker notices"""
+        self.conn.execute('BEGIN IMMEDIATE')
+        self.conn.execute(
+            'INSERT INTO sheets (name, version, timestamp, data) VALUES (?, 1, NULL, NULL) '
+            'ON CONFLICT(name) DO UPDATE SET version = version + 1, timestamp = NULL, data = NULL',
+            (sheet_name,)
+        )
+        self.conn.execute('DELETE FROM changes WHERE name = ?', (sheet_name,))
+        self.conn.execute('COMMIT')
+
+    def clear(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        self.conn.execute('UPDATE sheets SET version = version + 1, timestamp = NULL, data = NULL')
+        self.conn.execute('DELETE FROM changes')
+        self.conn.execute('COMMIT')
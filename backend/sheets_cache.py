@@ -1,35 +1,540 @@
 """Simple cache for Google Sheets to avoid API quota limits"""
+import sys
+import uuid
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from itertools import count
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from shared_cache import SharedCacheStore
+from change_probe import ChangeProbe
+
+def approximate_size(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """Deep sys.getsizeof of an object graph, skipping objects already in seen (which is updated).
+    
+    Objects with a memory_roots() method are measured through the objects it returns instead,
+    so views onto shared registries only count their own part.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    pending = deque([obj])
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            pending.extend(item)
+        elif hasattr(item, 'memory_roots'):
+            pending.extend(item.memory_roots())
+            continue
+        elif hasattr(item, '__dict__') and not isinstance(item, type):
+            pending.append(vars(item))
+        total += sys.getsizeof(item)
+    return total
+
+def record_size(record: Dict) -> int:
+    """Approximate bytes one flat record adds to a sheet's data (column names are shared by every row)"""
+    return sys.getsizeof(record) + sum(sys.getsizeof(value) for value in record.values())
 
 class SheetsCache:
-    def __init__(self, cache_duration_seconds: int = 30):
+    def __init__(self, cache_duration_seconds: int = 30, tombstone_field: str = 'eliminado',
+                 store: Optional[SharedCacheStore] = None, probe: Optional[ChangeProbe] = None,
+                 probe_interval_seconds: int = 5, memory_budget_bytes: int = 0):
         self.cache: Dict[str, Dict] = {}
         self.cache_duration = timedelta(seconds=cache_duration_seconds)
+        # Per-sheet overrides: {'ttl': timedelta, 'refresh': 'full' or 'tail'}
+        self.policies: Dict[str, Dict[str, Any]] = {}
+        # Optional cross-process store: fills, writes and invalidations are seen by every worker
+        self.store = store
+        # Rows with this field set are soft-deleted and never reach the cache
+        self.tombstone_field = tombstone_field
+        # Derived structures (indexes) rebuilt every time a sheet is cached
+        self.index_builders: Dict[str, Dict[str, Callable[[List[Dict]], Any]]] = {}
+        # Indexes that may be dropped to stay within the memory budget (rebuilt on next use)
+        self.evictable: Set[Tuple[str, str]] = set()
+        self.index_uses: Dict[Tuple[str, str], int] = {}  # (sheet, index) -> tick of last get_index
+        self.ticks = count()
+        # Approximate bytes of data plus indexes; 0 means unbounded. Only indexes are evicted
+        self.memory_budget = memory_budget_bytes
+        self.index_evictions = 0
+        # Optional change probe: expired entries are revalidated with it instead of reloaded
+        self.probe = probe
+        self.probe_interval = timedelta(seconds=probe_interval_seconds)
+        self.probe_token: Optional[str] = None
+        self.probed_at: Optional[datetime] = None
+        # Data version per sheet, advanced by every fill and write (the shared store's version when
+        # there is one); tokens from another process without a shared store never match this epoch
+        self.versions: Dict[str, int] = {}
+        self.epoch = 'shared' if store is not None else uuid.uuid4().hex[:8]
     
-    def get(self, sheet_name: str) -> Optional[List[Dict]]:
-        """Get cached data if available and not expired"""
-        if sheet_name in self.cache:
-            cached_data = self.cache[sheet_name]
-            if datetime.now() - cached_data['timestamp'] < self.cache_duration:
-                return cached_data['data']
+    def configure(self, cache_duration_seconds: Optional[int] = None, store: Optional[SharedCacheStore] = None,
+                  probe: Optional[ChangeProbe] = None, probe_interval_seconds: Optional[int] = None,
+                  memory_budget_bytes: Optional[int] = None):
+        """Apply settings read from the environment after import"""
+        if cache_duration_seconds is not None:
+            self.cache_duration = timedelta(seconds=cache_duration_seconds)
+        if memory_budget_bytes is not None:
+            self.memory_budget = memory_budget_bytes
+        if store is not None:
+            self.store = store
+            self.cache.clear()
+            self.versions.clear()
+            self.epoch = 'shared'
+        if probe is not None:
+            self.probe = probe
+        if probe_interval_seconds is not None:
+            self.probe_interval = timedelta(seconds=probe_interval_seconds)
+    
+    def set_policy(self, sheet_name: str, ttl_seconds: Optional[float] = None, refresh: Optional[str] = None):
+        """Override the TTL of one sheet, or how it is refreshed: 'full' reread or 'tail' (new rows only)"""
+        if refresh not in (None, 'full', 'tail'):
+            raise ValueError(f"Unknown refresh policy {refresh!r}")
+        policy = self.policies.setdefault(sheet_name, {})
+        if ttl_seconds is not None:
+            policy['ttl'] = timedelta(seconds=ttl_seconds)
+        if refresh is not None:
+            policy['refresh'] = refresh
+    
+    def ttl(self, sheet_name: str) -> timedelta:
+        return self.policies.get(sheet_name, {}).get('ttl', self.cache_duration)
+    
+    def refresh_policy(self, sheet_name: str) -> str:
+        return self.policies.get(sheet_name, {}).get('refresh', 'full')
+    
+    def get(self, sheet_name: str, revalidate: bool = False, token: Optional[str] = None) -> Optional[List[Dict]]:
+        """Get cached data if available and not expired.
+        
+        Expired data (or any data, with revalidate=True) is still returned when the change
+        probe reports no change since it was read. revalidate=True asks the probe now, past its
+        rate limit, unless the caller passes a token it has just probed itself. Without a probe,
+        revalidate=True always misses so the caller rereads.
+        """
+        if self.store is not None:
+            self._sync(sheet_name)
+        cached_data = self.cache.get(sheet_name)
+        if cached_data is None:
+            # Observed before the caller reads the sheet, so set() records a token no newer than the data
+            # (a caller passing a token has just probed it)
+            if token is None:
+                self.current_token()
+            return None
+        now = datetime.now()
+        if not revalidate and now - cached_data['timestamp'] < self.ttl(sheet_name):
+            return cached_data['data']
+        if self.probe is None:
+            return None
+        if token is None:
+            token = self.current_token(force=revalidate)
+        if token is not None and token == cached_data.get('token'):
+            cached_data['timestamp'] = now
+            return cached_data['data']
         return None
     
-    def set(self, sheet_name: str, data: List[Dict]):
-        """Cache data with timestamp"""
-        self.cache[sheet_name] = {
+    def peek(self, sheet_name: str) -> Optional[List[Dict]]:
+        """Cached data even if expired (what a tail refresh would extend), or None"""
+        if self.store is not None:
+            self._sync(sheet_name)
+        entry = self.cache.get(sheet_name)
+        return entry['data'] if entry is not None else None
+    
+    def current_token(self, force: bool = False) -> Optional[str]:
+        """Latest change token, asking the probe at most once per probe interval (or now, with force)"""
+        if self.probe is None:
+            return None
+        now = datetime.now()
+        if force or self.probed_at is None or now - self.probed_at >= self.probe_interval:
+            try:
+                self.probe_token = self.probe.token()
+            except Exception:
+                # Unknown: nothing revalidates until the probe answers again
+                self.probe_token = None
+            self.probed_at = now
+        return self.probe_token
+    
+    def set(self, sheet_name: str, data: List[Dict]) -> List[Dict]:
+        """Cache live (not tombstoned) data with timestamp, build its registered indexes and return it"""
+        data = [record for record in data if not self.is_tombstoned(record)]
+        timestamp = datetime.now()
+        version = self.store.store(sheet_name, data, timestamp.timestamp()) if self.store is not None else None
+        self._put(sheet_name, data, timestamp, version, self.probe_token)
+        return data
+    
+    def _put(self, sheet_name: str, data: List[Dict], timestamp: datetime, version: Optional[int],
+             token: Optional[str] = None):
+        self._advance(sheet_name, version)
+        entry = {
             'data': data,
-            'timestamp': datetime.now()
+            'timestamp': timestamp,
+            'version': version,
+            # Change token seen before this data was read (entries from other workers have none)
+            'token': token,
+            'indexes': {},
+            # Approximate bytes, measured when first needed: data (None until then) is kept current by
+            # writes, an index is measured again after a rebuild (incremental updates keep its size)
+            'size': {'data': None, 'indexes': {}}
+        }
+        self.cache[sheet_name] = entry
+        for index_name in self.index_builders.get(sheet_name, {}):
+            self._build_index(sheet_name, entry, index_name)
+        self._enforce_budget()
+    
+    def _sync(self, sheet_name: str):
+        """Pick up fills, writes and invalidations made by other workers.
+        
+        Writes arrive as a log of changes, replayed onto the cached entry; only fills
+        (and entries too far behind) are loaded in full.
+        """
+        version = self.store.version(sheet_name)
+        if version is None:
+            self.cache.pop(sheet_name, None)
+            return
+        entry = self.cache.get(sheet_name)
+        if entry is not None and entry['version'] == version:
+            return
+        if entry is not None and entry['version'] is not None and self._replay(sheet_name, entry):
+            return
+        loaded = self.store.load(sheet_name)
+        if loaded is None:
+            self.cache.pop(sheet_name, None)
+            return
+        version, timestamp, data = loaded
+        self._put(sheet_name, data, datetime.fromtimestamp(timestamp), version)
+        if not self._replay(sheet_name, self.cache[sheet_name]):
+            # Folded into a newer snapshot meanwhile: the next read loads that one
+            self.cache.pop(sheet_name, None)
+    
+    def _replay(self, sheet_name: str, entry: Dict) -> bool:
+        """Apply the changes published after the entry's version; False if they are not available"""
+        published = self.store.changes_since(sheet_name, entry['version'])
+        if published is None:
+            return False
+        version, timestamp, changes = published
+        for change in changes:
+            if change.get('append'):
+                self._extend(sheet_name, entry, change['append'])
+            if (change.get('update') or change.get('remove')) and \
+                    not self._apply_changes(sheet_name, entry, change.get('update', []), change.get('remove', [])):
+                return False
+        entry['version'] = version
+        entry['timestamp'] = datetime.fromtimestamp(timestamp)
+        self._advance(sheet_name, version)
+        return True
+    
+    def _entry_for_write(self, sheet_name: str) -> Optional[Dict]:
+        if self.store is not None:
+            self._sync(sheet_name)
+        return self.cache.get(sheet_name)
+    
+    def _publish(self, sheet_name: str, entry: Dict, change: Dict[str, List]):
+        """Share an in-place change ({'append': records, 'update': records, 'remove': ids}) as a
+        delta; if another worker published first, drop the entry everywhere"""
+        if self.store is None:
+            self._advance(sheet_name)
+            return
+        version = self.store.publish_change(sheet_name, change, entry['timestamp'].timestamp(),
+                                            expected_version=entry['version'], snapshot=lambda: entry['data'])
+        if version is None:
+            self.invalidate(sheet_name)
+        else:
+            entry['version'] = version
+            self._advance(sheet_name, version)
+    
+    def _advance(self, sheet_name: str, version: Optional[int] = None):
+        current = self.versions.get(sheet_name, 0)
+        self.versions[sheet_name] = max(current, version) if version is not None else current + 1
+    
+    def version(self, sheet_name: str) -> int:
+        """Data version of a sheet in this cache (0 until first filled)"""
+        return self.versions.get(sheet_name, 0)
+    
+    def version_token(self, sheet_name: str) -> str:
+        """Opaque token for the sheet's current data version, handed to clients after a write"""
+        return f"{sheet_name}:{self.epoch}:{self.version(sheet_name)}"
+    
+    def is_fresh(self, sheet_name: str, min_version: Optional[str]) -> bool:
+        """Whether the cached sheet includes every write made before min_version was issued.
+        
+        Tokens for other sheets are always satisfied; unreadable tokens and tokens from another
+        epoch never are, so the caller rereads.
+        """
+        if not min_version:
+            return True
+        parts = min_version.rsplit(':', 2)
+        if len(parts) != 3 or not parts[2].isdigit():
+            return False
+        sheet, epoch, version = parts
+        if sheet != sheet_name:
+            return True
+        return epoch == self.epoch and sheet_name in self.cache and self.version(sheet_name) >= int(version)
+
+    def expires_within(self, sheet_name: str, seconds: float) -> bool:
+        """Whether the sheet is not cached or its entry expires in the next `seconds`"""
+        entry = self.cache.get(sheet_name)
+        if entry is None:
+            return True
+        return datetime.now() + timedelta(seconds=seconds) - entry['timestamp'] >= self.ttl(sheet_name)
+
+    def is_tombstoned(self, record: Dict) -> bool:
+        return bool(str(record.get(self.tombstone_field, '')).strip())
+    
+    def register_index(self, sheet_name: str, index_name: str, builder: Callable[[List[Dict]], Any],
+                       evictable: bool = False):
+        """Register a builder for a derived structure over a sheet's records.
+        
+        Evictable indexes may be dropped when the cache is over its memory budget and are
+        rebuilt by the next get_index; only self-contained indexes (read through get_index
+        alone) should be evictable.
+        """
+        self.index_builders.setdefault(sheet_name, {})[index_name] = builder
+        if evictable:
+            self.evictable.add((sheet_name, index_name))
+        # Build it right away for data that is already cached
+        if sheet_name in self.cache:
+            self._build_index(sheet_name, self.cache[sheet_name], index_name)
+    
+    def _build_index(self, sheet_name: str, entry: Dict, index_name: str):
+        entry['indexes'][index_name] = self.index_builders[sheet_name][index_name](entry['data'])
+        entry['size']['indexes'].pop(index_name, None)
+    
+    def get_index(self, sheet_name: str, index_name: str) -> Optional[Any]:
+        """Get a derived index if its sheet is cached and not expired"""
+        if self.get(sheet_name) is None:
+            return None
+        entry = self.cache[sheet_name]
+        if index_name not in entry['indexes'] and index_name in self.index_builders.get(sheet_name, {}):
+            # Evicted under the memory budget
+            self._build_index(sheet_name, entry, index_name)
+            self._enforce_budget(keep=(sheet_name, index_name))
+        self.index_uses[(sheet_name, index_name)] = next(self.ticks)
+        return entry['indexes'].get(index_name)
+    
+    def append_record(self, sheet_name: str, record: Dict):
+        """Append a written record to the cached sheet instead of invalidating it"""
+        entry = self._entry_for_write(sheet_name)
+        if entry is None:
+            return
+        entry['data'].append(record)
+        self._resize(entry, added=[record])
+        self._refresh_indexes(sheet_name, entry, old=None, new=record)
+        self._publish(sheet_name, entry, {'append': [record]})
+    
+    def append_records(self, sheet_name: str, records: List[Dict]):
+        """append_record for a batch, refreshing indexes and publishing once"""
+        entry = self._entry_for_write(sheet_name)
+        if entry is None:
+            return
+        self._extend(sheet_name, entry, records)
+        self._publish(sheet_name, entry, {'append': records})
+    
+    def _extend(self, sheet_name: str, entry: Dict, records: List[Dict]):
+        records = [record for record in records if not self.is_tombstoned(record)]
+        entry['data'].extend(records)
+        self._resize(entry, added=records)
+        # Incremental indexes take the new rows one by one, the rest are rebuilt once
+        rebuild = []
+        for index_name, index in entry['indexes'].items():
+            if hasattr(index, 'add') and hasattr(index, 'remove'):
+                for record in records:
+                    index.add(record)
+            elif records:
+                rebuild.append(index_name)
+        for index_name in rebuild:
+            self._build_index(sheet_name, entry, index_name)
+    
+    def refresh_tail(self, sheet_name: str, read_tail: Callable[[List[Dict]], Optional[List[Dict]]]) -> bool:
+        """Refresh a cached (possibly expired) sheet by appending only its new rows.
+        
+        read_tail gets the cached records and returns the records added since, or None
+        when it cannot tell (then nothing changes and False is returned).
+        """
+        entry = self._entry_for_write(sheet_name)
+        if entry is None:
+            return False
+        new_records = read_tail(entry['data'])
+        if new_records is None:
+            return False
+        if new_records:
+            # A row appended here after the tail was read may be in both
+            known = {(str(record.get('id', '')), record.get('_row')) for record in entry['data']}
+            new_records = [record for record in new_records if (str(record.get('id', '')), record.get('_row')) not in known]
+        entry['timestamp'] = datetime.now()
+        entry['token'] = self.probe_token
+        if not new_records:
+            # Fresh again but unchanged: the version (and clients' tokens) stay valid
+            return True
+        self._extend(sheet_name, entry, new_records)
+        self._publish(sheet_name, entry, {'append': new_records})
+        return True
+    
+    def update_record(self, sheet_name: str, record_id: str, record: Dict):
+        """Replace a cached record by id, keeping its position (= sheet row)"""
+        entry = self._entry_for_write(sheet_name)
+        if entry is None:
+            return
+        for idx, cached in enumerate(entry['data']):
+            if record_id and str(cached.get('id', '')) == str(record_id):
+                entry['data'][idx] = record
+                self._resize(entry, added=[record], removed=[cached])
+                self._refresh_indexes(sheet_name, entry, old=cached, new=record)
+                self._publish(sheet_name, entry, {'update': [record]})
+                return
+        self.invalidate(sheet_name)
+    
+    def remove_record(self, sheet_name: str, record_id: str):
+        """Drop a cached record by id, mirroring a deleted sheet row"""
+        entry = self._entry_for_write(sheet_name)
+        if entry is None:
+            return
+        for idx, cached in enumerate(entry['data']):
+            if record_id and str(cached.get('id', '')) == str(record_id):
+                del entry['data'][idx]
+                self._resize(entry, removed=[cached])
+                self._refresh_indexes(sheet_name, entry, old=cached, new=None)
+                self._publish(sheet_name, entry, {'remove': [record_id]})
+                return
+        self.invalidate(sheet_name)
+    
+    def apply_batch(self, sheet_name: str, updated: List[Dict], removed_ids: Iterable[str] = ()):
+        """update_record and remove_record for many records (matched by id) in one pass.
+        
+        Indexes are refreshed and the entry published once; if any of the records is not
+        cached, the sheet is invalidated instead.
+        """
+        entry = self._entry_for_write(sheet_name)
+        if entry is None:
+            return
+        removed_ids = list(removed_ids)
+        if not self._apply_changes(sheet_name, entry, updated, removed_ids):
+            self.invalidate(sheet_name)
+            return
+        self._publish(sheet_name, entry, {'update': updated, 'remove': removed_ids})
+    
+    def _apply_changes(self, sheet_name: str, entry: Dict, updated: List[Dict], removed_ids: Iterable[str]) -> bool:
+        """Replace and drop records by id in one pass; False (entry untouched) if any is not cached"""
+        updated_by_id = {str(record.get('id', '')): record for record in updated}
+        removed = {str(record_id) for record_id in removed_ids}
+        changes, data = [], []
+        for cached in entry['data']:
+            record_id = str(cached.get('id', ''))
+            if record_id and record_id in removed:
+                changes.append((cached, None))
+            elif record_id and record_id in updated_by_id:
+                changes.append((cached, updated_by_id[record_id]))
+                data.append(updated_by_id[record_id])
+            else:
+                data.append(cached)
+        if len(changes) != len(updated_by_id.keys() | removed):
+            return False
+        entry['data'] = data
+        self._resize(entry, added=[new for _, new in changes if new is not None], removed=[old for old, _ in changes])
+        rebuild = []
+        for index_name, index in entry['indexes'].items():
+            if hasattr(index, 'add') and hasattr(index, 'remove'):
+                for old, new in changes:
+                    index.remove(old)
+                    if new is not None:
+                        index.add(new)
+            else:
+                rebuild.append(index_name)
+        for index_name in rebuild:
+            self._build_index(sheet_name, entry, index_name)
+        return True
+    
+    def _refresh_indexes(self, sheet_name: str, entry: Dict, old: Optional[Dict], new: Optional[Dict]):
+        # Indexes with add/remove are maintained incrementally, the rest are rebuilt
+        for index_name, index in entry['indexes'].items():
+            if hasattr(index, 'add') and hasattr(index, 'remove'):
+                if old is not None:
+                    index.remove(old)
+                if new is not None:
+                    index.add(new)
+            else:
+                self._build_index(sheet_name, entry, index_name)
+    
+    @staticmethod
+    def _resize(entry: Dict, added: Iterable[Dict] = (), removed: Iterable[Dict] = ()):
+        """Adjust a measured entry's data size for written records instead of measuring it again"""
+        size = entry['size']
+        if size['data'] is not None:
+            size['data'] += sum(map(record_size, added)) - sum(map(record_size, removed))
+    
+    def _measure(self, entry: Dict) -> Dict[str, Any]:
+        """Approximate bytes of an entry's data and of each index (beyond the records they share).
+        
+        Only what has not been measured yet is walked: the data after a fill, indexes after a rebuild.
+        """
+        size = entry['size']
+        if size['data'] is None:
+            size['data'] = approximate_size(entry['data'])
+        unmeasured = [name for name in entry['indexes'] if name not in size['indexes']]
+        if unmeasured:
+            # Records and their values are counted with the data
+            seen = {id(item) for record in entry['data'] for item in (record, *record.values())}
+            for name in unmeasured:
+                size['indexes'][name] = approximate_size(entry['indexes'][name], seen)
+        return size
+    
+    def memory_used(self) -> int:
+        total = 0
+        for entry in self.cache.values():
+            size = self._measure(entry)
+            total += size['data'] + sum(size['indexes'].values())
+        return total
+    
+    def _enforce_budget(self, keep: Optional[Tuple[str, str]] = None):
+        """Drop evictable indexes, least recently used first, until within the memory budget"""
+        if not self.memory_budget:
+            return
+        used = self.memory_used()
+        candidates = sorted(((sheet_name, index_name) for sheet_name, entry in self.cache.items()
+                             for index_name in entry['indexes']
+                             if (sheet_name, index_name) in self.evictable and (sheet_name, index_name) != keep),
+                            key=lambda key: self.index_uses.get(key, -1))
+        for sheet_name, index_name in candidates:
+            if used <= self.memory_budget:
+                break
+            entry = self.cache[sheet_name]
+            used -= self._measure(entry)['indexes'].pop(index_name, 0)
+            del entry['indexes'][index_name]
+            self.index_evictions += 1
+    
+    def footprint(self) -> Dict[str, Any]:
+        """Approximate memory use per cached sheet, the budget and policies, for capacity planning"""
+        now = datetime.now()
+        sheets = {}
+        for sheet_name, entry in self.cache.items():
+            size = self._measure(entry)
+            sheets[sheet_name] = {
+                'records': len(entry['data']),
+                'data_bytes': size['data'],
+                'index_bytes': dict(size['indexes']),
+                'evicted_indexes': sorted(set(self.index_builders.get(sheet_name, {})) - set(entry['indexes'])),
+                'age_seconds': round((now - entry['timestamp']).total_seconds(), 1),
+                'ttl_seconds': self.ttl(sheet_name).total_seconds(),
+                'refresh': self.refresh_policy(sheet_name)
+            }
+        return {
+            'total_bytes': sum(sheet['data_bytes'] + sum(sheet['index_bytes'].values()) for sheet in sheets.values()),
+            'budget_bytes': self.memory_budget,
+            'index_evictions': self.index_evictions,
+            'sheets': sheets
         }
     
     def invalidate(self, sheet_name: str):
         """Remove cached data for a sheet"""
         if sheet_name in self.cache:
             del self.cache[sheet_name]
+        if self.store is not None:
+            self.store.invalidate(sheet_name)
     
     def clear(self):
         """Clear all cache"""
         self.cache.clear()
+        if self.store is not None:
+            self.store.clear()
 
 # Global cache instance - 60 seconds to balance quota and freshness
 sheets_cache = SheetsCache(cache_duration_seconds=60)
@@ -0,0 +1,154 @@
+"""Background replication of SQLite writes to the Google Sheets tabs (SQLite mode)"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = 'sheets_mirror'
+
+class SheetsMirror:
+    def __init__(self, path: str, sheets: Storage, batch_size: int = 50, lease_seconds: float = 60,
+                 clock: Callable[[], float] = time.time):
+        """Replay the SQLite outbox at `path` (created by SQLiteStorage) to `sheets` (a SheetsStorage).
+
+        Every worker may run a mirror: a lease row in the SQLite file lets one process at a
+        time replicate and compact, and another takes over once it expires.
+        """
+        self.sheets = sheets
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.clock = clock
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Own connection: replication runs in a worker thread, never on the event loop
+        self.conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def pending(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    def claim_lease(self) -> bool:
+        """Take or renew the replication lease; False while another process holds it"""
+        now = self.clock()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.conn.execute('SELECT holder, expires_at FROM leases WHERE name = ?', (LEASE_NAME,)).fetchone()
+            claimed = row is None or row[0] == self.holder or row[1] <= now
+            if claimed:
+                self.conn.execute('INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)',
+                                  (LEASE_NAME, self.holder, now + self.lease_seconds))
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+        return claimed
+
+    def _sheet_row(self, table: str, row_seq: int) -> Optional[int]:
+        row = self.conn.execute(
+            'SELECT row FROM sheet_rows WHERE table_name = ? AND row_seq = ?', (table, row_seq)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _done(self, seq: int, sql: str, params: tuple):
+        """Record where an entry landed in the sheet and drop it from the outbox, in one transaction"""
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.execute(sql, params)
+            self.conn.execute('DELETE FROM outbox WHERE seq = ?', (seq,))
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+
+    def _apply(self, seq: int, table: str, op: str, row_seq: int, record: Dict, retried: bool):
+        row = self._sheet_row(table, row_seq)
+        # The id lets the sheet side check the row still holds this record before writing
+        current = {'_row': row, **({'id': record['id']} if record.get('id') is not None else {})}
+        if op == 'delete':
+            if row is not None:
+                # Idempotent: a record already gone from the sheet is skipped
+                self.sheets.delete(table, current, record['deleted_at'])
+            self._done(seq, 'DELETE FROM sheet_rows WHERE table_name = ? AND row_seq = ?', (table, row_seq))
+            return
+        stored = None
+        if op == 'update' and row is not None:
+            try:
+                # The row may have moved (compaction); update() finds it again by id
+                stored = self.sheets.update(table, current, record)
+            except ValueError:
+                pass  # deleted from the sheet by hand: write it again below
+        if stored is None and retried and record.get('id') is not None:
+            # An earlier attempt may have reached the sheet before the process stopped
+            found = next((r for r in self.sheets.read_all(table) if str(r.get('id', '')) == str(record['id'])), None)
+            if found is not None:
+                stored = found if op == 'insert' else self.sheets.update(table, found, record)
+        if stored is None:
+            # Inserts, and updates of rows the sheet never received
+            stored = self.sheets.insert(table, record)
+        self._done(seq, 'INSERT OR REPLACE INTO sheet_rows (table_name, row_seq, row) VALUES (?, ?, ?)',
+                   (table, row_seq, stored['_row']))
+
+    def replicate_once(self) -> int:
+        """Push up to batch_size queued writes, oldest first; returns how many were pushed.
+
+        Nothing is pushed unless this process holds the lease (renewed before each write).
+        Each entry is marked attempted before its Sheets write, so after a crash its replay
+        checks the sheet by id instead of appending the row twice.
+        """
+        with self.lock:
+            entries = self.conn.execute(
+                'SELECT seq, table_name, op, row_seq, record, attempted FROM outbox ORDER BY seq LIMIT ?', (self.batch_size,)
+            ).fetchall()
+            pushed = 0
+            for seq, table, op, row_seq, record, attempted in entries:
+                if not self.claim_lease():
+                    break
+                if not attempted:
+                    self.conn.execute('UPDATE outbox SET attempted = 1 WHERE seq = ?', (seq,))
+                # Stop at the first failure so writes reach the sheet in order
+                self._apply(seq, table, op, row_seq, json.loads(record), retried=bool(attempted))
+                pushed += 1
+            return pushed
+
+    def compact(self, table: str) -> Dict:
+        """Compact a tab and re-learn where each SQLite row now lives (lease holder only)"""
+        with self.lock:
+            if not self.claim_lease():
+                return {"success": False, "removed": 0, "reason": "another process holds the mirror lease"}
+            result = self.sheets.compact(table)
+            if result.get('removed'):
+                rows_by_id = {str(r.get('id', '')): r['_row'] for r in self.sheets.read_all(table) if r.get('id')}
+                self.conn.execute('BEGIN IMMEDIATE')
+                self.conn.execute('DELETE FROM sheet_rows WHERE table_name = ?', (table,))
+                for row_seq, record_id in self.conn.execute(f'SELECT seq, id FROM "{table}"').fetchall():
+                    if str(record_id) in rows_by_id:
+                        self.conn.execute(
+                            'INSERT INTO sheet_rows (table_name, row_seq, row) VALUES (?, ?, ?)',
+                            (table, row_seq, rows_by_id[str(record_id)])
+                        )
+                self.conn.execute('COMMIT')
+            return result
+
+    async def run(self, interval_seconds: float = 5):
+        """Replicate forever; back off while Sheets is failing (quota, network)"""
+        delay = interval_seconds
+        while True:
+            try:
+                pushed = await asyncio.to_thread(self.replicate_once)
+                delay = interval_seconds
+                if pushed:
+                    logger.info(f"Replicated {pushed} writes to Sheets")
+                    continue
+            except Exception as e:
+                logger.error(f"Error replicating to Sheets: {str(e)}")
+                delay = min(delay * 2, 300)
+            await asyncio.sleep(delay)
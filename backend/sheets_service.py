@@ -1,7 +1,11 @@
 import gspread
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from gspread.utils import absolute_range_name, numericise_all, to_records
 from google.oauth2.service_account import Credentials
 from typing import List, Dict, Optional
+from attendance_shards import shard_year
 import os
+import threading
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).parent
@@ -12,6 +16,14 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive'
 ]
 
+# Soft-delete marker column: deleted rows keep their place so row numbers stay stable
+TOMBSTONE_COLUMN = 'eliminado'
+
+# Rows remembered per sheet to detect in-place edits before trusting a tail read
+TAIL_SAMPLE_ROWS = 8
+# Tail reads allowed before a full reload anyway (catches edits the samples missed)
+TAIL_READS_PER_FULL_READ = 20
+
 class SheetsService:
     def __init__(self):
         """Initialize Google Sheets connection with Service Account"""
@@ -26,13 +38,38 @@ class SheetsService:
             
             # Define expected headers for each sheet to avoid duplicate empty column issues
             self.expected_headers = {
-                'Miembros': ['id', 'nombre', 'apellido', 'direccion', 'fecha_nacimiento', 'telefono', 'fecha_registro'],
-                'Amigos': ['id', 'nombre', 'de_donde_viene', 'fecha_registro'],
+                'Miembros': ['id', 'nombre', 'apellido', 'direccion', 'fecha_nacimiento', 'telefono', 'fecha_registro', TOMBSTONE_COLUMN],
+                'Amigos': ['id', 'nombre', 'de_donde_viene', 'fecha_registro', TOMBSTONE_COLUMN],
                 'Asistencia': ['tipo', 'person_id', 'person_name', 'fecha', 'presente', 'id', 'created_at']
             }
+            self.list_shards()
+            # Per sheet: header, sampled raw rows and tail reads since the last full read
+            self.snapshots: Dict[str, Dict] = {}
+            # Row-numbered writes and compaction take turns: compaction moves rows under them
+            self.write_lock = threading.RLock()
         except Exception as e:
             raise Exception(f"Failed to initialize Sheets service: {str(e)}")
     
+    def list_shards(self) -> List[str]:
+        """Re-list the attendance year shards ('Asistencia_2026'), which share the Asistencia headers"""
+        shards = [worksheet.title for worksheet in self.spreadsheet.worksheets() if shard_year(worksheet.title) is not None]
+        for title in set(self.expected_headers) - set(shards):
+            if shard_year(title) is not None:
+                del self.expected_headers[title]
+        for title in shards:
+            self.expected_headers.setdefault(title, list(self.expected_headers['Asistencia']))
+        return shards
+    
+    def ensure_sheet(self, sheet_name: str, template: str):
+        """Create a tab with the headers of `template` if it does not exist (attendance shards)"""
+        headers = list(self.expected_headers[template])
+        try:
+            self.get_worksheet(sheet_name)
+        except ValueError:
+            worksheet = self.spreadsheet.add_worksheet(title=sheet_name, rows=1000, cols=len(headers))
+            worksheet.update([headers], f"A1:{chr(64 + len(headers))}1", value_input_option='RAW')
+        self.expected_headers[sheet_name] = headers
+    
     def get_worksheet(self, sheet_name: str):
         """Get worksheet by name with error handling"""
         try:
@@ -43,38 +80,149 @@ class SheetsService:
             raise Exception(f"Error accessing worksheet: {str(e)}")
     
     # READ Operations
+    def _to_records(self, sheet_name: str, header: List, rows: List[List], first_row: int = 2) -> List[Dict]:
+        """Turn raw rows into records like get_all_records, tagged with their row number in '_row'"""
+        expected = self.expected_headers.get(sheet_name)
+        if expected is not None and not all(h in header for h in expected):
+            raise ValueError(f"Sheet '{sheet_name}' is missing headers: {set(expected) - set(header)}")
+        values = [numericise_all(self._pad(row, len(header))) for row in rows]
+        cleaned_records = []
+        for idx, record in enumerate(to_records(header, values), start=first_row):
+            # Filter out empty string keys (unnamed columns)
+            cleaned_record = {k: v for k, v in record.items() if k != ''}
+            cleaned_record['_row'] = idx
+            cleaned_records.append(cleaned_record)
+        return cleaned_records
+    
+    @staticmethod
+    def _pad(row: List, width: int) -> List:
+        return list(row[:width]) + [''] * (width - len(row))
+    
+    def _remember(self, sheet_name: str, header: List, rows: List[List]):
+        """Snapshot a full read: the header plus a few evenly spaced rows (always the first and last)"""
+        count = len(rows)
+        picks = {0, count - 1} | {i * count // TAIL_SAMPLE_ROWS for i in range(TAIL_SAMPLE_ROWS)} if count else set()
+        self.snapshots[sheet_name] = {
+            'header': list(header),
+            'samples': {i + 2: self._pad(rows[i], len(header)) for i in picks},
+            'tail_reads': 0,
+            # Last sheet row this process has read (full read or tail reads); the next tail starts below it
+            'last_row': count + 1
+        }
+    
     def read_all(self, sheet_name: str) -> List[Dict]:
-        """Read all records from a sheet"""
+        """Read all records from a sheet, tagging each with its sheet row number in '_row'"""
+        return self.read_many([sheet_name])[sheet_name]
+    
+    def read_many(self, sheet_names: List[str]) -> Dict[str, List[Dict]]:
+        """Read several sheets in one values_batch_get request (a single consistent snapshot)"""
         try:
-            worksheet = self.get_worksheet(sheet_name)
-            # Use expected_headers if defined to avoid issues with empty duplicate columns
-            if sheet_name in self.expected_headers:
-                records = worksheet.get_all_records(expected_headers=self.expected_headers[sheet_name])
-            else:
-                records = worksheet.get_all_records()
+            response = self.spreadsheet.values_batch_get([absolute_range_name(name) for name in sheet_names])
+            result = {}
+            for name, value_range in zip(sheet_names, response.get('valueRanges', [])):
+                rows = value_range.get('values', [])
+                if not rows or not rows[0]:
+                    result[name] = []
+                    self.snapshots.pop(name, None)
+                    continue
+                result[name] = self._to_records(name, rows[0], rows[1:])
+                self._remember(name, rows[0], rows[1:])
+            return result
+        except Exception as e:
+            raise Exception(f"Batch read error: {str(e)}")
+    
+    def read_tail(self, sheet_name: str) -> Optional[List[Dict]]:
+        """Records below the last row read so far, or None if the sheet may have changed above it
+        (do a full read).
+        
+        One request fetches the header, the sampled rows and the tail; any difference in
+        the header or a sampled row (an in-place edit, a deleted row) means the tail
+        cannot be trusted. Rows this process appended itself are returned too: they were
+        written, not read.
+        """
+        snapshot = self.snapshots.get(sheet_name)
+        if snapshot is None or snapshot['tail_reads'] >= TAIL_READS_PER_FULL_READ:
+            return None
+        last_row = snapshot['last_row']
+        try:
+            name = absolute_range_name(sheet_name)
+            header = snapshot['header']
+            end_col = chr(64 + len(header))
+            sampled = sorted(row for row in snapshot['samples'] if row <= last_row)
+            ranges = [f"{name}!A1:{end_col}1", f"{name}!A{last_row + 1}:{end_col}"]
+            ranges += [f"{name}!A{row}:{end_col}{row}" for row in sampled]
+            value_ranges = self.spreadsheet.values_batch_get(ranges).get('valueRanges', [])
             
-            # Filter out empty string keys from each record
-            cleaned_records = []
-            for record in records:
-                cleaned_record = {k: v for k, v in record.items() if k != ''}
-                cleaned_records.append(cleaned_record)
+            def rows_of(value_range):
+                return value_range.get('values', [])
             
-            return cleaned_records
+            current_header = rows_of(value_ranges[0])
+            if not current_header or self._pad(current_header[0], len(header)) != header:
+                return None
+            for row, value_range in zip(sampled, value_ranges[2:]):
+                values = rows_of(value_range)
+                if self._pad(values[0] if values else [], len(header)) != snapshot['samples'][row]:
+                    return None
+            
+            tail = rows_of(value_ranges[1])
+            snapshot['tail_reads'] += 1
+            if tail:
+                # Also watch the newest row from now on
+                snapshot['samples'][last_row + len(tail)] = self._pad(tail[-1], len(header))
+                snapshot['last_row'] = last_row + len(tail)
+            return self._to_records(sheet_name, header, tail, first_row=last_row + 1)
         except Exception as e:
-            raise Exception(f"Read error: {str(e)}")
+            if 'grid limits' in str(e):
+                # The tail starts past the sheet's last row: nothing new (still a tail read)
+                snapshot['tail_reads'] += 1
+                return []
+            raise Exception(f"Tail read error: {str(e)}")
+    
+    def change_token(self) -> str:
+        """Drive version of the spreadsheet (bumped by every edit, by us or by hand)"""
+        try:
+            response = self.spreadsheet.client.request(
+                'get', f"{DRIVE_FILES_API_V3_URL}/{self.spreadsheet_id}",
+                params={'fields': 'version,modifiedTime', 'supportsAllDrives': True}
+            )
+            metadata = response.json()
+            return str(metadata.get('version') or metadata['modifiedTime'])
+        except Exception as e:
+            raise Exception(f"Change probe error: {str(e)}")
+    
+    @staticmethod
+    def is_tombstoned(record: Dict) -> bool:
+        """True if the record was soft-deleted"""
+        return bool(str(record.get(TOMBSTONE_COLUMN, '')).strip())
     
     def find_row_by_id(self, sheet_name: str, record_id: str) -> Optional[Dict]:
-        """Find a record by ID"""
+        """Find a live (not soft-deleted) record by ID"""
         try:
             records = self.read_all(sheet_name)
-            for idx, record in enumerate(records, start=2):  # Start at 2 (header is row 1)
-                if str(record.get('id', '')) == str(record_id):
-                    record['_row'] = idx
+            for record in records:
+                if str(record.get('id', '')) == str(record_id) and not self.is_tombstoned(record):
                     return record
             return None
         except Exception as e:
             raise Exception(f"Find error: {str(e)}")
     
+    def row_ids(self, sheet_name: str, row_numbers: List[int]) -> Dict[int, str]:
+        """The 'id' cell of each row (one request), to check rows still hold the records read earlier"""
+        rows = sorted(set(row_numbers))
+        if not rows:
+            return {}
+        try:
+            name = absolute_range_name(sheet_name)
+            col = chr(65 + self.expected_headers[sheet_name].index('id'))
+            value_ranges = self.spreadsheet.values_batch_get([f"{name}!{col}{row}" for row in rows]).get('valueRanges', [])
+            return {row: str(value_range['values'][0][0]) if value_range.get('values') else ''
+                    for row, value_range in zip(rows, value_ranges)}
+        except Exception as e:
+            if 'grid limits' in str(e):
+                # The sheet shrank below some of these rows (compacted): none can be trusted
+                return {}
+            raise Exception(f"Row id read error: {str(e)}")
+    
     # CREATE Operation
     def append_row(self, sheet_name: str, values: List) -> Dict:
         """Append a new row to the sheet in the first columns"""
@@ -109,6 +257,22 @@ class SheetsService:
         except Exception as e:
             raise Exception(f"Append error: {str(e)}")
     
+    def append_rows(self, sheet_name: str, rows: List[List]) -> Dict:
+        """Append many rows with a single range write (grows the grid first if needed)"""
+        try:
+            worksheet = self.get_worksheet(sheet_name)
+            num_cols = len(self.expected_headers[sheet_name])
+            first_row = len(worksheet.col_values(1)) + 1
+            last_row = first_row + len(rows) - 1
+            if last_row > worksheet.row_count:
+                worksheet.add_rows(last_row - worksheet.row_count)
+            values = [self._pad(list(row), num_cols) for row in rows]
+            cell_range = f"A{first_row}:{chr(64 + num_cols)}{last_row}"
+            worksheet.update(values, cell_range, value_input_option='USER_ENTERED')
+            return {"success": True, "first_row": first_row, "rows": len(rows), "range": cell_range}
+        except Exception as e:
+            raise Exception(f"Append rows error: {str(e)}")
+    
     # UPDATE Operation
     def update_row(self, sheet_name: str, row_number: int, values: List) -> Dict:
         """Update an entire row by row number"""
@@ -122,18 +286,114 @@ class SheetsService:
                 values.extend([''] * (num_cols - len(values)))
             cell_range = f"A{row_number}:{chr(64 + num_cols)}{row_number}"
             worksheet.update([values], cell_range, value_input_option='USER_ENTERED')
+            self._forget_row(sheet_name, row_number)
             return {"success": True, "row": row_number}
         except Exception as e:
             raise Exception(f"Update row error: {str(e)}")
     
-    # DELETE Operation
+    def update_rows(self, sheet_name: str, rows: Dict[int, List]) -> Dict:
+        """Overwrite several whole rows (row number -> values) in one batch request"""
+        try:
+            worksheet = self.get_worksheet(sheet_name)
+            num_cols = len(self.expected_headers[sheet_name])
+            data = [{'range': f"A{row_number}:{chr(64 + num_cols)}{row_number}", 'values': [self._pad(list(values), num_cols)]}
+                    for row_number, values in rows.items()]
+            if data:
+                worksheet.batch_update(data, value_input_option='USER_ENTERED')
+            for row_number in rows:
+                self._forget_row(sheet_name, row_number)
+            return {"success": True, "rows": len(data)}
+        except Exception as e:
+            raise Exception(f"Update rows error: {str(e)}")
+    
+    def _forget_row(self, sheet_name: str, row_number: int):
+        """Our own in-place write: stop comparing that row (it no longer matches the snapshot)"""
+        snapshot = self.snapshots.get(sheet_name)
+        if snapshot is not None:
+            snapshot['samples'].pop(row_number, None)
+    
+    # DELETE Operations
     def delete_row(self, sheet_name: str, row_number: int) -> Dict:
-        """Delete a specific row"""
+        """Delete a specific row (shifts every later row up; prefer tombstone_row)"""
         try:
             worksheet = self.get_worksheet(sheet_name)
             worksheet.delete_rows(row_number)
+            self.snapshots.pop(sheet_name, None)  # every later row moved up
             return {"success": True, "deleted_row": row_number}
         except Exception as e:
             raise Exception(f"Delete row error: {str(e)}")
+    
+    def delete_rows(self, sheet_name: str, row_numbers: List[int]) -> Dict:
+        """Delete several rows in one batch request, bottom-up so pending row numbers stay valid"""
+        try:
+            worksheet = self.get_worksheet(sheet_name)
+            requests = [{'deleteDimension': {'range': {
+                'sheetId': worksheet.id, 'dimension': 'ROWS', 'startIndex': row_number - 1, 'endIndex': row_number
+            }}} for row_number in sorted(set(row_numbers), reverse=True)]
+            if requests:
+                self.spreadsheet.batch_update({'requests': requests})
+                self.snapshots.pop(sheet_name, None)
+            return {"success": True, "deleted_rows": len(requests)}
+        except Exception as e:
+            raise Exception(f"Delete rows error: {str(e)}")
+    
+    def tombstone_row(self, sheet_name: str, row_number: int, deleted_at: str) -> Dict:
+        """Soft-delete a row with a single cell write in the tombstone column"""
+        try:
+            worksheet = self.get_worksheet(sheet_name)
+            col = self.expected_headers[sheet_name].index(TOMBSTONE_COLUMN) + 1
+            worksheet.update([[deleted_at]], f"{chr(64 + col)}{row_number}", value_input_option='RAW')
+            self._forget_row(sheet_name, row_number)
+            return {"success": True, "tombstoned_row": row_number}
+        except Exception as e:
+            raise Exception(f"Tombstone row error: {str(e)}")
+    
+    def tombstone_rows(self, sheet_name: str, row_numbers: List[int], deleted_at: str) -> Dict:
+        """tombstone_row for several rows in one batch request"""
+        try:
+            worksheet = self.get_worksheet(sheet_name)
+            col = chr(64 + self.expected_headers[sheet_name].index(TOMBSTONE_COLUMN) + 1)
+            data = [{'range': f"{col}{row_number}", 'values': [[deleted_at]]} for row_number in row_numbers]
+            if data:
+                worksheet.batch_update(data, value_input_option='RAW')
+            for row_number in row_numbers:
+                self._forget_row(sheet_name, row_number)
+            return {"success": True, "tombstoned_rows": len(data)}
+        except Exception as e:
+            raise Exception(f"Tombstone rows error: {str(e)}")
+    
+    def compact(self, sheet_name: str) -> Dict:
+        """Physically remove tombstoned rows: rewrite live rows in one range write, then drop the tail.
+        
+        Holds write_lock so no row-numbered write of this process lands mid-rewrite, and gives
+        up (success False) if the spreadsheet changed between the read and the rewrite, since
+        rewriting would then drop someone else's edit.
+        """
+        try:
+            with self.write_lock:
+                worksheet = self.get_worksheet(sheet_name)
+                token = self.change_token()
+                rows = worksheet.get_all_values()
+                if not rows:
+                    return {"success": True, "removed": 0}
+                header = rows[0]
+                col = header.index(TOMBSTONE_COLUMN)
+                live = [row for row in rows[1:] if not (len(row) > col and row[col].strip())]
+                removed = len(rows) - 1 - len(live)
+                if removed == 0:
+                    return {"success": True, "removed": 0}
+                if self.change_token() != token:
+                    return {"success": False, "removed": 0, "reason": "sheet changed while compacting"}
+                
+                num_cols = len(header)
+                if live:
+                    values = [row[:num_cols] + [''] * (num_cols - len(row)) for row in live]
+                    # RAW: the cells are written back exactly as read, not parsed again (leading zeros, dates)
+                    worksheet.update(values, f"A2:{chr(64 + num_cols)}{len(live) + 1}", value_input_option='RAW')
+                worksheet.delete_rows(len(live) + 2, len(rows))
+                self.snapshots.pop(sheet_name, None)
+                return {"success": True, "removed": removed, "rows": len(live)}
+        except Exception as e:
+            raise Exception(f"Compact error: {str(e)}")
 
 sheets_service = SheetsService()
\ No newline at end of file
@@ -0,0 +1,451 @@
+"""Storage backends for members (Miembros), friends (Amigos) and attendance (Asistencia).
+
+Every backend stores the same flat records (the Google Sheets columns) and returns them in
+insertion order; the cache and its indexes sit on top of whichever backend is configured.
+"""
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from attendance_shards import base_table, shard_year
+
+TOMBSTONE_COLUMN = 'eliminado'
+
+# Data columns of each table (the Sheets headers, minus the soft-delete column)
+TABLE_COLUMNS = {
+    'Miembros': ['id', 'nombre', 'apellido', 'direccion', 'fecha_nacimiento', 'telefono', 'fecha_registro'],
+    'Amigos': ['id', 'nombre', 'de_donde_viene', 'fecha_registro'],
+    'Asistencia': ['tipo', 'person_id', 'person_name', 'fecha', 'presente', 'id', 'created_at']
+}
+
+class Storage(ABC):
+    """Interface shared by the Sheets, Mongo and SQLite backends.
+
+    Tables are the keys of TABLE_COLUMNS plus attendance year shards ('Asistencia_2026'),
+    which have the Asistencia columns and are created on first use (ensure_table).
+    Every method blocks (network or disk): the server calls them from worker threads, so
+    backends must be safe to use from several threads at once.
+    """
+    name = 'base'
+    # True if reading several tables from different threads at once is safe and faster
+    concurrent_reads = False
+
+    def list_tables(self) -> List[str]:
+        """Every existing table, including attendance shards"""
+        return list(TABLE_COLUMNS)
+
+    def ensure_table(self, table: str):
+        """Create a table (an attendance shard) if it does not exist yet"""
+
+    @abstractmethod
+    def read_all(self, table: str) -> List[Dict]:
+        """All live (not deleted) records of a table, in insertion order"""
+
+    def read_many(self, tables: List[str]) -> Dict[str, List[Dict]]:
+        """read_all of several tables; backends that can fetch them in one request override this"""
+        return {table: self.read_all(table) for table in tables}
+
+    def read_tail(self, table: str, cached: List[Dict]) -> Optional[List[Dict]]:
+        """Live records added after `cached` (an earlier read_all), or None if a full read is needed"""
+        return None
+
+    @abstractmethod
+    def insert(self, table: str, record: Dict) -> Dict:
+        """Store a new record and return it as it should be cached"""
+
+    def insert_many(self, table: str, records: List[Dict]) -> List[Dict]:
+        """Store several new records; backends override this with a single bulk write"""
+        return [self.insert(table, record) for record in records]
+
+    @abstractmethod
+    def update(self, table: str, current: Dict, record: Dict) -> Dict:
+        """Overwrite `current` (a record returned by this backend) with `record`"""
+
+    @abstractmethod
+    def delete(self, table: str, current: Dict, deleted_at: str):
+        """Delete `current` (a record returned by this backend)"""
+
+    def update_many(self, table: str, changes: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """update() for several (current, record) pairs; backends override this with a single batch"""
+        return [self.update(table, current, record) for current, record in changes]
+
+    def delete_many(self, table: str, currents: List[Dict], deleted_at: str) -> bool:
+        """delete() for several records.
+
+        Returns True when the deletion moved other records (rows shifted up), so records
+        returned earlier by this backend can no longer be used for updates and must be reread.
+        """
+        for current in currents:
+            self.delete(table, current, deleted_at)
+        return False
+
+    def compact(self, table: str) -> Dict:
+        """Physically drop soft-deleted records, if the backend keeps any"""
+        return {"success": True, "removed": 0}
+
+class SheetsStorage(Storage):
+    """Google Sheets: one tab per table, records carry their sheet row number in '_row'"""
+    name = 'sheets'
+
+    def __init__(self, service=None):
+        if service is None:
+            from sheets_service import sheets_service as service
+        self.service = service
+
+    def _values(self, table: str, record: Dict) -> List:
+        return [record.get(column, '') for column in self.service.expected_headers[table]]
+
+    def list_tables(self) -> List[str]:
+        self.service.list_shards()
+        return list(self.service.expected_headers)
+
+    def ensure_table(self, table: str):
+        if table not in self.service.expected_headers:
+            self.service.ensure_sheet(table, base_table(table))
+
+    @staticmethod
+    def _live(records: List[Dict]) -> List[Dict]:
+        return [r for r in records if not str(r.get(TOMBSTONE_COLUMN, '')).strip()]
+
+    def read_all(self, table: str) -> List[Dict]:
+        return self._live(self.service.read_all(table))
+
+    def read_many(self, tables: List[str]) -> Dict[str, List[Dict]]:
+        # One values_batch_get round-trip for every tab
+        return {table: self._live(records) for table, records in self.service.read_many(tables).items()}
+
+    def read_tail(self, table: str, cached: List[Dict]) -> Optional[List[Dict]]:
+        # Rows below the last one the service read. That tail also holds the rows this process
+        # appended since (already in `cached`, with their '_row'), which are left out here
+        if cached and '_row' not in cached[-1]:
+            return None
+        tail = self.service.read_tail(table)
+        if not tail:
+            return tail
+        known = {record.get('_row') for record in cached}
+        return [record for record in self._live(tail) if record['_row'] not in known]
+
+    def _current_rows(self, table: str, currents: List[Dict]) -> List[Optional[int]]:
+        """Where each record is now: its '_row' if that row still holds its id, else where a fresh
+        read finds it (None if it is gone).
+
+        Compaction in another worker, or a hand edit, can move rows after they were read.
+        Callers hold service.write_lock, so this process cannot move them in between.
+        """
+        ids = self.service.row_ids(table, [current['_row'] for current in currents if 'id' in current])
+        # Without an id (an old mirror entry) there is nothing to check the row against
+        rows = [current['_row'] if 'id' not in current or ids.get(current['_row']) == str(current['id']) else None
+                for current in currents]
+        if None in rows:
+            fresh = {str(r.get('id', '')): r['_row'] for r in self.read_all(table)}
+            rows = [row if row is not None else fresh.get(str(current.get('id', '')))
+                    for row, current in zip(rows, currents)]
+        return rows
+
+    def _require_rows(self, table: str, currents: List[Dict]) -> List[int]:
+        rows = self._current_rows(table, currents)
+        missing = [current.get('id') for current, row in zip(currents, rows) if row is None]
+        if missing:
+            raise ValueError(f"Records no longer in '{table}': {missing}")
+        return rows
+
+    def insert(self, table: str, record: Dict) -> Dict:
+        self.ensure_table(table)
+        with self.service.write_lock:
+            result = self.service.append_row(table, self._values(table, record))
+        return {**record, '_row': result['row']}
+
+    def insert_many(self, table: str, records: List[Dict]) -> List[Dict]:
+        if not records:
+            return []
+        self.ensure_table(table)
+        # One range write for the whole batch
+        with self.service.write_lock:
+            result = self.service.append_rows(table, [self._values(table, record) for record in records])
+        return [{**record, '_row': result['first_row'] + idx} for idx, record in enumerate(records)]
+
+    def update(self, table: str, current: Dict, record: Dict) -> Dict:
+        with self.service.write_lock:
+            row, = self._require_rows(table, [current])
+            self.service.update_row(table, row, self._values(table, record))
+        return {**record, '_row': row}
+
+    def delete(self, table: str, current: Dict, deleted_at: str):
+        with self.service.write_lock:
+            row, = self._current_rows(table, [current])
+            if row is None:
+                return  # already deleted
+            if TOMBSTONE_COLUMN in self.service.expected_headers[table]:
+                # Soft delete: one cell write, later rows keep their row numbers
+                self.service.tombstone_row(table, row, deleted_at)
+            else:
+                self.service.delete_row(table, row)
+
+    def update_many(self, table: str, changes: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        if not changes:
+            return []
+        with self.service.write_lock:
+            rows = self._require_rows(table, [current for current, _ in changes])
+            # One batch request for every row
+            self.service.update_rows(table, {row: self._values(table, record) for row, (_, record) in zip(rows, changes)})
+        return [{**record, '_row': row} for row, (_, record) in zip(rows, changes)]
+
+    def delete_many(self, table: str, currents: List[Dict], deleted_at: str) -> bool:
+        if not currents:
+            return False
+        with self.service.write_lock:
+            rows = [row for row in self._current_rows(table, currents) if row is not None]
+            if TOMBSTONE_COLUMN in self.service.expected_headers[table]:
+                self.service.tombstone_rows(table, rows, deleted_at)
+                return False
+            # No tombstone column (attendance): rows are really deleted and later rows move up
+            self.service.delete_rows(table, rows)
+        return True
+
+    def compact(self, table: str) -> Dict:
+        if TOMBSTONE_COLUMN not in self.service.expected_headers[table]:
+            return super().compact(table)
+        return self.service.compact(table)
+
+class MongoStorage(Storage):
+    """MongoDB (pymongo or mongomock database): one collection per table, keyed by 'id'"""
+    name = 'mongo'
+    concurrent_reads = True
+    collections = {'Miembros': 'members', 'Amigos': 'visitors', 'Asistencia': 'attendance'}
+
+    def __init__(self, db):
+        self.db = db
+
+    def _collection(self, table: str):
+        # Attendance shards: 'Asistencia_2026' -> 'attendance_2026'
+        year = shard_year(table)
+        return self.db[self.collections[base_table(table)] + (f'_{year}' if year is not None else '')]
+
+    def list_tables(self) -> List[str]:
+        shards = [f'Asistencia_{name[len("attendance_"):]}' for name in self.db.list_collection_names()
+                  if name.startswith('attendance_')]
+        return list(TABLE_COLUMNS) + [table for table in shards if shard_year(table) is not None]
+
+    @staticmethod
+    def _normalize(doc: Dict) -> Dict:
+        # Older documents (server_mongodb_backup.py) store booleans and datetimes
+        record = {}
+        for key, value in doc.items():
+            if isinstance(value, bool):
+                value = 'TRUE' if value else 'FALSE'
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            record[key] = value
+        return record
+
+    def read_all(self, table: str) -> List[Dict]:
+        return [self._normalize(doc) for doc in self._collection(table).find({}, {'_id': 0})]
+
+    def insert(self, table: str, record: Dict) -> Dict:
+        self._collection(table).insert_one(dict(record))  # insert_one adds '_id' to the dict it gets
+        return dict(record)
+
+    def update(self, table: str, current: Dict, record: Dict) -> Dict:
+        self._collection(table).update_one({'id': current['id']}, {'$set': dict(record)})
+        return dict(record)
+
+    def insert_many(self, table: str, records: List[Dict]) -> List[Dict]:
+        if records:
+            self._collection(table).insert_many([dict(record) for record in records])
+        return [dict(record) for record in records]
+
+    def delete(self, table: str, current: Dict, deleted_at: str):
+        self._collection(table).delete_one({'id': current['id']})
+
+    def update_many(self, table: str, changes: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        if changes:
+            from pymongo import UpdateOne
+            self._collection(table).bulk_write([UpdateOne({'id': current['id']}, {'$set': dict(record)})
+                                                for current, record in changes])
+        return [dict(record) for _, record in changes]
+
+    def delete_many(self, table: str, currents: List[Dict], deleted_at: str) -> bool:
+        if currents:
+            self._collection(table).delete_many({'id': {'$in': [current['id'] for current in currents]}})
+        return False
+
+class SQLiteStorage(Storage):
+    """Embedded SQLite database (WAL mode); records carry their row id in '_seq'.
+
+    Every write is also queued in an outbox table in the same transaction, so a
+    SheetsMirror can replay it to Google Sheets in the background.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # One connection shared by the server's worker threads: one statement or transaction at a time
+        self.lock = threading.RLock()
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.tables = set()
+        for table in TABLE_COLUMNS:
+            self.ensure_table(table)
+        # attempted: the mirror started writing this entry to Sheets (it may have landed)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS outbox ('
+            'seq INTEGER PRIMARY KEY AUTOINCREMENT, table_name TEXT NOT NULL, op TEXT NOT NULL, '
+            'row_seq INTEGER NOT NULL, record TEXT NOT NULL, attempted INTEGER NOT NULL DEFAULT 0)'
+        )
+        if 'attempted' not in [row[1] for row in self.conn.execute('PRAGMA table_info(outbox)')]:
+            self.conn.execute('ALTER TABLE outbox ADD COLUMN attempted INTEGER NOT NULL DEFAULT 0')
+        # Where each SQLite row lives in its Sheets tab (filled by the import and the mirror)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS sheet_rows ('
+            'table_name TEXT NOT NULL, row_seq INTEGER NOT NULL, row INTEGER NOT NULL, PRIMARY KEY (table_name, row_seq))'
+        )
+        # Time-limited locks shared by every process using this file (the Sheets mirror's)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+
+    def ensure_table(self, table: str):
+        if table in self.tables:
+            return
+        column_defs = ', '.join(f'{column} TEXT' for column in TABLE_COLUMNS[base_table(table)])
+        with self.lock:
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" (seq INTEGER PRIMARY KEY AUTOINCREMENT, {column_defs})')
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_id" ON "{table}" (id)')
+            if base_table(table) == 'Asistencia':
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_fecha" ON "{table}" (fecha)')
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_person_id" ON "{table}" (person_id)')
+        self.tables.add(table)
+
+    def list_tables(self) -> List[str]:
+        with self.lock:
+            names = [row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        return list(TABLE_COLUMNS) + sorted(name for name in names if shard_year(name) is not None)
+
+    @contextmanager
+    def _transaction(self):
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+
+    def _enqueue(self, table: str, op: str, row_seq: int, record: Dict):
+        self.conn.execute(
+            'INSERT INTO outbox (table_name, op, row_seq, record) VALUES (?, ?, ?, ?)',
+            (table, op, row_seq, json.dumps(record, default=str))
+        )
+
+    def _row_values(self, table: str, record: Dict) -> List:
+        return ['' if record.get(column) is None else str(record.get(column)) for column in TABLE_COLUMNS[base_table(table)]]
+
+    def read_all(self, table: str) -> List[Dict]:
+        self.ensure_table(table)
+        columns = TABLE_COLUMNS[base_table(table)]
+        with self.lock:
+            rows = self.conn.execute(f'SELECT seq, {", ".join(columns)} FROM "{table}" ORDER BY seq').fetchall()
+        return [{**{column: row[column] for column in columns}, '_seq': row['seq']} for row in rows]
+
+    def _insert_row(self, table: str, record: Dict) -> int:
+        self.ensure_table(table)
+        columns = TABLE_COLUMNS[base_table(table)]
+        cursor = self.conn.execute(
+            f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES ({", ".join("?" for _ in columns)})',
+            self._row_values(table, record)
+        )
+        return cursor.lastrowid
+
+    def insert(self, table: str, record: Dict) -> Dict:
+        with self._transaction():
+            row_seq = self._insert_row(table, record)
+            self._enqueue(table, 'insert', row_seq, record)
+        return {**record, '_seq': row_seq}
+
+    def insert_many(self, table: str, records: List[Dict]) -> List[Dict]:
+        stored = []
+        with self._transaction():
+            for record in records:
+                row_seq = self._insert_row(table, record)
+                self._enqueue(table, 'insert', row_seq, record)
+                stored.append({**record, '_seq': row_seq})
+        return stored
+
+    def update(self, table: str, current: Dict, record: Dict) -> Dict:
+        columns = TABLE_COLUMNS[base_table(table)]
+        with self._transaction():
+            self.conn.execute(
+                f'UPDATE "{table}" SET {", ".join(f"{column} = ?" for column in columns)} WHERE seq = ?',
+                self._row_values(table, record) + [current['_seq']]
+            )
+            self._enqueue(table, 'update', current['_seq'], record)
+        return {**record, '_seq': current['_seq']}
+
+    def delete(self, table: str, current: Dict, deleted_at: str):
+        with self._transaction():
+            self.conn.execute(f'DELETE FROM "{table}" WHERE seq = ?', (current['_seq'],))
+            self._enqueue(table, 'delete', current['_seq'], {'deleted_at': deleted_at, 'id': current.get('id')})
+
+    def update_many(self, table: str, changes: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        columns = TABLE_COLUMNS[base_table(table)]
+        with self._transaction():
+            for current, record in changes:
+                self.conn.execute(
+                    f'UPDATE "{table}" SET {", ".join(f"{column} = ?" for column in columns)} WHERE seq = ?',
+                    self._row_values(table, record) + [current['_seq']]
+                )
+                self._enqueue(table, 'update', current['_seq'], record)
+        return [{**record, '_seq': current['_seq']} for current, record in changes]
+
+    def delete_many(self, table: str, currents: List[Dict], deleted_at: str) -> bool:
+        with self._transaction():
+            for current in currents:
+                self.conn.execute(f'DELETE FROM "{table}" WHERE seq = ?', (current['_seq'],))
+                self._enqueue(table, 'delete', current['_seq'], {'deleted_at': deleted_at, 'id': current.get('id')})
+        return False
+
+    def is_empty(self) -> bool:
+        with self.lock:
+            return all(self.conn.execute(f'SELECT 1 FROM "{table}" LIMIT 1').fetchone() is None for table in self.list_tables())
+
+    def import_from(self, source: Storage, only_if_empty: bool = False) -> Optional[Dict[str, int]]:
+        """One-time copy of every table from another backend (e.g. the current Sheets tabs).
+
+        With only_if_empty, nothing is copied (None is returned) if the database already has
+        rows; the check and the copy share one transaction, so when several workers start at
+        once only the first one imports.
+        """
+        data = source.read_many(source.list_tables())
+        counts = {}
+        with self._transaction():
+            if only_if_empty and not self.is_empty():
+                return None
+            for table, records in data.items():
+                for record in records:
+                    row_seq = self._insert_row(table, record)
+                    if '_row' in record:
+                        self.conn.execute(
+                            'INSERT OR REPLACE INTO sheet_rows (table_name, row_seq, row) VALUES (?, ?, ?)',
+                            (table, row_seq, record['_row'])
+                        )
+                counts[table] = len(records)
+        return counts
+
+def create_storage(backend: str) -> Storage:
+    """Build the backend selected by STORAGE_BACKEND ('sheets', 'mongo' or 'sqlite')"""
+    if backend == 'sheets':
+        return SheetsStorage()
+    if backend == 'mongo':
+        from pymongo import MongoClient
+        return MongoStorage(MongoClient(os.environ['MONGO_URL'])[os.environ['DB_NAME']])
+    if backend == 'sqlite':
+        return SQLiteStorage(os.environ.get('SQLITE_PATH', os.path.join(os.path.dirname(__file__), 'asistencia.sqlite3')))
+    raise ValueError(f"Unknown storage backend '{backend}'")
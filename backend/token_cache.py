@@ -0,0 +1,36 @@
+"""Bounded LRU cache of verified JWTs so authenticated requests skip re-verifying the signature"""
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+class TokenCache:
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.entries: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()  # token -> (username, exp)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[str]:
+        """Username of a previously verified token, or None if unknown or expired"""
+        entry = self.entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        username, expires_at = entry
+        if time.time() >= expires_at:
+            # Expired tokens go back through jwt.decode, which reports the expiry
+            del self.entries[token]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(token)
+        self.hits += 1
+        return username
+
+    def put(self, token: str, username: str, expires_at: float):
+        self.entries[token] = (username, expires_at)
+        self.entries.move_to_end(token)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
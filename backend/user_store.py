@@ -0,0 +1,55 @@
+"""In-process cache of user documents in front of the Mongo users collection"""
+import time
+from typing import Dict, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+class UsernameTaken(Exception):
+    pass
+
+class UserStore:
+    def __init__(self, collection, ttl_seconds: float = 300):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.users: Dict[str, Tuple[float, Dict]] = {}  # username -> (cached at, document)
+        # Until the unique index is known to exist, create() checks for the username first
+        self.unique_index = False
+
+    async def ensure_indexes(self):
+        """Unique username index: lookups use it and concurrent registrations cannot both succeed"""
+        await self.collection.create_index("username", unique=True)
+        self.unique_index = True
+
+    async def get(self, username: str) -> Optional[Dict]:
+        """User document by username; at most one indexed query, none while cached"""
+        cached = self.users.get(username)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl_seconds:
+            return cached[1]
+        user = await self.collection.find_one({"username": username}, {"_id": 0})
+        if user is None:
+            # Not cached, so a registration made by another worker is seen right away
+            self.users.pop(username, None)
+            return None
+        self.users[username] = (time.monotonic(), user)
+        return user
+
+    async def create(self, doc: Dict) -> Dict:
+        """Insert a new user; raises UsernameTaken if the username already exists"""
+        if not self.unique_index:
+            try:
+                await self.ensure_indexes()
+            except Exception:
+                # Still no index (Mongo unreachable at startup, or duplicates already stored):
+                # the older check-then-insert, which two concurrent registrations can race
+                if await self.collection.find_one({"username": doc["username"]}, {"_id": 1}) is not None:
+                    raise UsernameTaken(doc["username"])
+        try:
+            await self.collection.insert_one(dict(doc))  # insert_one adds '_id' to the dict it gets
+        except DuplicateKeyError:
+            raise UsernameTaken(doc["username"])
+        self.users[doc["username"]] = (time.monotonic(), doc)
+        return doc
+
+    def invalidate(self, username: str):
+        """Forget a cached user (call after changing or removing it)"""
+        self.users.pop(username, None)
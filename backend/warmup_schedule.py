@@ -0,0 +1,65 @@
+"""Service windows ('sun 09:00-13:00, wed 18:30-21:00') and keeping the caches warm around them"""
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Awaitable, Callable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+def parse_windows(spec: str) -> List[Tuple[int, time, time]]:
+    """'sun 09:00-13:00, wed 18:30-21:00' -> [(weekday, start, end)], Monday being 0"""
+    windows = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        day, _, hours = item.partition(' ')
+        start, _, end = hours.strip().partition('-')
+        if day.lower()[:3] not in DAYS:
+            raise ValueError(f"Unknown day in service window {item!r}")
+        start, end = time.fromisoformat(start.strip()), time.fromisoformat(end.strip())
+        if end <= start:
+            raise ValueError(f"Service window {item!r} must end after it starts (same day)")
+        windows.append((DAYS.index(day.lower()[:3]), start, end))
+    return windows
+
+class WarmupSchedule:
+    def __init__(self, windows: List[Tuple[int, time, time]], lead_minutes: float = 15):
+        self.windows = windows
+        # Warming starts this long before each window and goes on until it ends
+        self.lead = timedelta(minutes=lead_minutes)
+
+    def _periods(self, today: date) -> Iterator[Tuple[datetime, datetime]]:
+        """(warm from, window end) for the windows from yesterday to a week ahead"""
+        for offset in range(-1, 8):
+            day = today + timedelta(days=offset)
+            for weekday, start, end in self.windows:
+                if day.weekday() == weekday:
+                    yield datetime.combine(day, start) - self.lead, datetime.combine(day, end)
+
+    def warming(self, now: datetime) -> bool:
+        """Whether now falls in a window or in the lead time before one"""
+        return any(start <= now < end for start, end in self._periods(now.date()))
+
+    def next_warmup(self, now: datetime) -> datetime:
+        """When warming should next be running: now while warming, else the next lead time"""
+        if self.warming(now):
+            return now
+        return min(start for start, _ in self._periods(now.date()) if start > now)
+
+    async def run(self, warm: Callable[[], Awaitable], interval_seconds: float, now: Callable[[], datetime]):
+        """Call warm() every interval_seconds while warming; sleep until the next window otherwise.
+
+        now() gives the local wall-clock time the windows are written in (naive datetime).
+        """
+        while True:
+            current = now()
+            if not self.warming(current):
+                # Capped so clock changes (DST) are noticed within the hour
+                wait = (self.next_warmup(current) - current).total_seconds()
+                await asyncio.sleep(min(wait, 3600))
+                continue
+            try:
+                await warm()
+            except Exception as e:
+                logger.error(f"Error warming caches: {str(e)}")
+            await asyncio.sleep(interval_seconds)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Authenticated-request throughput with and without the verified-token cache (backend/token_cache.py).
+
+Two levels are measured, each with the cache on and with it off (every check goes through
+jwt.decode): the auth dependency alone (get_current_user), and whole requests to a cheap
+authenticated endpoint (/api/cache/footprint) through the ASGI app with its middleware. No
+server process, Google Sheets or MongoDB access is involved.
+
+Usage:
+    python benchmarks/bench_auth.py
+    python benchmarks/bench_auth.py --checks 50000 --requests 5000 --tokens 50
+
+Exit status is 1 when the cache does not make the auth checks faster.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'backend'))
+
+def checks_per_second(server, tokens, checks):
+    """get_current_user calls per second, cycling through the tokens"""
+    from fastapi.security import HTTPAuthorizationCredentials
+    credentials = [HTTPAuthorizationCredentials(scheme='Bearer', credentials=token) for token in tokens]
+
+    async def run():
+        for i in range(checks):
+            await server.get_current_user(credentials[i % len(credentials)])
+    start = time.perf_counter()
+    asyncio.run(run())
+    return checks / (time.perf_counter() - start)
+
+def requests_per_second(server, tokens, requests):
+    """Sequential GET /api/cache/footprint requests per second through the ASGI app"""
+    import httpx
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            start = time.perf_counter()
+            for i in range(requests):
+                response = await client.get('/api/cache/footprint', headers={'Authorization': f'Bearer {tokens[i % len(tokens)]}'})
+                response.raise_for_status()
+            return requests / (time.perf_counter() - start)
+    return asyncio.run(run())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--checks', type=int, default=20000, help="auth dependency calls per run")
+    parser.add_argument('--requests', type=int, default=2000, help="whole requests per run")
+    parser.add_argument('--tokens', type=int, default=20, help="distinct users' tokens in rotation")
+    args = parser.parse_args()
+
+    # server.py reads these at import; the benchmark never opens a connection
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    os.environ.setdefault('DB_NAME', 'bench')
+    os.environ['STORAGE_BACKEND'] = 'mongo'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    import server
+    tokens = [server.create_access_token({'sub': f'user{i}'}) for i in range(args.tokens)]
+    cache_size = server.token_cache.max_size
+
+    results = {}
+    for label, max_size in (('jwt.decode', 0), ('cached', cache_size)):
+        server.token_cache.max_size = max_size
+        server.token_cache.clear()
+        results[label] = (checks_per_second(server, tokens, args.checks), requests_per_second(server, tokens, args.requests))
+        print(f"{label}: {results[label][0]:,.0f} auth checks/s, {results[label][1]:,.0f} requests/s", flush=True)
+    server.token_cache.max_size = cache_size
+
+    (checks_uncached, requests_uncached), (checks_cached, requests_cached) = results['jwt.decode'], results['cached']
+    print(f"speedup: {checks_cached / checks_uncached:.1f}x auth checks, {requests_cached / requests_uncached:.2f}x requests")
+    return 0 if checks_cached > checks_uncached else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
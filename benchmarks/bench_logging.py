@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Logging overhead per request: the queued pipeline (backend/log_pipeline.py) against synchronous writes.
+
+Each simulated request makes --lines INFO log calls with structured fields, as the request
+path does. Three setups are timed on the calling thread: the old synchronous text lines
+written to a file, the queue-based JSON pipeline, and the pipeline with --sample-rate
+sampling. Only the caller's cost is measured; the listener thread writes in the background.
+
+Usage:
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --requests 10000 --lines 20 --sample-rate 0.05
+
+Exit status is 1 when the sampled pipeline is not cheaper per request than synchronous writes.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'backend'))
+
+from log_pipeline import TEXT_FORMAT, current_route, setup_logging  # noqa: E402
+
+ROUTE = '/api/attendance/today'
+
+def microseconds_per_request(requests, lines):
+    log = logging.getLogger('bench')
+    token = current_route.set(ROUTE)
+    try:
+        start = time.perf_counter()
+        for i in range(requests):
+            for j in range(lines):
+                log.info("Checking record %s", j, extra={'fields': {'request': i}})
+        return (time.perf_counter() - start) / requests * 1e6
+    finally:
+        current_route.reset(token)
+
+def install(handler):
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--lines', type=int, default=10, help="INFO log calls per request")
+    parser.add_argument('--sample-rate', type=float, default=0.01, help=f"LOG_SAMPLE_RATES rate for {ROUTE}")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sync_handler = logging.FileHandler(os.path.join(tmp, 'sync.log'))
+        sync_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        install(sync_handler)
+        sync_us = microseconds_per_request(args.requests, args.lines)
+        sync_handler.close()
+
+        results = {'sync file': sync_us}
+        for label, sample_rates in (('queued', None), (f'queued+{args.sample_rate:.0%} sampling', {ROUTE: args.sample_rate})):
+            target = logging.FileHandler(os.path.join(tmp, 'queued.log'))
+            # Room for every record: time enqueueing, not dropping
+            listener = setup_logging(sample_rates=sample_rates, target=target, max_queue=args.requests * args.lines + 1)
+            results[label] = microseconds_per_request(args.requests, args.lines)
+            listener.stop()
+            target.close()
+        install(logging.NullHandler())
+
+    for label, us in results.items():
+        print(f"{label}: {us:.0f}us per request ({args.lines} lines)")
+    return 0 if list(results.values())[-1] < sync_us else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Microbenchmarks for the report and aggregation paths of backend/server.py.
+
+The endpoint functions are called directly with the cache pre-filled from an
+embedded SQLite store, so no Google Sheets or MongoDB access is involved. Datasets
+are generated from a fixed seed.
+
+Usage:
+    python benchmarks/bench_reports.py                      # compare with baselines.json
+    python benchmarks/bench_reports.py --update-baseline    # record new baselines
+    python benchmarks/bench_reports.py --sizes 1k,10k,100k,1m --threshold 0.3
+
+Exit status is 1 when a case is slower than its baseline by more than the threshold
+(default 25%, or BENCH_THRESHOLD) and by at least --min-delta-ms. Baselines are machine-specific: record them on
+the machine that runs the comparison.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'backend'))
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baselines.json'
+
+# name -> (attendance rows, people)
+SIZES = {
+    '1k': (1_000, 100),
+    '10k': (10_000, 1_000),
+    '100k': (100_000, 10_000),
+    '1m': (1_000_000, 50_000),
+}
+
+FIRST_SUNDAY = date(2019, 1, 6)
+
+def generate(attendance_rows, people, seed=42):
+    """Members (80%) and friends (20%), plus attendance spread over weekly services"""
+    rng = random.Random(seed)
+    members, friends = [], []
+    for i in range(people):
+        if i % 5:
+            birthday = date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 60))
+            members.append({
+                'id': f'm{i}', 'nombre': f'Nombre{i}', 'apellido': f'Apellido{i % 997}', 'direccion': f'{i} Main St',
+                'fecha_nacimiento': birthday.isoformat(), 'telefono': f'203555{i:04d}'[-10:],
+                'fecha_registro': '2019-01-06T10:00:00-05:00'
+            })
+        else:
+            friends.append({'id': f'f{i}', 'nombre': f'Amigo{i}', 'de_donde_viene': 'Bridgeport',
+                            'fecha_registro': '2019-01-06T10:00:00-05:00'})
+    people_ids = [('member', m['id']) for m in members] + [('friend', f['id']) for f in friends]
+    # About a third of the people come to each service
+    per_service = max(1, len(people_ids) // 3)
+    services = max(1, attendance_rows // per_service)
+    attendance = []
+    for n in range(attendance_rows):
+        fecha = (FIRST_SUNDAY + timedelta(weeks=n // per_service % services)).isoformat()
+        tipo, person_id = people_ids[rng.randrange(len(people_ids))]
+        attendance.append({
+            'tipo': tipo, 'person_id': person_id, 'person_name': person_id, 'fecha': fecha,
+            'presente': 'TRUE' if rng.random() < 0.85 else 'FALSE', 'id': f'a{n}',
+            'created_at': f'{fecha}T10:00:00-05:00'
+        })
+    return members, friends, attendance
+
+def load(server, db_path, members, friends, attendance):
+    """Store the dataset in SQLite and cache it exactly as the server would after a read"""
+    from storage import SQLiteStorage
+    storage = SQLiteStorage(db_path)
+    for table, records in (('Miembros', members), ('Amigos', friends), ('Asistencia', attendance)):
+        storage.insert_many(table, records)
+    server.storage = storage
+    server.sheets_cache.configure(cache_duration_seconds=24 * 3600)
+    server.sheets_cache.clear()
+    for table in ('Miembros', 'Amigos', 'Asistencia'):
+        server.sheets_cache.set(table, storage.read_all(table))
+    # Time the computation itself: repeated calls would otherwise be served by the report memo
+    server.report_cache.max_entries = 0
+    return storage
+
+def cases(server, attendance):
+    """(name, zero-argument coroutine function) for every hot path"""
+    last = attendance[-1]['fecha']
+    quarter_start = (date.fromisoformat(last) - timedelta(days=90)).isoformat()
+    year_start = (date.fromisoformat(last) - timedelta(days=365)).isoformat()
+    sample = attendance[len(attendance) // 2]
+    user = 'bench'
+
+    async def create_attendance_existing():
+        # Update path: the linear search for the person's row on that date, then one write
+        payload = server.AttendanceCreate(tipo=sample['tipo'], person_id=sample['person_id'], person_name='x',
+                                          fecha=sample['fecha'], presente=True)
+        return await server.create_attendance(payload, server.Response(), current_user=user)
+
+    return [
+        ('date_range_quarter', lambda: server.get_report_by_date_range(quarter_start, last, 'all', current_user=user)),
+        ('date_range_members_year', lambda: server.get_report_by_date_range(year_start, last, 'member', current_user=user)),
+        ('collective_year', lambda: server.get_collective_report(year_start, last, current_user=user)),
+        ('individual_all', lambda: server.get_individual_report(sample['person_id'], sample['tipo'], current_user=user)),
+        ('birthdays_month', lambda: server.get_birthdays_report('2026-03-01', '2026-03-31', current_user=user)),
+        ('dashboard', lambda: server.get_dashboard_stats(current_user=user)),
+        ('create_attendance_existing', create_attendance_existing),
+    ]
+
+def measure(loop, func, min_seconds=0.2, min_runs=3, max_runs=200):
+    """Median milliseconds per call, repeating until min_seconds have been spent"""
+    times = []
+    started = time.perf_counter()
+    while len(times) < min_runs or (time.perf_counter() - started < min_seconds and len(times) < max_runs):
+        start = time.perf_counter()
+        loop.run_until_complete(func())
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+def run_suite(sizes, min_seconds=0.2):
+    # server.py reads these at import; the benchmark never opens a connection
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    os.environ.setdefault('DB_NAME', 'bench')
+    os.environ['STORAGE_BACKEND'] = 'mongo'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    import server
+    results = {}
+    loop = asyncio.new_event_loop()
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            attendance_rows, people = SIZES[size]
+            members, friends, attendance = generate(attendance_rows, people)
+            load(server, os.path.join(tmp, f'bench-{size}.sqlite3'), members, friends, attendance)
+            for name, func in cases(server, attendance):
+                results[f'{name}[{size}]'] = round(measure(loop, func, min_seconds), 3)
+                print(f"{name}[{size}]: {results[f'{name}[{size}]']:.3f} ms", flush=True)
+    loop.close()
+    return results
+
+def compare(results, baselines, threshold, min_delta_ms=0.1):
+    """Cases slower than baseline * (1 + threshold): [(case, baseline ms, current ms)].
+
+    Differences under min_delta_ms are timer noise on the smallest cases and never count.
+    """
+    regressions = []
+    for case, current in results.items():
+        baseline = baselines.get(case)
+        if baseline is not None and current > baseline * (1 + threshold) and current - baseline >= min_delta_ms:
+            regressions.append((case, baseline, current))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1k,10k,100k', help=f"comma-separated subset of {', '.join(SIZES)}")
+    parser.add_argument('--threshold', type=float, default=float(os.environ.get('BENCH_THRESHOLD', '0.25')))
+    parser.add_argument('--min-delta-ms', type=float, default=0.1, help="ignore slowdowns smaller than this")
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--min-seconds', type=float, default=0.2, help="time spent per case (more = steadier)")
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    results = run_suite(sizes, args.min_seconds)
+
+    stored = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {'results': {}}
+    if args.update_baseline:
+        stored['results'].update(results)
+        stored['machine'] = {'python': platform.python_version(), 'platform': platform.platform(),
+                             'processor': platform.processor() or platform.machine()}
+        BASELINE_PATH.write_text(json.dumps(stored, indent=2, sort_keys=True) + '\n')
+        print(f"Baselines written to {BASELINE_PATH}")
+        return 0
+
+    regressions = compare(results, stored['results'], args.threshold, args.min_delta_ms)
+    for case, baseline, current in regressions:
+        print(f"REGRESSION {case}: {baseline:.3f} ms -> {current:.3f} ms (+{(current / baseline - 1) * 100:.0f}%)")
+    missing = [case for case in results if case not in stored['results']]
+    if missing:
+        print(f"No baseline for: {', '.join(missing)} (run with --update-baseline)")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Write and read throughput of the storage backends (backend/storage.py).
+
+Inserts people and attendance one record at a time, then times read_all of the
+attendance table. SQLite runs on a temporary file, Mongo over mongomock (skipped if it
+is not installed) and Sheets over the in-memory SheetsService stand-in of the tests, so
+the Sheets figures measure the adapter, not Google.
+
+Usage:
+    python benchmarks/bench_storage.py
+    python benchmarks/bench_storage.py --backends sqlite --people 5000 --attendance 50000
+
+Exit status is 1 when a backend is over the --max-write-seconds or --max-read-ms
+ceilings (generous by default: they catch accidental quadratic behaviour, not small
+slowdowns).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'backend'))
+sys.path.insert(0, str(ROOT))
+
+BACKENDS = ('sheets', 'mongo', 'sqlite')
+
+def make_storage(backend, tmp):
+    """A fresh, empty storage of the given backend, or None if it cannot run here"""
+    from storage import MongoStorage, SheetsStorage, SQLiteStorage
+    if backend == 'sheets':
+        from tests.helpers import FakeSheetsService
+        return SheetsStorage(FakeSheetsService())
+    if backend == 'sqlite':
+        return SQLiteStorage(os.path.join(tmp, 'asistencia.sqlite3'))
+    try:
+        import mongomock
+    except ImportError:
+        return None
+    return MongoStorage(mongomock.MongoClient()['bench_asistencia'])
+
+def run(storage, people, attendance, reads=10):
+    """(seconds for every insert, milliseconds per read_all of the attendance table)"""
+    from tests.helpers import make_attendance, make_member
+    start = time.perf_counter()
+    for i in range(people):
+        storage.insert('Miembros', make_member(id=f'm{i}'))
+    for i in range(attendance):
+        storage.insert('Asistencia', make_attendance(f'm{i % people}', f'2026-01-{i % 28 + 1:02d}'))
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(reads):
+        if len(storage.read_all('Asistencia')) != attendance:
+            raise AssertionError("read_all did not return every inserted row")
+    return write_seconds, (time.perf_counter() - start) / reads * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', default=','.join(BACKENDS), help=f"comma-separated subset of {', '.join(BACKENDS)}")
+    parser.add_argument('--people', type=int, default=500)
+    parser.add_argument('--attendance', type=int, default=2000)
+    parser.add_argument('--max-write-seconds', type=float, default=20)
+    parser.add_argument('--max-read-ms', type=float, default=2000)
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in (name.strip() for name in args.backends.split(',') if name.strip()):
+            storage = make_storage(backend, tmp)
+            if storage is None:
+                print(f"[{backend}] skipped (mongomock is not installed)")
+                continue
+            write_seconds, read_ms = run(storage, args.people, args.attendance)
+            print(f"[{backend}] {args.people + args.attendance} inserts: {write_seconds:.3f}s, "
+                  f"read_all of {args.attendance} rows: {read_ms:.1f}ms", flush=True)
+            if write_seconds > args.max_write_seconds or read_ms > args.max_read_ms:
+                print(f"TOO SLOW [{backend}]")
+                failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
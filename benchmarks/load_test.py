@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""Concurrent load generator for the attendance API.
+
+Simulates many devices at once: each virtual user runs a loop that picks a scenario
+from a weighted mix and calls the matching endpoints of a running server. Every
+endpoint the old sequential API tester covered is reachable from some scenario.
+At the end it reports throughput, latency percentiles and error rates per scenario.
+
+Usage:
+    python benchmarks/load_test.py --target http://localhost:8001 --smoke
+    python benchmarks/load_test.py --mix checkin --concurrency 50 --duration 60
+    python benchmarks/load_test.py --mix checkin=8,attendance_today=2,dashboard=1 --requests 5000
+
+--smoke runs every scenario once, one after another, and fails on any error (the
+functional check the old tester did). Otherwise the exit status is 1 when the error
+rate is above --max-error-rate. Setup registers a throwaway user (or logs in with
+--username/--password) and creates --people members and visitors to check in; they
+are deleted at the end unless --keep-data is given.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+import httpx
+
+DEFAULT_TARGET = os.environ.get('LOAD_TEST_URL', 'http://localhost:8001')
+
+class Session:
+    """One virtual user's view of the API: a shared client, the auth token and the seeded people"""
+
+    def __init__(self, client, token, members, visitors, rng):
+        self.client = client
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.members = members
+        self.visitors = visitors
+        self.rng = rng
+        self.created_members = []
+
+    async def call(self, method, path, **kwargs):
+        response = await self.client.request(method, f'/api/{path}', headers=self.headers, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def person(self):
+        """(tipo, person) for a random seeded member or visitor"""
+        if self.visitors and self.rng.random() < 0.2:
+            return 'visitor', self.rng.choice(self.visitors)
+        return 'member', self.rng.choice(self.members)
+
+    def date_range(self, days):
+        end = date.today()
+        return (end - timedelta(days=days)).isoformat(), end.isoformat()
+
+def person_name(tipo, person):
+    return person['nombre'] if tipo == 'visitor' else f"{person['nombre']} {person['apellido']}"
+
+# Scenarios: each is one user action, possibly several requests
+
+async def checkin(session):
+    tipo, person = session.person()
+    await session.call('POST', 'attendance', json={
+        'tipo': tipo, 'person_id': person['id'], 'person_name': person_name(tipo, person),
+        'fecha': date.today().isoformat(), 'presente': session.rng.random() < 0.9
+    })
+
+async def search_then_checkin(session):
+    tipo, person = session.person()
+    await session.call('GET', 'people/search', params={'q': person['nombre'][:4], 'limit': 10})
+    await checkin(session)
+
+async def attendance_today(session):
+    await session.call('GET', 'attendance/today')
+
+async def attendance_by_date(session):
+    await session.call('GET', 'attendance', params={'fecha': date.today().isoformat()})
+
+async def person_history(session):
+    tipo, person = session.person()
+    await session.call('GET', f"attendance/person/{person['id']}", params={'tipo': tipo})
+
+async def list_people(session):
+    await session.call('GET', 'members')
+    await session.call('GET', 'visitors')
+
+async def view_person(session):
+    tipo, person = session.person()
+    await session.call('GET', f"{'visitors' if tipo == 'visitor' else 'members'}/{person['id']}")
+
+async def edit_member(session):
+    member = session.rng.choice(session.members)
+    await session.call('PUT', f"members/{member['id']}", json={
+        **{k: member[k] for k in ('nombre', 'apellido', 'direccion', 'telefono')},
+        'fecha_nacimiento': member.get('fecha_nacimiento', '')
+    })
+
+async def register_member(session):
+    response = await session.call('POST', 'members', json=new_member(session.rng))
+    session.created_members.append(response.json()['id'])
+
+async def report_date_range(session):
+    start, end = session.date_range(90)
+    await session.call('GET', 'reports/by-date-range', params={'start': start, 'end': end, 'tipo': 'all'})
+
+async def report_individual(session):
+    tipo, person = session.person()
+    start, end = session.date_range(365)
+    await session.call('GET', f"reports/individual/{person['id']}", params={'tipo': tipo, 'start': start, 'end': end})
+
+async def report_collective(session):
+    start, end = session.date_range(365)
+    await session.call('GET', 'reports/collective', params={'start': start, 'end': end})
+
+async def birthdays(session):
+    start, end = session.date_range(30)
+    await session.call('GET', 'reports/birthdays', params={'start': start, 'end': end})
+    await session.call('GET', 'reports/birthdays/upcoming', params={'days': 30})
+
+async def dashboard(session):
+    await session.call('GET', 'dashboard/stats')
+
+SCENARIOS = {func.__name__: func for func in (
+    checkin, search_then_checkin, attendance_today, attendance_by_date, person_history, list_people,
+    view_person, edit_member, register_member, report_date_range, report_individual,
+    report_collective, birthdays, dashboard
+)}
+
+# Named weighted mixes; --mix also accepts "name=weight,..." directly
+MIXES = {
+    # Sunday morning: ushers on phones checking people in and watching today's list
+    'checkin': {'checkin': 6, 'search_then_checkin': 3, 'attendance_today': 2, 'dashboard': 1},
+    # Office hours: people and report browsing
+    'reports': {'report_date_range': 3, 'report_individual': 2, 'report_collective': 2, 'birthdays': 1,
+                'dashboard': 2, 'person_history': 1},
+    'mixed': {'checkin': 4, 'search_then_checkin': 2, 'attendance_today': 2, 'attendance_by_date': 1,
+              'person_history': 1, 'list_people': 1, 'view_person': 1, 'edit_member': 1, 'register_member': 1,
+              'report_date_range': 1, 'report_individual': 1, 'report_collective': 1, 'birthdays': 1,
+              'dashboard': 2},
+}
+
+def parse_mix(value):
+    """A named mix, or "scenario=weight,..." -> {scenario: weight}"""
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight) if weight else 1.0
+    return mix
+
+def new_member(rng):
+    suffix = uuid.uuid4().hex[:6]
+    birthday = date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 55))
+    return {
+        'nombre': f'Carga {suffix}', 'apellido': 'Prueba', 'direccion': f'{rng.randrange(1, 999)} Main St',
+        'fecha_nacimiento': birthday.isoformat(), 'telefono': f'203555{rng.randrange(10000):04d}'
+    }
+
+class Stats:
+    """Latencies (seconds) and failures per scenario"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.error_samples = {}
+
+    def record(self, scenario, seconds, error=None):
+        self.latencies.setdefault(scenario, []).append(seconds)
+        if error is not None:
+            self.errors[scenario] = self.errors.get(scenario, 0) + 1
+            self.error_samples.setdefault(scenario, error)
+
+    def summary(self, elapsed):
+        rows = {name: summarize(latencies, self.errors.get(name, 0), elapsed) for name, latencies in sorted(self.latencies.items())}
+        everything = [s for latencies in self.latencies.values() for s in latencies]
+        rows['TOTAL'] = summarize(everything, sum(self.errors.values()), elapsed)
+        return rows
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        'requests': count,
+        'errors': errors,
+        'error_rate': errors / count if count else 0.0,
+        'throughput': count / elapsed if elapsed else 0.0,
+        **{name: percentile(ordered, fraction) * 1000 for name, fraction in
+           (('p50_ms', 0.50), ('p90_ms', 0.90), ('p95_ms', 0.95), ('p99_ms', 0.99), ('max_ms', 1.0))}
+    }
+
+async def run_scenario(session, name, stats):
+    start = time.perf_counter()
+    try:
+        await SCENARIOS[name](session)
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        detail = f'{e.response.status_code} {e.response.text[:200]}' if isinstance(e, httpx.HTTPStatusError) else repr(e)
+        stats.record(name, time.perf_counter() - start, detail)
+        return False
+    stats.record(name, time.perf_counter() - start)
+    return True
+
+async def virtual_user(session, mix, stats, deadline, budget):
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        if budget is not None:
+            if budget[0] <= 0:
+                return
+            budget[0] -= 1
+        await run_scenario(session, session.rng.choices(names, weights)[0], stats)
+
+async def authenticate(client, username, password):
+    if username:
+        response = await client.post('/api/auth/login', json={'username': username, 'password': password})
+    else:
+        response = await client.post('/api/auth/register', json={
+            'username': f'load_{uuid.uuid4().hex[:10]}', 'password': password
+        })
+    response.raise_for_status()
+    return response.json()['access_token']
+
+async def seed(client, headers, people, rng):
+    """Create people to check in, a few at a time; returns (members, visitors)"""
+    semaphore = asyncio.Semaphore(10)
+
+    async def create(path, payload):
+        async with semaphore:
+            response = await client.post(f'/api/{path}', json=payload, headers=headers)
+            response.raise_for_status()
+            return {**payload, 'id': response.json()['id']}
+
+    visitor_count = max(1, people // 5)
+    members = await asyncio.gather(*(create('members', new_member(rng)) for _ in range(people - visitor_count)))
+    visitors = await asyncio.gather(*(
+        create('visitors', {'nombre': f'Visita {uuid.uuid4().hex[:6]}', 'de_donde_viene': 'Bridgeport'})
+        for _ in range(visitor_count)
+    ))
+    return list(members), list(visitors)
+
+async def cleanup(client, headers, sessions, members, visitors):
+    paths = [f"members/{m['id']}" for m in members] + [f"visitors/{v['id']}" for v in visitors]
+    paths += [f'members/{member_id}' for session in sessions for member_id in session.created_members]
+    semaphore = asyncio.Semaphore(10)
+
+    async def delete(path):
+        async with semaphore:
+            await client.delete(f'/api/{path}', headers=headers)
+
+    await asyncio.gather(*(delete(path) for path in paths))
+
+async def run(args, mix):
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.target, timeout=args.timeout, limits=limits) as client:
+        token = await authenticate(client, args.username, args.password)
+        headers = {'Authorization': f'Bearer {token}'}
+        members, visitors = await seed(client, headers, max(2, args.people), rng)
+        sessions = [Session(client, token, members, visitors, random.Random(rng.random()))
+                    for _ in range(1 if args.smoke else args.concurrency)]
+        stats = Stats()
+        start = time.perf_counter()
+        try:
+            if args.smoke:
+                for name in SCENARIOS:
+                    ok = await run_scenario(sessions[0], name, stats)
+                    print(f"{'PASS' if ok else 'FAIL'} {name}")
+            else:
+                deadline = start + args.duration if args.duration else float('inf')
+                budget = [args.requests] if args.requests else None
+                await asyncio.gather(*(virtual_user(session, mix, stats, deadline, budget) for session in sessions))
+            elapsed = time.perf_counter() - start
+        finally:
+            if not args.keep_data:
+                await cleanup(client, headers, sessions, members, visitors)
+    return stats, elapsed
+
+def print_report(summary, stats):
+    print(f"{'scenario':<22}{'reqs':>8}{'err%':>7}{'rps':>9}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name, row in summary.items():
+        print(f"{name:<22}{row['requests']:>8}{row['error_rate'] * 100:>6.1f}%{row['throughput']:>9.1f}"
+              f"{row['p50_ms']:>9.1f}{row['p90_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}")
+    for name, sample in stats.error_samples.items():
+        print(f"  {name}: {stats.errors[name]} errors, e.g. {sample}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', default=DEFAULT_TARGET, help="server base URL (LOAD_TEST_URL)")
+    parser.add_argument('--mix', default='mixed', help=f"{', '.join(MIXES)} or scenario=weight,...")
+    parser.add_argument('--concurrency', type=int, default=20, help="virtual users")
+    parser.add_argument('--duration', type=float, default=30, help="seconds to run (0 = until --requests)")
+    parser.add_argument('--requests', type=int, default=0, help="stop after this many scenarios")
+    parser.add_argument('--people', type=int, default=50, help="members and visitors to seed")
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--username')
+    parser.add_argument('--password', default='LoadTest123!')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--smoke', action='store_true', help="run every scenario once and fail on any error")
+    parser.add_argument('--keep-data', action='store_true', help="do not delete seeded people")
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--json', help="also write the summary to this file")
+    args = parser.parse_args()
+    if not args.smoke and not args.duration and not args.requests:
+        parser.error("give --duration or --requests")
+    try:
+        mix = {name: weight for name, weight in parse_mix(args.mix).items() if weight > 0}
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"Target {args.target}, mix {args.mix}, "
+          f"{'smoke' if args.smoke else f'{args.concurrency} users'}", file=sys.stderr)
+    stats, elapsed = asyncio.run(run(args, mix))
+    summary = stats.summary(elapsed)
+    print_report(summary, stats)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'target': args.target, 'mix': args.mix, 'concurrency': args.concurrency,
+                       'elapsed_seconds': elapsed, 'scenarios': summary}, f, indent=2)
+    if args.smoke:
+        return 1 if stats.errors else 0
+    return 1 if summary['TOTAL']['error_rate'] > args.max_error_rate else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { API } from '../App';
 import { Button } from '@/components/ui/button';
@@ -17,6 +17,8 @@ export default function Attendance() {
   const [filteredMembers, setFilteredMembers] = useState([]);
   const [filteredFriends, setFilteredFriends] = useState([]);
   const [searchTerm, setSearchTerm] = useState('');
+  // Data version returned by our last save: today's list only needs to be at least this fresh
+  const dataVersion = useRef(null);
   
   // Friend modal states
   const [isFriendModalOpen, setIsFriendModalOpen] = useState(false);
@@ -111,7 +113,8 @@ export default function Attendance() {
 
   const fetchTodayAttendance = async () => {
     try {
-      const response = await axios.get(`${API}/attendance/today`);
+      const params = dataVersion.current ? { min_version: dataVersion.current } : {};
+      const response = await axios.get(`${API}/attendance/today`, { params });
       const attendanceSet = new Set();
       response.data.forEach((record) => {
         // Add both the original tipo and normalized versions
@@ -165,7 +168,8 @@ export default function Attendance() {
       let successCount = 0;
       for (const attendanceRecord of peopleToSave) {
         try {
-          await axios.post(`${API}/attendance`, attendanceRecord);
+          const response = await axios.post(`${API}/attendance`, attendanceRecord);
+          dataVersion.current = response.headers['x-data-version'] || dataVersion.current;
           successCount++;
           // Small delay between requests to avoid rate limits
           if (successCount < peopleToSave.length) {
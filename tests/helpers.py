@@ -0,0 +1,265 @@
+"""Shared test fixtures: an in-memory SheetsService, an in-memory gspread spreadsheet and record factories"""
+import os
+import sys
+import threading
+import uuid
+from pathlib import Path
+from unittest import mock
+
+import gspread
+from gspread.utils import a1_range_to_grid_range
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from attendance_shards import shard_year  # noqa: E402
+from storage import TOMBSTONE_COLUMN  # noqa: E402
+
+class FakeSheetsService:
+    """In-memory SheetsService: rows are lists of strings, row 1 is the header"""
+
+    def __init__(self):
+        self.expected_headers = {
+            'Miembros': ['id', 'nombre', 'apellido', 'direccion', 'fecha_nacimiento', 'telefono', 'fecha_registro', TOMBSTONE_COLUMN],
+            'Amigos': ['id', 'nombre', 'de_donde_viene', 'fecha_registro', TOMBSTONE_COLUMN],
+            'Asistencia': ['tipo', 'person_id', 'person_name', 'fecha', 'presente', 'id', 'created_at']
+        }
+        self.sheets = {name: [list(headers)] for name, headers in self.expected_headers.items()}
+        self.calls = 0
+        self.write_lock = threading.RLock()
+        self.last_read = {}  # sheet -> last row read (full or tail read)
+
+    def list_shards(self):
+        return [name for name in self.sheets if shard_year(name) is not None]
+
+    def ensure_sheet(self, sheet_name, template):
+        self.expected_headers[sheet_name] = list(self.expected_headers[template])
+        self.sheets.setdefault(sheet_name, [list(self.expected_headers[template])])
+
+    def row_ids(self, sheet_name, row_numbers):
+        self.calls += 1
+        col = self.expected_headers[sheet_name].index('id')
+        rows = self.sheets[sheet_name]
+        return {row: rows[row - 1][col] for row in set(row_numbers) if row <= len(rows)}
+
+    def _records(self, sheet_name):
+        header, *rows = self.sheets[sheet_name]
+        self.last_read[sheet_name] = len(rows) + 1
+        return [{**dict(zip(header, row)), '_row': idx} for idx, row in enumerate(rows, start=2)]
+
+    def read_all(self, sheet_name):
+        self.calls += 1
+        return self._records(sheet_name)
+
+    def read_many(self, sheet_names):
+        self.calls += 1
+        return {name: self._records(name) for name in sheet_names}
+
+    def read_tail(self, sheet_name):
+        # No in-place edit detection here: the tail is always trusted
+        self.calls += 1
+        if sheet_name not in self.last_read:
+            return None
+        last_row = self.last_read[sheet_name]
+        return [r for r in self._records(sheet_name) if r['_row'] > last_row]
+
+    def append_row(self, sheet_name, values):
+        self.calls += 1
+        self.sheets[sheet_name].append([str(v) for v in values])
+        return {"success": True, "row": len(self.sheets[sheet_name])}
+
+    def append_rows(self, sheet_name, rows):
+        self.calls += 1
+        first_row = len(self.sheets[sheet_name]) + 1
+        self.sheets[sheet_name].extend([str(v) for v in row] for row in rows)
+        return {"success": True, "first_row": first_row, "rows": len(rows)}
+
+    def update_row(self, sheet_name, row_number, values):
+        self.calls += 1
+        self.sheets[sheet_name][row_number - 1] = [str(v) for v in values]
+        return {"success": True, "row": row_number}
+
+    def tombstone_row(self, sheet_name, row_number, deleted_at):
+        self.calls += 1
+        col = self.expected_headers[sheet_name].index(TOMBSTONE_COLUMN)
+        self.sheets[sheet_name][row_number - 1][col] = deleted_at
+        return {"success": True, "tombstoned_row": row_number}
+
+    def update_rows(self, sheet_name, rows):
+        self.calls += 1
+        for row_number, values in rows.items():
+            self.sheets[sheet_name][row_number - 1] = [str(v) for v in values]
+        return {"success": True, "rows": len(rows)}
+
+    def tombstone_rows(self, sheet_name, row_numbers, deleted_at):
+        self.calls += 1
+        col = self.expected_headers[sheet_name].index(TOMBSTONE_COLUMN)
+        for row_number in row_numbers:
+            self.sheets[sheet_name][row_number - 1][col] = deleted_at
+        return {"success": True, "tombstoned_rows": len(row_numbers)}
+
+    def delete_rows(self, sheet_name, row_numbers):
+        self.calls += 1
+        for row_number in sorted(set(row_numbers), reverse=True):
+            del self.sheets[sheet_name][row_number - 1]
+        return {"success": True, "deleted_rows": len(row_numbers)}
+
+    def delete_row(self, sheet_name, row_number):
+        self.calls += 1
+        del self.sheets[sheet_name][row_number - 1]
+        return {"success": True, "deleted_row": row_number}
+
+    def compact(self, sheet_name):
+        self.calls += 1
+        header, *rows = self.sheets[sheet_name]
+        col = header.index(TOMBSTONE_COLUMN)
+        live = [row for row in rows if not row[col]]
+        self.sheets[sheet_name] = [header] + live
+        return {"success": True, "removed": len(rows) - len(live)}
+
+class FakeWorksheet:
+    """The gspread Worksheet calls SheetsService makes, over a list of rows of strings"""
+
+    def __init__(self, spreadsheet, title, rows, sheet_id):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.rows = [list(row) for row in rows]
+        self.id = sheet_id
+        self.row_count = max(1000, len(self.rows))
+
+    def _write(self, values, range_name, value_input_option):
+        if value_input_option == 'USER_ENTERED':
+            # Parsed as if typed in: digit strings become numbers and lose their leading zeros
+            values = [[str(int(v)) if str(v).isdigit() else v for v in row] for row in values]
+        grid = a1_range_to_grid_range(range_name)
+        top, left = grid.get('startRowIndex', 0), grid.get('startColumnIndex', 0)
+        for offset, row_values in enumerate(values):
+            while len(self.rows) <= top + offset:
+                self.rows.append([])
+            row = self.rows[top + offset]
+            row.extend([''] * (left + len(row_values) - len(row)))
+            row[left:left + len(row_values)] = [str(v) for v in row_values]
+        self.row_count = max(self.row_count, len(self.rows))
+        self.spreadsheet.version += 1
+
+    def update(self, values, range_name, value_input_option=None):
+        self.spreadsheet.requests += 1
+        self._write(values, range_name, value_input_option)
+
+    def batch_update(self, data, value_input_option=None):
+        self.spreadsheet.requests += 1
+        for item in data:
+            self._write(item['values'], item['range'], value_input_option)
+
+    def col_values(self, col):
+        self.spreadsheet.requests += 1
+        values = [row[col - 1] if len(row) >= col else '' for row in self.rows]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def row_values(self, row):
+        self.spreadsheet.requests += 1
+        values = list(self.rows[row - 1]) if row <= len(self.rows) else []
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def get_all_values(self):
+        self.spreadsheet.requests += 1
+        return [list(row) for row in self.rows]
+
+    def delete_rows(self, start, end=None):
+        self.spreadsheet.requests += 1
+        self._delete(start - 1, start if end is None else end)
+
+    def _delete(self, start_index, end_index):
+        del self.rows[start_index:end_index]
+        self.row_count -= end_index - start_index
+        self.spreadsheet.version += 1
+
+    def add_rows(self, rows):
+        self.spreadsheet.requests += 1
+        self.row_count += rows
+
+class FakeSpreadsheet:
+    """In-memory gspread Spreadsheet (and its client): tabs, values_batch_get and the Drive version"""
+
+    def __init__(self, sheets):
+        self.tabs = {title: FakeWorksheet(self, title, rows, idx) for idx, (title, rows) in enumerate(sheets.items())}
+        self.version = 1
+        self.requests = 0
+        self.client = mock.Mock()
+        self.client.open_by_key.return_value = self
+        self.client.request.side_effect = lambda *args, **kwargs: mock.Mock(**{'json.return_value': {'version': str(self.version)}})
+
+    def worksheets(self):
+        return list(self.tabs.values())
+
+    def worksheet(self, title):
+        if title not in self.tabs:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self.tabs[title]
+
+    def add_worksheet(self, title, rows, cols):
+        self.tabs[title] = FakeWorksheet(self, title, [], len(self.tabs))
+        return self.tabs[title]
+
+    def values_batch_get(self, ranges):
+        self.requests += 1
+        value_ranges = []
+        for range_name in ranges:
+            title, _, cells = range_name.partition('!')
+            worksheet = self.tabs[title.strip("'")]
+            grid = a1_range_to_grid_range(cells) if cells else {}
+            top = grid.get('startRowIndex', 0)
+            if top >= worksheet.row_count:
+                raise Exception(f"Range ({range_name}) exceeds grid limits. Max rows: {worksheet.row_count}")
+            left, right = grid.get('startColumnIndex', 0), grid.get('endColumnIndex')
+            rows = [list(row[left:right]) for row in worksheet.rows[top:grid.get('endRowIndex')]]
+            for row in rows:
+                while row and not row[-1]:
+                    row.pop()
+            while rows and not rows[-1]:
+                rows.pop()
+            value_ranges.append({'range': range_name, **({'values': rows} if rows else {})})
+        return {'valueRanges': value_ranges}
+
+    def batch_update(self, body):
+        self.requests += 1
+        for request in body['requests']:
+            grid = request['deleteDimension']['range']
+            worksheet = next(ws for ws in self.tabs.values() if ws.id == grid['sheetId'])
+            worksheet._delete(grid['startIndex'], grid['endIndex'])
+
+def make_sheets_service(spreadsheet):
+    """A real SheetsService talking to `spreadsheet` (a FakeSpreadsheet) instead of Google"""
+    with mock.patch('gspread.authorize', return_value=spreadsheet.client), \
+            mock.patch('google.oauth2.service_account.Credentials.from_service_account_file'):
+        import sheets_service
+        return sheets_service.SheetsService()
+
+def make_member(**overrides):
+    member = {
+        'id': str(uuid.uuid4()), 'nombre': 'José', 'apellido': 'Peña', 'direccion': '1 Main St',
+        'fecha_nacimiento': '1990-05-01', 'telefono': '2035550101', 'fecha_registro': '2026-01-04T10:00:00-05:00'
+    }
+    member.update(overrides)
+    return member
+
+def make_attendance(person_id, fecha, presente=True):
+    return {
+        'tipo': 'member', 'person_id': person_id, 'person_name': 'José Peña', 'fecha': fecha,
+        'presente': 'TRUE' if presente else 'FALSE', 'id': str(uuid.uuid4()), 'created_at': '2026-01-04T10:00:00-05:00'
+    }
+
+def public(record):
+    return {k: v for k, v in record.items() if not k.startswith('_') and k != TOMBSTONE_COLUMN}
+
+def import_server():
+    """backend/server.py as the benchmarks load it: Mongo settings it never connects with, SQLite swapped in by tests"""
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    os.environ.setdefault('DB_NAME', 'test')
+    os.environ['STORAGE_BACKEND'] = 'mongo'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    import server
+    return server
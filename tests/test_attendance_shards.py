@@ -0,0 +1,65 @@
+"""Year sharding of attendance: routing, range selection and the migration tool"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from attendance_shards import base_table, shard_for, shards_between  # noqa: E402
+from shard_attendance import shard_attendance  # noqa: E402
+from storage import SheetsStorage, SQLiteStorage  # noqa: E402
+from tests.helpers import FakeSheetsService, make_attendance, public  # noqa: E402
+
+SHARDS = ['Asistencia_2024', 'Asistencia_2025', 'Asistencia_2026']
+
+def test_routing_by_fecha():
+    assert shard_for('2026-01-04') == 'Asistencia_2026'
+    assert base_table('Asistencia_2026') == 'Asistencia'
+    assert base_table('Miembros') == 'Miembros'
+    with pytest.raises(ValueError):
+        shard_for('hoy')
+
+def test_only_overlapping_shards_are_selected():
+    tables = ['Miembros', 'Asistencia'] + SHARDS[::-1]
+    assert shards_between(tables, '2025-06-01', '2026-01-31') == ['Asistencia_2025', 'Asistencia_2026']
+    assert shards_between(tables, '2026-02-01', None) == ['Asistencia_2026']
+    assert shards_between(tables) == SHARDS
+
+class ShardedFakeSheetsService(FakeSheetsService):
+    def ensure_sheet(self, sheet_name, template):
+        self.expected_headers[sheet_name] = list(self.expected_headers[template])
+        self.sheets.setdefault(sheet_name, [list(self.expected_headers[template])])
+
+@pytest.fixture(params=['sheets', 'sqlite'])
+def storage(request, tmp_path):
+    if request.param == 'sheets':
+        return SheetsStorage(ShardedFakeSheetsService())
+    return SQLiteStorage(str(tmp_path / 'asistencia.sqlite3'))
+
+def test_migration_splits_by_year_and_is_idempotent(storage):
+    rows = [make_attendance(f'm{i}', f'{2024 + i % 3}-03-0{i % 9 + 1}') for i in range(30)]
+    undated = {**make_attendance('m99', ''), 'created_at': '2025-12-31T10:00:00-05:00'}
+    for record in rows + [undated]:
+        storage.insert('Asistencia', record)
+
+    counts = shard_attendance(storage)
+    assert counts == {'Asistencia_2024': 10, 'Asistencia_2025': 11, 'Asistencia_2026': 10}
+    for table in SHARDS:
+        assert all(r['fecha'].startswith(table[-4:]) or r['fecha'] == '' for r in storage.read_all(table))
+    assert sorted(r['id'] for table in SHARDS for r in storage.read_all(table)) == sorted(r['id'] for r in rows + [undated])
+
+    shard_attendance(storage)
+    assert sum(len(storage.read_all(table)) for table in SHARDS) == 31
+    # The original table stays as a backup
+    assert len(storage.read_all('Asistencia')) == 31
+
+def test_sheets_shard_is_written_in_one_request():
+    service = ShardedFakeSheetsService()
+    storage = SheetsStorage(service)
+    records = [make_attendance(f'm{i}', '2026-01-04') for i in range(50)]
+    calls = service.calls
+    stored = storage.insert_many('Asistencia_2026', records)
+    assert service.calls == calls + 1
+    assert [r['_row'] for r in stored] == list(range(2, 52))
+    assert [public(r) for r in storage.read_all('Asistencia_2026')] == records
@@ -0,0 +1,68 @@
+"""Per-person attendance summaries kept current through cache index updates"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from attendance_summary import AttendanceSummaries  # noqa: E402
+from sheets_cache import SheetsCache  # noqa: E402
+from tests.helpers import make_attendance  # noqa: E402
+
+SUNDAYS = ['2026-09-06', '2026-09-13', '2026-09-20', '2026-09-27', '2026-10-04']
+
+def make_cache():
+    summaries = AttendanceSummaries()
+    cache = SheetsCache()
+    cache.register_index('Asistencia', 'summary', lambda records: summaries.track('Asistencia', records))
+    return cache, summaries
+
+def test_totals_last_seen_and_streaks():
+    cache, summaries = make_cache()
+    records = [make_attendance('ana', fecha) for fecha in SUNDAYS]
+    records += [make_attendance('beto', fecha, presente=fecha != '2026-09-20') for fecha in SUNDAYS]
+    cache.set('Asistencia', records)
+    ana, beto = summaries.summary('member', 'ana'), summaries.summary('member', 'beto')
+    assert (ana['total'], ana['present'], ana['current_streak'], ana['longest_streak']) == (5, 5, 5, 5)
+    assert (beto['present'], beto['attendance_rate'], beto['current_streak'], beto['longest_streak']) == (4, 80.0, 2, 2)
+    assert beto['last_seen'] == '2026-10-04'
+    assert summaries.summary('member', 'nobody') == {
+        'person_id': 'nobody', 'total': 0, 'present': 0, 'absent': 0, 'attendance_rate': 0,
+        'last_seen': None, 'current_streak': 0, 'longest_streak': 0
+    }
+
+def test_writes_update_summaries_incrementally():
+    cache, summaries = make_cache()
+    cache.set('Asistencia', [make_attendance('ana', fecha) for fecha in SUNDAYS[:3]])
+    assert summaries.summary('member', 'ana')['current_streak'] == 3
+    # A new service date Ana missed ends her current streak
+    cache.append_record('Asistencia', make_attendance('beto', SUNDAYS[3]))
+    assert summaries.summary('member', 'ana')['current_streak'] == 0
+    assert summaries.summary('member', 'ana')['longest_streak'] == 3
+    # Marking her present afterwards (an update of the same row) extends it again
+    late = make_attendance('ana', SUNDAYS[3], presente=False)
+    cache.append_record('Asistencia', late)
+    assert summaries.summary('member', 'ana')['absent'] == 1
+    cache.update_record('Asistencia', late['id'], {**late, 'presente': 'TRUE'})
+    assert summaries.summary('member', 'ana')['current_streak'] == 4
+    cache.remove_record('Asistencia', late['id'])
+    assert summaries.summary('member', 'ana')['total'] == 3
+
+def test_summaries_span_year_shards():
+    summaries = AttendanceSummaries()
+    summaries.track('Asistencia_2025', [make_attendance('ana', '2025-12-28')])
+    summaries.track('Asistencia_2026', [make_attendance('ana', '2026-01-04')])
+    assert summaries.summary('member', 'ana')['longest_streak'] == 2
+    assert [r['fecha'] for r in summaries.records_for('member', 'ana', ['Asistencia_2026'])] == ['2026-01-04']
+    # Re-reading a table replaces its rows instead of adding to them
+    summaries.track('Asistencia_2026', [])
+    assert summaries.summary('member', 'ana')['total'] == 1
+
+def test_members_and_friends_sharing_an_id_are_kept_apart():
+    summaries = AttendanceSummaries()
+    friend = {**make_attendance('1', SUNDAYS[0], presente=False), 'tipo': 'friend'}
+    visitor = {**make_attendance('1', SUNDAYS[1]), 'tipo': 'visitor'}
+    summaries.track('Asistencia', [make_attendance('1', SUNDAYS[0]), friend, visitor])
+    assert summaries.summary('member', '1')['total'] == 1
+    # Legacy 'visitor' rows count as the friend's
+    assert (summaries.summary('friend', '1')['total'], summaries.summary('friend', '1')['present']) == (2, 1)
+    assert summaries.records_for('visitor', '1') == [friend, visitor]
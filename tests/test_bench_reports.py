@@ -0,0 +1,20 @@
+"""Benchmark suite plumbing: dataset generation and regression detection"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+
+from bench_reports import compare, generate  # noqa: E402
+
+def test_generated_dataset_is_reproducible_and_sized():
+    members, friends, attendance = generate(1000, 100)
+    assert len(members) + len(friends) == 100
+    assert len(attendance) == 1000
+    assert generate(1000, 100) == (members, friends, attendance)
+    people = {m['id'] for m in members} | {f['id'] for f in friends}
+    assert {a['person_id'] for a in attendance} <= people
+
+def test_regressions_need_both_the_ratio_and_the_floor():
+    baselines = {'a[1k]': 10.0, 'b[1k]': 0.02, 'c[1k]': 10.0}
+    results = {'a[1k]': 13.0, 'b[1k]': 0.05, 'c[1k]': 12.0, 'new[1k]': 1.0}
+    assert compare(results, baselines, threshold=0.25) == [('a[1k]', 10.0, 13.0)]
@@ -0,0 +1,56 @@
+"""Birthday index: month-day ranges, including ranges that wrap past the end of the year"""
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from birthday_index import BirthdayIndex  # noqa: E402
+
+MEMBERS = [
+    {'id': 'jan', 'nombre': 'Enero', 'fecha_nacimiento': '1990-01-03'},
+    {'id': 'dec', 'nombre': 'Diciembre', 'fecha_nacimiento': '1985-12-28'},
+    {'id': 'jun', 'nombre': 'Junio', 'fecha_nacimiento': '2001-06-15'},
+    {'id': 'none', 'nombre': 'Sin fecha', 'fecha_nacimiento': ''},
+    {'id': 'leap', 'nombre': 'Bisiesto', 'fecha_nacimiento': '2000-02-29'},
+]
+
+def ids(members):
+    return [member['id'] for member in members]
+
+def test_between_within_the_year():
+    index = BirthdayIndex(MEMBERS)
+    assert len(index) == 4
+    assert ids(index.between('01-01', '06-30')) == ['jan', 'leap', 'jun']
+    assert ids(index.between('06-15', '06-15')) == ['jun']
+
+def test_between_wraps_around_new_year():
+    index = BirthdayIndex(MEMBERS)
+    # Dec 25 to Jan 5: the January birthday comes first (month-day order), then December
+    assert ids(index.between('12-25', '01-05')) == ['jan', 'dec']
+    assert ids(index.between('12-29', '01-02')) == []
+
+def test_upcoming_wraps_and_counts_days():
+    index = BirthdayIndex(MEMBERS)
+    upcoming = index.upcoming(date(2026, 12, 20), 20)
+    assert [(m['id'], m['dias_faltantes']) for m in upcoming] == [('dec', 8), ('jan', 14)]
+
+def test_feb_29_birthdays_fall_on_mar_1_outside_leap_years():
+    index = BirthdayIndex(MEMBERS)
+    [leap] = index.upcoming(date(2026, 2, 20), 10)
+    assert leap['id'] == 'leap' and leap['dias_faltantes'] == 9
+    assert index.upcoming(date(2026, 2, 20), 8) == []
+    assert [(m['id'], m['dias_faltantes']) for m in index.upcoming(date(2026, 3, 1), 0)] == [('leap', 0)]
+    assert [(m['id'], m['dias_faltantes']) for m in index.upcoming(date(2028, 2, 20), 10)] == [('leap', 9)]
+    assert index.upcoming(date(2028, 3, 1), 10) == []
+
+def test_unparseable_birthdays_are_skipped():
+    index = BirthdayIndex([
+        {'id': 'bad-month', 'fecha_nacimiento': '1990-13-01'},
+        {'id': 'bad-day', 'fecha_nacimiento': '1990-02-30'},
+        {'id': 'text', 'fecha_nacimiento': 'abc-de-fg'},
+        {'id': 'short', 'fecha_nacimiento': '1990-1-5'},
+    ])
+    assert ids(index.between('01-01', '12-31')) == ['short']
+    [short] = index.upcoming(date(2026, 1, 1), 10)
+    assert short['dias_faltantes'] == 4
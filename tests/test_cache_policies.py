@@ -0,0 +1,119 @@
+"""Sheets cache: per-sheet policies, memory accounting and the index memory budget"""
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from attendance_summary import AttendanceSummaries  # noqa: E402
+import sheets_cache  # noqa: E402
+from sheets_cache import SheetsCache, approximate_size, record_size  # noqa: E402
+
+def people(n):
+    return [{'id': str(i), 'nombre': f'Persona {i}', 'apellido': 'Apellido'} for i in range(n)]
+
+class NameIndex:
+    def __init__(self, records):
+        self.names = {record['id']: record['nombre'].upper() for record in records}
+
+def test_per_sheet_ttl_and_refresh_policy():
+    cache = SheetsCache(cache_duration_seconds=60)
+    cache.set_policy('Amigos', ttl_seconds=600)
+    cache.set_policy('Asistencia', refresh='tail')
+    cache.set('Amigos', people(1))
+    cache.set('Miembros', people(1))
+    for sheet_name in ('Amigos', 'Miembros'):
+        cache.cache[sheet_name]['timestamp'] = datetime.now() - timedelta(seconds=120)
+    assert cache.get('Amigos') is not None
+    assert cache.get('Miembros') is None
+    assert (cache.refresh_policy('Asistencia'), cache.refresh_policy('Amigos')) == ('tail', 'full')
+    with pytest.raises(ValueError):
+        cache.set_policy('Amigos', refresh='sometimes')
+
+def test_shared_records_are_counted_once():
+    records = people(50)
+    alone = approximate_size(records)
+    seen = set()
+    assert approximate_size(records, seen) == alone
+    # A list of the same records only adds the list itself
+    assert approximate_size(list(records), seen) == sys.getsizeof(list(records))
+
+def test_views_count_only_their_own_part():
+    summaries = AttendanceSummaries()
+    small = summaries.track('Asistencia_2025', [{'person_id': '1', 'fecha': '2025-01-05', 'presente': 'TRUE'}])
+    summaries.track('Asistencia_2026', [{'person_id': str(i), 'fecha': '2026-01-04', 'presente': 'TRUE'} for i in range(500)])
+    assert approximate_size(small) < approximate_size(summaries.rows['Asistencia_2026'])
+
+def test_budget_evicts_least_recently_used_evictable_indexes():
+    cache = SheetsCache(cache_duration_seconds=60)
+    cache.register_index('Miembros', 'names', NameIndex, evictable=True)
+    cache.register_index('Amigos', 'names', NameIndex, evictable=True)
+    cache.register_index('Amigos', 'pinned', NameIndex)
+    cache.set('Miembros', people(200))
+    cache.set('Amigos', people(200))
+    cache.get_index('Miembros', 'names')
+    cache.get_index('Amigos', 'names')
+    footprint = cache.footprint()
+    data = sum(sheet['data_bytes'] for sheet in footprint['sheets'].values())
+    assert footprint['total_bytes'] > data
+
+    # Room for the data, the pinned index and one more index
+    index_bytes = footprint['sheets']['Amigos']['index_bytes']['names']
+    cache.configure(memory_budget_bytes=footprint['total_bytes'] - index_bytes // 2)
+    cache._enforce_budget()
+    footprint = cache.footprint()
+    assert footprint['index_evictions'] == 1
+    assert footprint['sheets']['Miembros']['evicted_indexes'] == ['names']
+    assert set(footprint['sheets']['Amigos']['index_bytes']) == {'names', 'pinned'}
+
+    # Rebuilt on next use; the other sheet's index (now least recently used) makes room
+    assert cache.get_index('Miembros', 'names').names['3'] == 'PERSONA 3'
+    footprint = cache.footprint()
+    assert footprint['sheets']['Amigos']['evicted_indexes'] == ['names']
+    assert footprint['total_bytes'] <= footprint['budget_bytes']
+
+def test_writes_update_the_entry_size():
+    cache = SheetsCache(cache_duration_seconds=60)
+    cache.set('Amigos', people(10))
+    before = cache.footprint()['sheets']['Amigos']['data_bytes']
+    cache.append_records('Amigos', people(20)[10:])
+    after = cache.footprint()['sheets']['Amigos']
+    assert after['records'] == 20 and after['data_bytes'] > before
+
+def count_walks(monkeypatch):
+    """Objects approximate_size is called on, for checking what gets measured"""
+    walked = []
+
+    def counting(obj, seen=None):
+        walked.append(obj)
+        return approximate_size(obj, seen)
+    monkeypatch.setattr(sheets_cache, 'approximate_size', counting)
+    return walked
+
+def test_writes_adjust_the_size_without_walking_the_data(monkeypatch):
+    cache = SheetsCache(cache_duration_seconds=60)
+    cache.set('Amigos', people(10))
+    before = cache.footprint()['sheets']['Amigos']['data_bytes']
+    walked = count_walks(monkeypatch)
+    added = people(12)[10:]
+    cache.append_records('Amigos', added)
+    cache.apply_batch('Amigos', [], ['0'])
+    assert cache.footprint()['sheets']['Amigos']['data_bytes'] == before + record_size(added[0]) + record_size(added[1]) - record_size(people(1)[0])
+    assert walked == []
+
+def test_fills_measure_only_the_new_entry(monkeypatch):
+    cache = SheetsCache(cache_duration_seconds=60, memory_budget_bytes=10 ** 9)
+    cache.register_index('Miembros', 'names', NameIndex, evictable=True)
+    cache.set('Miembros', people(50))
+    cache.append_records('Miembros', people(51)[50:])
+    cache.footprint()
+    walked = count_walks(monkeypatch)
+    cache.set('Amigos', people(50))
+    assert [type(obj) for obj in walked] == [list]
+    # A rebuilt index is measured again, the data is not
+    cache.apply_batch('Miembros', [{'id': '3', 'nombre': 'Otra', 'apellido': 'Apellido'}])
+    walked.clear()
+    cache.set('Asistencia', [])
+    assert sorted(type(obj).__name__ for obj in walked) == ['NameIndex', 'list']
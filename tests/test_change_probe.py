@@ -0,0 +1,86 @@
+"""Cache revalidation through a change probe (LocalChangeProbe stands in for the Drive version)"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from change_probe import LocalChangeProbe  # noqa: E402
+from sheets_cache import SheetsCache  # noqa: E402
+
+RECORDS = [{'id': 'm1', 'nombre': 'Ana'}]
+
+def make_cache(ttl=0, probe_interval=0):
+    probe = LocalChangeProbe()
+    return SheetsCache(cache_duration_seconds=ttl, probe=probe, probe_interval_seconds=probe_interval), probe
+
+def fill(cache, sheet_name='Miembros'):
+    assert cache.get(sheet_name) is None  # the miss observes the token before the read
+    cache.set(sheet_name, list(RECORDS))
+
+def test_expired_entry_is_revalidated_while_unchanged():
+    cache, probe = make_cache(ttl=0)
+    fill(cache)
+    assert cache.get('Miembros') == RECORDS
+    assert cache.get('Miembros', revalidate=True) == RECORDS
+
+def test_outside_edit_forces_a_reload():
+    cache, probe = make_cache(ttl=0)
+    fill(cache)
+    probe.bump()
+    assert cache.get('Miembros') is None
+    cache.set('Miembros', [{'id': 'm1', 'nombre': 'Ana María'}])
+    assert cache.get('Miembros')[0]['nombre'] == 'Ana María'
+
+def test_probe_is_rate_limited():
+    cache, probe = make_cache(ttl=0, probe_interval=60)
+    fill(cache)
+    calls = probe.calls
+    for _ in range(50):
+        cache.get('Miembros')
+    assert probe.calls == calls
+
+def test_edit_between_probe_and_read_is_not_hidden():
+    cache, probe = make_cache(ttl=0)
+    assert cache.get('Miembros') is None
+    probe.bump()  # the sheet changes after the token was taken but before it is read
+    cache.set('Miembros', list(RECORDS))
+    # The recorded token is the older one, so the next check reloads instead of trusting it
+    assert cache.get('Miembros') is None
+
+def test_without_probe_revalidate_always_misses():
+    cache = SheetsCache(cache_duration_seconds=60)
+    cache.set('Miembros', list(RECORDS))
+    assert cache.get('Miembros') == RECORDS
+    assert cache.get('Miembros', revalidate=True) is None
+
+def test_fresh_entries_do_not_probe():
+    cache, probe = make_cache(ttl=60)
+    fill(cache)
+    calls = probe.calls
+    time.sleep(0.01)
+    assert cache.get('Miembros') == RECORDS
+    assert probe.calls == calls
+
+def test_revalidate_probes_past_the_rate_limit():
+    cache, probe = make_cache(ttl=60, probe_interval=60)
+    fill(cache)
+    assert cache.get('Miembros', revalidate=True) == RECORDS
+    probe.bump()
+    # Within the probe interval, but revalidate asks again and sees the edit
+    assert cache.get('Miembros', revalidate=True) is None
+    # Plain reads of a fresh entry still do not probe
+    calls = probe.calls
+    cache.set('Miembros', list(RECORDS))
+    cache.get('Miembros')
+    assert probe.calls == calls
+
+def test_revalidate_against_a_token_the_caller_probed():
+    cache, probe = make_cache(ttl=0, probe_interval=60)
+    fill(cache)
+    token = cache.current_token(force=True)
+    calls = probe.calls
+    assert cache.get('Miembros', revalidate=True, token=token) == RECORDS
+    assert probe.calls == calls
+    probe.bump()
+    assert cache.get('Miembros', revalidate=True, token=cache.current_token(force=True)) is None
@@ -0,0 +1,37 @@
+"""Load generator plumbing: scenario mixes and latency summaries"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+
+from load_test import MIXES, SCENARIOS, Stats, parse_mix, percentile  # noqa: E402
+
+def test_named_mixes_only_use_known_scenarios():
+    for mix in MIXES.values():
+        assert set(mix) <= set(SCENARIOS)
+    assert parse_mix('checkin') == MIXES['checkin']
+
+def test_custom_mix_weights():
+    assert parse_mix('checkin=3,dashboard') == {'checkin': 3.0, 'dashboard': 1.0}
+    with pytest.raises(ValueError):
+        parse_mix('checkin=3,nope=1')
+
+def test_percentiles_and_error_rates():
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 0.5) == 0.05
+    assert percentile(values, 0.99) == 0.099
+    assert percentile(values, 1.0) == 0.1
+    assert percentile([], 0.5) == 0.0
+
+    stats = Stats()
+    for ms in (10, 20, 30):
+        stats.record('checkin', ms / 1000)
+    stats.record('dashboard', 0.5, error='500 boom')
+    summary = stats.summary(elapsed=2.0)
+    assert summary['checkin']['requests'] == 3 and summary['checkin']['errors'] == 0
+    assert summary['dashboard']['error_rate'] == 1.0
+    assert summary['TOTAL']['requests'] == 4
+    assert summary['TOTAL']['throughput'] == 2.0
+    assert summary['TOTAL']['error_rate'] == 0.25
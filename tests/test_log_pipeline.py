@@ -0,0 +1,106 @@
+"""Queue-based structured logging: sampling, JSON output and keeping writes off request threads"""
+import io
+import json
+import logging
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import log_pipeline  # noqa: E402
+from log_pipeline import current_route, parse_sample_rates, setup_logging  # noqa: E402
+
+@pytest.fixture
+def pipeline():
+    """Yield a function that installs the pipeline into a StringIO; restores the root logger after"""
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    listeners = []
+
+    def install(**kwargs):
+        stream = io.StringIO()
+        listener = setup_logging(target=logging.StreamHandler(stream), **kwargs)
+        listeners.append(listener)
+        return stream, listener
+
+    yield install
+    for listener in listeners:
+        if listener._thread is not None:
+            listener.stop()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in saved_handlers:
+        root.addHandler(handler)
+    root.setLevel(saved_level)
+
+def lines(stream, listener):
+    listener.stop()  # flushes the queue
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_records_are_json_with_route_and_fields(pipeline):
+    stream, listener = pipeline()
+    token = current_route.set('/api/attendance/today')
+    logging.getLogger('server').info("Attendance for today", extra={'fields': {'people': 3}})
+    current_route.reset(token)
+    [entry] = lines(stream, listener)
+    assert entry['message'] == "Attendance for today"
+    assert entry['route'] == '/api/attendance/today'
+    assert entry['people'] == 3
+
+def test_sampling_drops_info_but_keeps_warnings(pipeline):
+    stream, listener = pipeline(sample_rates=parse_sample_rates('/api/attendance=0'))
+    token = current_route.set('/api/attendance/today')
+    log = logging.getLogger('server')
+    for _ in range(100):
+        log.info("noisy")
+    log.warning("kept")
+    current_route.reset(token)
+    log.info("other route")
+    assert [entry['message'] for entry in lines(stream, listener)] == ["kept", "other route"]
+
+def test_level_control(pipeline):
+    stream, listener = pipeline(level='WARNING')
+    logging.getLogger('server').info("hidden")
+    assert lines(stream, listener) == []
+
+def test_parse_sample_rates():
+    assert parse_sample_rates(' /api/a=0.5, /api/b=1 ,') == {'/api/a': 0.5, '/api/b': 1.0}
+
+# Request threads only enqueue: formatting and writing happen on the listener thread
+
+class RecordingHandler(logging.StreamHandler):
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.threads = set()
+
+    def emit(self, record):
+        self.threads.add(threading.get_ident())
+        super().emit(record)
+
+def test_writes_happen_off_the_logging_thread(pipeline):
+    # The pipeline fixture restores the root logger afterwards
+    target = RecordingHandler(io.StringIO())
+    listener = setup_logging(target=target)
+    logging.getLogger('server').info("Checking record %s", 1, extra={'fields': {'request': 1}})
+    listener.stop()
+    assert target.threads and threading.get_ident() not in target.threads
+    assert json.loads(target.stream.getvalue())['message'] == "Checking record 1"
+
+def test_partial_sampling_keeps_each_record_with_its_rate(pipeline, monkeypatch):
+    draws = iter([0.1, 0.9, 0.4, 0.6])
+    monkeypatch.setattr(log_pipeline.random, 'random', lambda: next(draws))
+    stream, listener = pipeline(sample_rates={'': 0.5})
+    for i in range(4):
+        logging.getLogger('server').info(f"line {i}")
+    assert [entry['message'] for entry in lines(stream, listener)] == ["line 0", "line 2"]
+
+def test_full_queue_drops_instead_of_blocking(pipeline):
+    _, listener = pipeline(max_queue=2)
+    listener.stop()  # nothing drains the queue any more
+    for i in range(5):
+        logging.getLogger('server').info(f"line {i}")
+    [handler] = logging.getLogger().handlers
+    assert handler.dropped == 3
@@ -0,0 +1,174 @@
+"""MongoDB server (server_mongodb_backup.py): aggregation pipelines against the Python aggregation
+they replaced, streamed JSON bodies and the startup indexes, over mongomock"""
+import asyncio
+import json
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+mongomock = pytest.importorskip('mongomock')
+
+class AsyncCursor:
+    """The motor cursor calls the server makes, over a mongomock cursor or aggregation result"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args):
+        self.cursor = self.cursor.sort(*args)
+        return self
+
+    def __aiter__(self):
+        self.iterator = iter(self.cursor)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length):
+        return list(self.cursor)[:length]
+
+class AsyncCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self.collection.find(*args, **kwargs))
+
+    def aggregate(self, pipeline):
+        return AsyncCursor(self.collection.aggregate(pipeline))
+
+    async def count_documents(self, query):
+        return self.collection.count_documents(query)
+
+    async def create_index(self, keys):
+        return self.collection.create_index(keys)
+
+class AsyncDatabase:
+    def __init__(self, database):
+        self.database = database
+
+    def __getattr__(self, name):
+        return AsyncCollection(self.database[name])
+
+@pytest.fixture(scope='module')
+def backup():
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    os.environ.setdefault('DB_NAME', 'test')
+    import server_mongodb_backup
+    return server_mongodb_backup
+
+@pytest.fixture
+def mongo(backup, monkeypatch):
+    database = mongomock.MongoClient()['test_backup']
+    monkeypatch.setattr(backup, 'db', AsyncDatabase(database))
+    return database
+
+def seed(database, today, n=300, seed=7):
+    """Attendance over the last 40 days (plus today), some members, some visitors"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        fecha = (today - timedelta(days=rng.randrange(41))).isoformat()
+        records.append({'id': f'a{i}', 'tipo': rng.choice(['member', 'visitor']), 'person_id': f'p{rng.randrange(30)}',
+                        'person_name': 'x', 'fecha': fecha, 'presente': rng.random() < 0.7,
+                        'created_at': f'{fecha}T10:00:00+00:00'})
+    database.attendance.insert_many([dict(record) for record in records])
+    database.members.insert_many([{'id': f'm{i}'} for i in range(7)])
+    database.visitors.insert_many([{'id': f'v{i}'} for i in range(3)])
+    return records
+
+def read_body(response):
+    async def collect():
+        return ''.join([chunk async for chunk in response.body_iterator])
+    return json.loads(asyncio.run(collect()))
+
+def python_statistics(records):
+    """Statistics as the server computed them before the pipelines"""
+    total = len(records)
+    present = sum(1 for r in records if r['presente'])
+    return {"total": total, "present": present, "absent": total - present,
+            "attendance_rate": round((present / total * 100) if total > 0 else 0, 2)}
+
+def test_collective_report_matches_the_python_grouping(backup, mongo):
+    records = seed(mongo, date(2026, 3, 15))
+    start, end = '2026-02-20', '2026-03-10'
+    in_range = [r for r in records if start <= r['fecha'] <= end]
+    dates = {}
+    for record in in_range:
+        day = dates.setdefault(record['fecha'], {'members': 0, 'visitors': 0, 'total': 0})
+        if record['presente']:
+            day['total'] += 1
+            day['members' if record['tipo'] == 'member' else 'visitors'] += 1
+    report = asyncio.run(backup.get_collective_report(start, end, current_user='admin'))
+    assert report == {"date_range": {"start": start, "end": end}, "by_date": dates, "total_records": len(in_range),
+                      "total_present": sum(1 for r in in_range if r['presente'])}
+    assert list(report['by_date']) == sorted(dates)
+
+@pytest.mark.parametrize('tipo', ['all', 'member', 'visitor'])
+def test_date_range_report_streams_records_and_statistics(backup, mongo, tipo):
+    records = seed(mongo, date(2026, 3, 15))
+    start, end = '2026-03-01', '2026-03-15'
+    expected = [r for r in records if start <= r['fecha'] <= end and tipo in ('all', r['tipo'])]
+    body = read_body(asyncio.run(backup.get_report_by_date_range(start, end, tipo, current_user='admin')))
+    assert body['statistics'] == python_statistics(expected)
+    assert sorted(r['id'] for r in body['records']) == sorted(r['id'] for r in expected)
+    assert [r['fecha'] for r in body['records']] == sorted(r['fecha'] for r in expected)
+
+def test_individual_report_streams_records_and_statistics(backup, mongo):
+    records = seed(mongo, date(2026, 3, 15))
+    expected = [r for r in records if r['person_id'] == 'p3' and r['tipo'] == 'member']
+    body = read_body(asyncio.run(backup.get_individual_report('p3', 'member', current_user='admin')))
+    assert (body['person_id'], body['tipo']) == ('p3', 'member')
+    assert body['statistics'] == python_statistics(expected)
+    assert sorted(r['id'] for r in body['records']) == sorted(r['id'] for r in expected)
+
+def test_dashboard_counts_match_the_python_filters(backup, mongo):
+    now = datetime.now(timezone.utc)
+    records = seed(mongo, now.date())
+    today, first_day = now.strftime('%Y-%m-%d'), now.replace(day=1).strftime('%Y-%m-%d')
+    stats = asyncio.run(backup.get_dashboard_stats(current_user='admin'))
+    assert stats == {
+        "total_members": 7, "total_visitors": 3,
+        "today_attendance": sum(1 for r in records if r['fecha'] == today and r['presente']),
+        "month_attendance": sum(1 for r in records if first_day <= r['fecha'] <= today and r['presente'])
+    }
+
+def test_empty_collection_gives_empty_reports_and_valid_json(backup, mongo):
+    body = read_body(asyncio.run(backup.get_report_by_date_range('2026-01-01', '2026-12-31', 'all', current_user='admin')))
+    assert body == {"records": [], "statistics": python_statistics([])}
+    assert read_body(asyncio.run(backup.get_attendance_by_date('2026-01-04', current_user='admin'))) == []
+    assert read_body(asyncio.run(backup.get_members(current_user='admin'))) == []
+    stats = asyncio.run(backup.get_dashboard_stats(current_user='admin'))
+    assert (stats['today_attendance'], stats['month_attendance']) == (0, 0)
+
+def test_stream_json_array_is_a_json_array(backup):
+    async def collect(docs, **kwargs):
+        cursor = AsyncCursor(iter(docs))
+        return ''.join([chunk async for chunk in backup.stream_json_array(cursor, **kwargs)])
+    assert json.loads(asyncio.run(collect([]))) == []
+    docs = [{'id': 'a1', 'created_at': '2026-01-04T10:00:00+00:00'}, {'id': 'a2', 'nombre': 'José "Pepe"'}]
+    assert json.loads(asyncio.run(collect([dict(doc) for doc in docs]))) == [
+        {'id': 'a1', 'created_at': '2026-01-04T10:00:00+00:00'}, {'id': 'a2', 'nombre': 'José "Pepe"'}]
+
+def test_stream_report_is_a_json_object(backup):
+    async def collect(docs, head, tail):
+        return ''.join([chunk async for chunk in backup.stream_report(AsyncCursor(iter(docs)), head, tail)])
+    assert json.loads(asyncio.run(collect([], {}, {}))) == {"records": []}
+    assert json.loads(asyncio.run(collect([{'id': 'a1'}], {'person_id': 'p1'}, {'statistics': {'total': 1}}))) == \
+        {'person_id': 'p1', 'records': [{'id': 'a1'}], 'statistics': {'total': 1}}
+
+def test_startup_creates_the_report_indexes(backup, mongo):
+    asyncio.run(backup.create_indexes())
+    keys = [info['key'] for info in mongo.attendance.index_information().values()]
+    assert [('fecha', 1), ('tipo', 1), ('presente', 1)] in keys
+    assert [('person_id', 1), ('tipo', 1), ('fecha', 1)] in keys
@@ -0,0 +1,66 @@
+"""Bulk people operations: upload parsing, validation, deduplication and batched cache updates"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from people_import import ignored_columns, parse_upload, plan_import  # noqa: E402
+from people_search import PeopleSearchIndex  # noqa: E402
+from sheets_cache import SheetsCache  # noqa: E402
+
+def test_csv_and_json_uploads():
+    csv_body = '\ufeffnombre,apellido , telefono\nJosé,Peña,2035550101\nAna,Ruiz\n'.encode()
+    assert parse_upload(csv_body, 'text/csv') == [
+        {'nombre': 'José', 'apellido': 'Peña', 'telefono': '2035550101'},
+        {'nombre': 'Ana', 'apellido': 'Ruiz', 'telefono': None}
+    ]
+    assert parse_upload(b'[{"nombre": "Ana"}]', 'application/json') == [{'nombre': 'Ana'}]
+    with pytest.raises(ValueError):
+        parse_upload(b'{"nombre": "Ana"}', 'application/json')
+
+def test_rows_are_validated_and_deduplicated():
+    existing = [{'id': 'm1', 'nombre': 'José', 'apellido': 'Peña', 'telefono': '(203) 555-0101'}]
+    rows = [
+        {'nombre': 'JOSE', 'apellido': 'pena', 'telefono': '+1 203 555 0101'},
+        {'nombre': 'Luis', 'apellido': 'Mora', 'fecha_nacimiento': '1985-07-04'},
+        {'nombre': 'luís', 'apellido': 'MORA'},
+        {'nombre': '', 'apellido': 'Ruiz', 'fecha_nacimiento': '04/07/1985'},
+        {'nombre': 'Ana', 'apellido': 'Ruiz', 'telefone': '1'},
+    ]
+    ids = iter(['n1', 'n2'])
+    to_create, results = plan_import('member', rows, existing, lambda r: {'id': next(ids), **r})
+    assert [r['nombre'] for r in to_create] == ['Luis', 'Ana']
+    assert to_create[0]['fecha_nacimiento'] == '1985-07-04' and to_create[1]['telefono'] == ''
+    assert results == [
+        {'row': 1, 'status': 'duplicate', 'id': 'm1'},
+        {'row': 2, 'status': 'new', 'id': 'n1'},
+        {'row': 3, 'status': 'duplicate', 'id': 'n1'},
+        {'row': 4, 'status': 'invalid', 'errors': ['nombre is required', 'fecha_nacimiento must be YYYY-MM-DD']},
+        {'row': 5, 'status': 'new', 'id': 'n2'},
+    ]
+    assert ignored_columns('member', rows) == ['telefone']
+
+def test_batch_append_updates_the_cache_once():
+    cache = SheetsCache()
+    cache.register_index('Amigos', 'search', lambda records: PeopleSearchIndex('friend', records))
+    cache.set('Amigos', [])
+    cache.append_records('Amigos', [{'id': f'f{i}', 'nombre': f'Amiga {i}'} for i in range(3)])
+    assert len(cache.get('Amigos')) == 3
+    assert len(cache.get_index('Amigos', 'search')) == 3
+    assert cache.version('Amigos') == 2
+
+def test_batch_update_and_removal_refresh_the_cache_once():
+    cache = SheetsCache()
+    cache.register_index('Amigos', 'search', lambda records: PeopleSearchIndex('friend', records))
+    cache.register_index('Amigos', 'count', len)
+    cache.set('Amigos', [{'id': f'f{i}', 'nombre': f'Amiga {i}'} for i in range(4)])
+    cache.apply_batch('Amigos', [{'id': 'f1', 'nombre': 'Rosa'}], ['f0', 'f3'])
+    assert cache.get('Amigos') == [{'id': 'f1', 'nombre': 'Rosa'}, {'id': 'f2', 'nombre': 'Amiga 2'}]
+    assert cache.get_index('Amigos', 'count') == 2
+    assert [p['id'] for p in cache.get_index('Amigos', 'search').search('rosa')] == ['f1']
+    assert cache.version('Amigos') == 2
+    # A record the cache does not hold: drop the sheet rather than guess
+    cache.apply_batch('Amigos', [], ['f9'])
+    assert cache.get('Amigos') is None
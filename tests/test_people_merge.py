@@ -0,0 +1,87 @@
+"""Merging and deleting people against the Sheets (in-memory) and SQLite backends"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from people_merge import InvalidMerge, PersonNotFound, delete_by_ids, merge_duplicates, merge_targets, plan_merge  # noqa: E402
+from sheets_cache import SheetsCache  # noqa: E402
+from storage import SheetsStorage, SQLiteStorage  # noqa: E402
+from tests.helpers import FakeSheetsService, make_attendance, make_member, public  # noqa: E402
+
+DELETED_AT = '2026-01-04T12:00:00-05:00'
+
+@pytest.fixture(params=['sheets', 'sqlite'])
+def storage(request, tmp_path):
+    if request.param == 'sheets':
+        return SheetsStorage(FakeSheetsService())
+    return SQLiteStorage(str(tmp_path / 'asistencia.sqlite3'))
+
+def people():
+    return {'m1': make_member(id='m1', nombre='Ana', apellido='Ruiz'), 'm2': make_member(id='m2'), 'm3': make_member(id='m3')}
+
+def test_plan_merge_reassigns_and_folds_duplicates():
+    rows = [
+        {**make_attendance('m1', '2026-01-04', presente=False), '_row': 2},
+        {**make_attendance('m2', '2026-01-04'), '_row': 3},  # same date as the kept person's row
+        {**make_attendance('m2', '2026-01-11'), '_row': 4},
+        {**make_attendance('m3', '2026-01-11'), '_row': 5},
+    ]
+    updates, deletes, reassigned = plan_merge('member', people(), {'m2': 'm1'}, rows)
+    assert deletes == [rows[1]]
+    assert reassigned == 1
+    by_row = {current['_row']: values for current, values in updates}
+    assert by_row[2]['presente'] == 'TRUE'  # present if either row was
+    assert (by_row[4]['person_id'], by_row[4]['person_name']) == ('m1', 'Ana Ruiz')
+    assert '_row' not in by_row[4]
+
+def test_merge_targets_rejects_unknown_and_repeated_ids():
+    with pytest.raises(PersonNotFound):
+        merge_targets(people(), [('m1', ['m9'])])
+    with pytest.raises(InvalidMerge):
+        merge_targets(people(), [('m1', ['m2']), ('m3', ['m2'])])
+    with pytest.raises(InvalidMerge):
+        merge_targets(people(), [('m1', ['m2']), ('m2', ['m3'])])
+    assert merge_targets(people(), [('m1', ['m2', 'm3'])]) == {'m2': 'm1', 'm3': 'm1'}
+
+def test_merge_plans_on_fresh_rows_not_stale_cached_ones(storage):
+    cache = SheetsCache(cache_duration_seconds=60)
+    storage.insert_many('Miembros', list(people().values()))
+    rows = storage.insert_many('Asistencia', [make_attendance('m3', '2026-01-04'), make_attendance('m1', '2026-01-04', presente=False),
+                                              make_attendance('m2', '2026-01-04'), make_attendance('m2', '2026-01-11')])
+    cache.set('Asistencia', storage.read_all('Asistencia'))
+    # Another worker deletes the first row: on Sheets every later row moves up
+    storage.delete_many('Asistencia', [rows[0]], DELETED_AT)
+    counts = asyncio.run(merge_duplicates(storage, cache, 'member', 'Miembros', ['Asistencia'], [('m1', ['m2'])], DELETED_AT))
+    assert counts == {'merged': 1, 'reassigned': 1, 'duplicates': 1}
+    stored = sorted((r['person_id'], r['fecha'], r['presente']) for r in storage.read_all('Asistencia'))
+    assert stored == [('m1', '2026-01-04', 'TRUE'), ('m1', '2026-01-11', 'TRUE')]
+    assert sorted(r['id'] for r in storage.read_all('Miembros')) == ['m1', 'm3']
+    assert sorted(r['id'] for r in cache.get('Miembros')) == ['m1', 'm3']
+    if isinstance(storage, SheetsStorage):
+        # Attendance rows are really deleted there (delete_many is True): the cache is dropped, not patched
+        assert cache.peek('Asistencia') is None
+    else:
+        assert sorted((r['person_id'], r['fecha']) for r in cache.get('Asistencia')) == [('m1', '2026-01-04'), ('m1', '2026-01-11')]
+
+def test_unknown_person_stops_the_merge_before_any_write(storage):
+    cache = SheetsCache(cache_duration_seconds=60)
+    storage.insert_many('Miembros', [make_member(id='m1'), make_member(id='m2')])
+    storage.insert('Asistencia', make_attendance('m2', '2026-01-04'))
+    with pytest.raises(PersonNotFound):
+        asyncio.run(merge_duplicates(storage, cache, 'member', 'Miembros', ['Asistencia'], [('m1', ['m2', 'm9'])], DELETED_AT))
+    assert [r['person_id'] for r in storage.read_all('Asistencia')] == ['m2']
+    assert len(storage.read_all('Miembros')) == 2
+
+def test_delete_by_ids_reads_the_rows_it_deletes(storage):
+    cache = SheetsCache(cache_duration_seconds=60)
+    members = storage.insert_many('Miembros', [make_member(id=f'm{i}') for i in range(4)])
+    cache.set('Miembros', storage.read_all('Miembros'))
+    storage.delete_many('Miembros', [members[0]], DELETED_AT)  # deleted elsewhere after caching
+    deleted, not_found = asyncio.run(delete_by_ids(storage, cache, 'Miembros', ['m2', 'm0', 'm9', 'm2'], DELETED_AT))
+    assert (deleted, not_found) == (['m2'], ['m0', 'm9'])
+    assert [public(r)['id'] for r in storage.read_all('Miembros')] == ['m1', 'm3']
+    assert [r['id'] for r in cache.get('Miembros')] == ['m1', 'm3']
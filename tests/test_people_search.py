@@ -0,0 +1,54 @@
+"""People search index: accent-insensitive ranking, phone lookup and incremental updates"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from people_search import PeopleSearchIndex, normalize_phone, normalize_text, top_matches  # noqa: E402
+
+MEMBERS = [
+    {'id': 'm1', 'nombre': 'José', 'apellido': 'Peña', 'telefono': '(203) 555-0101'},
+    {'id': 'm2', 'nombre': 'Josefina', 'apellido': 'Ramírez', 'telefono': '2035550199'},
+    {'id': 'm3', 'nombre': 'María', 'apellido': 'José Núñez', 'telefono': ''},
+]
+
+def ids(matches):
+    return [match['id'] for match in matches]
+
+def test_normalization():
+    assert normalize_text('  José   PEÑA!') == 'jose pena'
+    assert normalize_phone('+1 (203) 555-0101') == '2035550101'
+
+def test_accents_and_case_do_not_matter():
+    index = PeopleSearchIndex('member', MEMBERS)
+    assert ids(index.search('jose pena')) == ids(index.search('JOSÉ PEÑA'))
+    assert ids(index.search('jose pena'))[0] == 'm1'
+    assert ids(index.search('nunez', limit=1)) == ['m3']
+
+def test_whole_word_matches_rank_above_prefixes():
+    index = PeopleSearchIndex('member', MEMBERS)
+    # 'jose' is a whole word of m1 and m3 but only a prefix of 'josefina'
+    ranked = ids(index.search('jose'))
+    assert set(ranked[:2]) == {'m1', 'm3'} and ranked[2] == 'm2'
+
+def test_fuzzy_match_fills_in_for_typos():
+    index = PeopleSearchIndex('member', MEMBERS)
+    assert ids(index.search('ramirex'))[0] == 'm2'
+
+def test_phone_digits():
+    index = PeopleSearchIndex('member', MEMBERS)
+    assert ids(index.search('555-0199')) == ['m2']
+
+def test_add_and_remove_keep_the_index_current():
+    index = PeopleSearchIndex('member', MEMBERS)
+    index.add({'id': 'm1', 'nombre': 'Pedro', 'apellido': 'Peña', 'telefono': ''})
+    assert 'm1' not in ids(index.search('jose'))
+    assert ids(index.search('pedro')) == ['m1']
+    index.remove({'id': 'm1'})
+    assert index.search('pedro') == [] and len(index) == 2
+
+def test_top_matches_across_members_and_friends():
+    members = PeopleSearchIndex('member', MEMBERS)
+    friends = PeopleSearchIndex('friend', [{'id': 'f1', 'nombre': 'José Peña', 'de_donde_viene': 'Bridgeport'}])
+    matches = top_matches([members, friends], 'jose pena', 2)
+    assert {(m['tipo'], m['id']) for m in matches} == {('member', 'm1'), ('friend', 'f1')}
@@ -0,0 +1,67 @@
+"""Person registry: attendance rows are flagged orphaned when their person is deleted, and back"""
+import sys
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from person_registry import PersonRegistry  # noqa: E402
+from sheets_cache import SheetsCache  # noqa: E402
+
+def make_cache():
+    registry = PersonRegistry()
+    cache = SheetsCache(cache_duration_seconds=60)
+    cache.register_index('Miembros', 'registry', partial(registry.track, 'Miembros'))
+    cache.register_index('Amigos', 'registry', partial(registry.track, 'Amigos'))
+    cache.register_index('Asistencia', 'valid', partial(registry.attendance_validity, 'Asistencia'))
+    cache.set('Miembros', [{'id': 'm1'}, {'id': 'm2'}])
+    cache.set('Amigos', [{'id': 'f1'}])
+    cache.set('Asistencia', [{'id': 'a1', 'person_id': 'm1'}, {'id': 'a2', 'person_id': 'm2'},
+                             {'id': 'a3', 'person_id': 'f1'}, {'id': 'a4', 'person_id': 'm1'}])
+    return registry, cache
+
+def flags(cache):
+    validity = cache.get_index('Asistencia', 'valid')
+    return [validity.is_valid(record) for record in cache.get('Asistencia')]
+
+def test_rows_of_existing_people_are_valid():
+    _, cache = make_cache()
+    assert flags(cache) == [True, True, True, True]
+
+def test_member_delete_flips_only_their_rows():
+    _, cache = make_cache()
+    cache.remove_record('Miembros', 'm1')
+    assert flags(cache) == [False, True, True, False]
+    # Re-created (e.g. an undo): the rows count again
+    cache.append_record('Miembros', {'id': 'm1'})
+    assert flags(cache) == [True, True, True, True]
+
+def test_reload_of_a_people_sheet_flips_rows_of_people_that_changed():
+    registry, cache = make_cache()
+    cache.set('Amigos', [])
+    assert flags(cache) == [True, True, False, True]
+    assert not registry.is_valid('f1') and registry.is_valid('m2')
+
+def test_new_attendance_rows_are_flagged_without_a_rebuild():
+    _, cache = make_cache()
+    cache.append_record('Asistencia', {'id': 'a5', 'person_id': 'gone'})
+    assert flags(cache)[-1] is False
+    assert flags(cache)[:4] == [True, True, True, True]
+
+def test_attendance_writes_do_not_rebuild_the_flags():
+    registry, cache = make_cache()
+    builds = []
+    builder = cache.index_builders['Asistencia']['valid']
+    cache.index_builders['Asistencia']['valid'] = lambda records: builds.append(len(records)) or builder(records)
+    validity = cache.get_index('Asistencia', 'valid')
+    cache.append_records('Asistencia', [{'id': 'a5', 'person_id': 'm2'}, {'id': 'a6', 'person_id': 'new'}])
+    cache.update_record('Asistencia', 'a1', {'id': 'a1', 'person_id': 'f1'})
+    cache.remove_record('Asistencia', 'a2')
+    assert builds == []
+    assert cache.get_index('Asistencia', 'valid') is validity
+    assert flags(cache) == [True, True, True, True, False]
+    # m1's only row left was a4; once it goes, m1 has no flag to flip
+    cache.remove_record('Asistencia', 'a4')
+    assert 'm1' not in validity.valid
+    registry.add('Miembros', 'new')
+    assert flags(cache) == [True, True, True, True]
@@ -0,0 +1,25 @@
+"""Report memo: LRU bound and hit/miss accounting"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from report_cache import ReportCache  # noqa: E402
+
+def test_hits_misses_and_lru_eviction():
+    cache = ReportCache(max_entries=2)
+    assert cache.get('a') is None
+    cache.put('a', {'total': 1})
+    cache.put('b', {'total': 2})
+    assert cache.get('a') == {'total': 1}  # a is now the most recently used
+    cache.put('c', {'total': 3})
+    assert cache.get('b') is None
+    assert cache.get('c') == {'total': 3}
+    assert cache.stats() == {'entries': 2, 'max_entries': 2, 'hits': 2, 'misses': 2, 'evictions': 1, 'hit_rate': 0.5}
+
+def test_new_data_version_is_a_new_key():
+    cache = ReportCache()
+    key = ('collective', ('2026-01-01', '2026-12-31'), (('Asistencia', 3),))
+    cache.put(key, {'total_present': 10})
+    assert cache.get(key[:2] + ((('Asistencia', 4),),)) is None
+    assert cache.get(key) == {'total_present': 10}
@@ -0,0 +1,50 @@
+"""Per-request profiling spans"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from request_profiler import RequestProfile, current_profile, instrument, span, timed_async  # noqa: E402
+
+class Backend:
+    def read_all(self, table):
+        return [table]
+
+def test_spans_are_recorded_only_while_profiling():
+    backend = Backend()
+    instrument(backend, ['read_all'], 'sheets')
+    assert backend.read_all('Miembros') == ['Miembros']
+
+    profile = RequestProfile()
+    token = current_profile.set(profile)
+    try:
+        backend.read_all('Miembros')
+        backend.read_all('Amigos')
+        with span('cache.get'):
+            pass
+    finally:
+        current_profile.reset(token)
+    backend.read_all('Asistencia')
+
+    assert dict(profile.counts) == {'sheets.read_all': 2, 'cache.get': 1}
+    header = profile.server_timing()
+    assert 'sheets.read_all;desc="2 calls";dur=' in header
+    assert header.split(', ')[-1].startswith('total;dur=')
+
+def test_async_spans_follow_the_request_context():
+    async def serialize(value):
+        await asyncio.sleep(0)
+        return value
+
+    timed_serialize = timed_async('serialize', serialize)
+
+    async def request():
+        profile = RequestProfile()
+        current_profile.set(profile)
+        await asyncio.gather(timed_serialize(1), asyncio.to_thread(lambda: None))
+        return profile
+
+    profile = asyncio.run(request())
+    assert profile.counts['serialize'] == 1
+    assert current_profile.get() is None
@@ -0,0 +1,178 @@
+"""Server glue over SQLite storage: attendance shard discovery, upload limits, cache warming and log route tags"""
+import asyncio
+import sys
+import threading
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException, Response
+from starlette.requests import Request
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from change_probe import LocalChangeProbe  # noqa: E402
+from storage import SQLiteStorage  # noqa: E402
+from tests.helpers import import_server, make_attendance, make_member  # noqa: E402
+
+class ThreadRecordingProbe(LocalChangeProbe):
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def token(self):
+        self.threads.append(threading.current_thread())
+        return super().token()
+
+class ThreadRecordingStorage(SQLiteStorage):
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = []
+
+    def read_all(self, table):
+        self.threads.append(threading.current_thread())
+        return super().read_all(table)
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    server = import_server()
+    monkeypatch.setattr(server, 'storage', ThreadRecordingStorage(str(tmp_path / 'data.sqlite3')))
+    monkeypatch.setattr(server.sheets_cache, 'probe', None)
+    monkeypatch.setattr(server.sheets_cache, 'probed_at', None)
+    monkeypatch.setattr(server, 'ATTENDANCE_SHARDING', True)
+    monkeypatch.setattr(server, 'known_attendance_shards', None)
+    monkeypatch.setattr(server, 'shards_listed_at', 0.0)
+    monkeypatch.setattr(server, 'get_eastern_today', lambda: '2026-01-04')
+    server.sheets_cache.clear()
+    server.report_cache.clear()
+    yield server
+    server.sheets_cache.clear()
+    server.report_cache.clear()
+
+def shard_tables(storage):
+    return [table for table in storage.list_tables() if table.startswith('Asistencia_')]
+
+def test_reading_today_does_not_create_the_shard(server):
+    assert asyncio.run(server.get_today_attendance(Response(), current_user='admin')) == []
+    assert shard_tables(server.storage) == []
+
+def test_shard_created_by_another_worker_is_found(server, monkeypatch):
+    assert asyncio.run(server.get_today_attendance(Response(), current_user='admin')) == []
+    # Another worker creates this year's shard and checks someone in
+    other = SQLiteStorage(server.storage.path)
+    other.insert('Asistencia_2026', make_attendance('m1', '2026-01-04'))
+    # Within SHARD_MISS_RELIST_SECONDS the miss is not looked up again
+    assert asyncio.run(server.get_today_attendance(Response(), current_user='admin')) == []
+    monkeypatch.setattr(server, 'SHARD_MISS_RELIST_SECONDS', 0)
+    today = asyncio.run(server.get_today_attendance(Response(), current_user='admin'))
+    assert [person['person_id'] for person in today] == ['m1']
+
+def test_writes_create_the_shard(server):
+    assert asyncio.run(server.attendance_table_for('2026-01-04')) == 'Asistencia_2026'
+    assert shard_tables(server.storage) == ['Asistencia_2026']
+    assert server.attendance_tables() == ['Asistencia_2026']
+
+def test_shard_list_is_refreshed(server):
+    assert server.attendance_tables() == []
+    SQLiteStorage(server.storage.path).ensure_table('Asistencia_2025')
+    assert server.attendance_tables() == []
+    server.list_attendance_shards()
+    assert server.attendance_tables() == ['Asistencia_2025']
+
+def upload_request(chunks, content_length=None):
+    """A request whose body arrives in chunks; received records the chunks read"""
+    headers = [(b'content-length', str(content_length).encode())] if content_length is not None else []
+    messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1} for i, chunk in enumerate(chunks)]
+    received = []
+
+    async def receive():
+        received.append(messages[len(received)])
+        return received[-1]
+    return Request({'type': 'http', 'method': 'POST', 'headers': headers}, receive), received
+
+def test_upload_within_the_limit_is_read(server):
+    request, _ = upload_request([b'nombre\n', b'Ana\n'], content_length=11)
+    assert asyncio.run(server.read_upload(request, 11)) == b'nombre\nAna\n'
+
+def test_declared_oversize_upload_is_refused_unread(server):
+    request, received = upload_request([b'x' * 100], content_length=100)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.read_upload(request, 10))
+    assert error.value.status_code == 413
+    assert received == []
+
+def test_undeclared_oversize_upload_stops_at_the_limit(server):
+    request, received = upload_request([b'x' * 8] * 10)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.read_upload(request, 10))
+    assert error.value.status_code == 413
+    assert len(received) == 2
+
+def test_warm_caches_probes_and_reads_off_the_event_loop(server, monkeypatch):
+    probe = ThreadRecordingProbe()
+    monkeypatch.setattr(server.sheets_cache, 'probe', probe)
+    server.storage.insert('Miembros', make_member(id='m1'))
+    server.storage.insert('Asistencia_2026', make_attendance('m1', '2026-01-04'))
+    main = threading.current_thread()
+    asyncio.run(server.warm_caches())
+    assert [r['id'] for r in server.sheets_cache.get('Miembros')] == ['m1']
+    assert server.sheets_cache.get('Asistencia_2026') is not None
+    assert server.report_cache.stats()['entries'] > 0
+    assert server.storage.threads and main not in server.storage.threads
+    assert probe.threads and main not in probe.threads
+    # Warming again within the horizon revalidates with one fresh probe and rereads nothing
+    reads, probes = len(server.storage.threads), len(probe.threads)
+    asyncio.run(server.warm_caches(horizon_seconds=3600))
+    assert len(server.storage.threads) == reads
+    assert len(probe.threads) == probes + 1 and main not in probe.threads
+    probe.bump()
+    asyncio.run(server.warm_caches(horizon_seconds=3600))
+    assert len(server.storage.threads) > reads and main not in server.storage.threads
+
+def expire(cache):
+    for entry in cache.cache.values():
+        entry['timestamp'] -= timedelta(days=1)
+
+def test_search_and_min_version_reads_probe_off_the_event_loop(server, monkeypatch):
+    probe = ThreadRecordingProbe()
+    monkeypatch.setattr(server.sheets_cache, 'probe', probe)
+    monkeypatch.setattr(server.sheets_cache, 'probe_interval', timedelta(0))
+    server.storage.insert('Miembros', make_member(id='m1', nombre='Ana'))
+    server.storage.insert('Asistencia_2026', make_attendance('m1', '2026-01-04'))
+    main = threading.current_thread()
+
+    def read_all():
+        results = asyncio.run(server.search_people('ana', current_user='admin'))
+        min_version = f'Asistencia_2026:{server.sheets_cache.epoch}:0'
+        today = asyncio.run(server.get_today_attendance(Response(), min_version=min_version, current_user='admin'))
+        asyncio.run(server.get_upcoming_birthdays(current_user='admin'))
+        return [person['id'] for person in results], [person['person_id'] for person in today]
+    # Cold cache, then expired entries that the probe revalidates without rereading
+    assert read_all() == (['m1'], ['m1'])
+    reads = len(server.storage.threads)
+    expire(server.sheets_cache)
+    assert read_all() == (['m1'], ['m1'])
+    assert len(server.storage.threads) == reads
+    assert probe.threads and main not in probe.threads
+
+def test_log_records_carry_the_route_template(server):
+    import httpx
+    from log_pipeline import current_route
+    routes = []
+
+    def record_route():
+        routes.append(current_route.get())
+        return 'admin'
+
+    async def fetch(path):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await client.get(path)
+    server.app.dependency_overrides[server.get_current_user] = record_route
+    try:
+        assert asyncio.run(fetch('/api/members/m9')).status_code == 404
+        asyncio.run(fetch('/api/people/search?q=ana'))
+    finally:
+        server.app.dependency_overrides.clear()
+    assert routes == ['/api/members/{member_id}', '/api/people/search']
+    assert current_route.get() == ''
@@ -0,0 +1,81 @@
+"""Workers sharing one SheetsCache through a SharedCacheStore: deltas, folding, conflicts and invalidation"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from shared_cache import SharedCacheStore  # noqa: E402
+from sheets_cache import SheetsCache  # noqa: E402
+
+class IdSet:
+    """Incremental index: the cached ids"""
+    def __init__(self, records):
+        self.ids = {record['id'] for record in records}
+
+    def add(self, record):
+        self.ids.add(record['id'])
+
+    def remove(self, record):
+        self.ids.discard(record['id'])
+
+def workers(tmp_path, max_changes=100):
+    path = str(tmp_path / 'cache.sqlite3')
+    return (SheetsCache(store=SharedCacheStore(path, max_changes=max_changes)),
+            SheetsCache(store=SharedCacheStore(path, max_changes=max_changes)))
+
+def test_writes_are_published_as_deltas_and_replayed(tmp_path):
+    writer, reader = workers(tmp_path)
+    reader.register_index('Miembros', 'ids', IdSet)
+    writer.set('Miembros', [{'id': 'm1', 'nombre': 'Ana'}, {'id': 'm2', 'nombre': 'Beto'}])
+    index = reader.get_index('Miembros', 'ids')
+    writer.append_record('Miembros', {'id': 'm3', 'nombre': 'Eva'})
+    writer.update_record('Miembros', 'm1', {'id': 'm1', 'nombre': 'Ana María'})
+    writer.remove_record('Miembros', 'm2')
+    writer.apply_batch('Miembros', [{'id': 'm3', 'nombre': 'Eva Luna'}])
+    # The snapshot is still the fill; only the four changes were written
+    assert writer.store.load('Miembros')[2] == [{'id': 'm1', 'nombre': 'Ana'}, {'id': 'm2', 'nombre': 'Beto'}]
+    assert len(writer.store.changes_since('Miembros', 1)[2]) == 4
+    assert reader.get('Miembros') == [{'id': 'm1', 'nombre': 'Ana María'}, {'id': 'm3', 'nombre': 'Eva Luna'}]
+    # Replayed onto the same entry: the incremental index followed along instead of being rebuilt
+    assert reader.get_index('Miembros', 'ids') is index
+    assert index.ids == {'m1', 'm3'}
+    assert reader.version('Miembros') == writer.version('Miembros') == 5
+
+def test_long_logs_are_folded_into_a_new_snapshot(tmp_path):
+    writer, reader = workers(tmp_path, max_changes=3)
+    writer.set('Asistencia', [{'id': 'a0'}])
+    assert reader.get('Asistencia') == [{'id': 'a0'}]
+    for i in range(1, 5):
+        writer.append_record('Asistencia', {'id': f'a{i}'})
+    # Folded at the third change: the reader is behind the snapshot and loads it, then the rest
+    version, _, data = writer.store.load('Asistencia')
+    assert (version, len(data)) == (4, 4)
+    assert [r['id'] for r in reader.get('Asistencia')] == ['a0', 'a1', 'a2', 'a3', 'a4']
+
+def test_conflicting_write_drops_the_entry_in_every_worker(tmp_path):
+    first, second = workers(tmp_path)
+    first.set('Amigos', [{'id': 'f1', 'nombre': 'Ana'}])
+    assert second.get('Amigos') is not None
+    stale_version = second.cache['Amigos']['version']
+    first.append_record('Amigos', {'id': 'f2', 'nombre': 'Beto'})
+    # The store refuses a change based on an older version
+    assert second.store.publish_change('Amigos', {'remove': ['f1']}, 0, stale_version, lambda: []) is None
+    # A worker whose write races another one (published between its sync and its publish)
+    # drops the sheet everywhere instead of overwriting the other write
+    second._sync = lambda sheet_name: None
+    second.update_record('Amigos', 'f1', {'id': 'f1', 'nombre': 'Ana María'})
+    assert 'Amigos' not in second.cache
+    assert first.get('Amigos') is None
+
+def test_invalidation_reaches_other_workers(tmp_path):
+    first, second = workers(tmp_path)
+    first.set('Miembros', [{'id': 'm1'}])
+    first.set('Amigos', [{'id': 'f1'}])
+    assert second.get('Miembros') == [{'id': 'm1'}]
+    second.invalidate('Miembros')
+    assert first.get('Miembros') is None
+    assert first.get('Amigos') == [{'id': 'f1'}]
+    first.set('Miembros', [{'id': 'm2'}])
+    assert second.get('Miembros') == [{'id': 'm2'}]
+    second.clear()
+    assert first.get('Miembros') is None and first.get('Amigos') is None
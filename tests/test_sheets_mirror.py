@@ -0,0 +1,94 @@
+"""SQLite outbox replication to (in-memory) Google Sheets"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from sheets_mirror import SheetsMirror  # noqa: E402
+from storage import SheetsStorage, SQLiteStorage  # noqa: E402
+from tests.helpers import FakeSheetsService, make_member, public  # noqa: E402
+
+def make_pair(tmp_path):
+    db = SQLiteStorage(str(tmp_path / 'asistencia.sqlite3'))
+    sheets = SheetsStorage(FakeSheetsService())
+    return db, sheets, SheetsMirror(db.path, sheets)
+
+def test_writes_reach_the_sheet_in_order(tmp_path):
+    db, sheets, mirror = make_pair(tmp_path)
+    stored = [db.insert('Miembros', make_member(id=f'm{i}')) for i in range(3)]
+    db.update('Miembros', stored[0], make_member(id='m0', nombre='Primero'))
+    db.delete('Miembros', stored[1], '2026-01-04T12:00:00-05:00')
+    assert sheets.read_all('Miembros') == []
+    assert mirror.pending() == 5
+
+    mirror.replicate_once()
+    assert mirror.pending() == 0
+    assert [public(r) for r in sheets.read_all('Miembros')] == [public(r) for r in db.read_all('Miembros')]
+
+def test_import_then_mirror_keeps_existing_rows(tmp_path):
+    db, sheets, mirror = make_pair(tmp_path)
+    sheets.insert('Miembros', make_member(id='old'))
+    assert db.is_empty()
+    db.import_from(sheets)
+    [record] = db.read_all('Miembros')
+    db.update('Miembros', record, make_member(id='old', nombre='Actualizado'))
+    mirror.replicate_once()
+    assert [(r['id'], r['nombre']) for r in sheets.read_all('Miembros')] == [('old', 'Actualizado')]
+
+def test_compact_remaps_rows(tmp_path):
+    db, sheets, mirror = make_pair(tmp_path)
+    stored = [db.insert('Amigos', {'id': f'f{i}', 'nombre': f'Amigo {i}', 'de_donde_viene': '', 'fecha_registro': ''}) for i in range(3)]
+    db.delete('Amigos', stored[0], '2026-01-04T12:00:00-05:00')
+    mirror.replicate_once()
+    assert mirror.compact('Amigos')['removed'] == 1
+    # f2 moved up a row in the sheet; its next update must land on the right row
+    db.update('Amigos', stored[2], {**public(stored[2]), 'nombre': 'Movido'})
+    mirror.replicate_once()
+    assert [(r['id'], r['nombre']) for r in sheets.read_all('Amigos')] == [('f1', 'Amigo 1'), ('f2', 'Movido')]
+
+def test_only_the_lease_holder_replicates(tmp_path):
+    now = [1000.0]
+    db, sheets, first = make_pair(tmp_path)
+    second = SheetsMirror(db.path, sheets, lease_seconds=60, clock=lambda: now[0])
+    first.clock = lambda: now[0]
+    db.insert('Miembros', make_member(id='m1'))
+    assert first.replicate_once() == 1
+    db.insert('Miembros', make_member(id='m2'))
+    assert second.replicate_once() == 0
+    assert second.compact('Miembros')['success'] is False
+    # The holder stops renewing (process gone): the lease expires and the other worker takes over
+    now[0] += 61
+    assert second.replicate_once() == 1
+    assert first.replicate_once() == 0
+    assert [r['id'] for r in sheets.read_all('Miembros')] == ['m1', 'm2']
+
+def test_only_one_worker_imports(tmp_path):
+    db, sheets, _ = make_pair(tmp_path)
+    other = SQLiteStorage(db.path)
+    sheets.insert('Miembros', make_member(id='old'))
+    assert db.import_from(sheets, only_if_empty=True) == {'Miembros': 1, 'Amigos': 0, 'Asistencia': 0}
+    assert other.import_from(sheets, only_if_empty=True) is None
+    assert [r['id'] for r in other.read_all('Miembros')] == ['old']
+
+def test_replay_after_a_crash_does_not_duplicate_rows(tmp_path):
+    db, sheets, mirror = make_pair(tmp_path)
+    stored = db.insert('Miembros', make_member(id='m1'))
+    done = mirror._done
+
+    def crash(*args):
+        raise RuntimeError("process killed")
+
+    # The row reaches the sheet, then the process dies before the outbox entry is dropped
+    mirror._done = crash
+    with pytest.raises(RuntimeError):
+        mirror.replicate_once()
+    assert mirror.pending() == 1
+    mirror._done = done
+    assert mirror.replicate_once() == 1
+    assert [r['id'] for r in sheets.read_all('Miembros')] == ['m1']
+    # The replayed entry still learnt its sheet row: later updates land on it
+    db.update('Miembros', stored, {**public(stored), 'nombre': 'Otra'})
+    mirror.replicate_once()
+    assert [(r['id'], r['nombre']) for r in sheets.read_all('Miembros')] == [('m1', 'Otra')]
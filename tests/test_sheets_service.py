@@ -0,0 +1,173 @@
+"""SheetsService over an in-memory gspread spreadsheet: the real request-building code paths"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from storage import TABLE_COLUMNS, TOMBSTONE_COLUMN, SheetsStorage  # noqa: E402
+from tests.helpers import FakeSpreadsheet, make_attendance, make_member, make_sheets_service, public  # noqa: E402
+
+HEADERS = {
+    'Miembros': TABLE_COLUMNS['Miembros'] + [TOMBSTONE_COLUMN],
+    'Amigos': TABLE_COLUMNS['Amigos'] + [TOMBSTONE_COLUMN],
+    'Asistencia': TABLE_COLUMNS['Asistencia']
+}
+
+def make_spreadsheet():
+    return FakeSpreadsheet({name: [list(header)] for name, header in HEADERS.items()})
+
+def member_rows(spreadsheet):
+    header, *rows = spreadsheet.tabs['Miembros'].rows
+    return [dict(zip(header, row + [''] * (len(header) - len(row)))) for row in rows]
+
+def test_tombstone_row_marks_only_the_target_row():
+    spreadsheet = make_spreadsheet()
+    sheets = SheetsStorage(make_sheets_service(spreadsheet))
+    members = sheets.insert_many('Miembros', [make_member(id=f'm{i}') for i in range(3)])
+    sheets.delete('Miembros', members[1], '2026-01-04T12:00:00-05:00')
+    assert [row[TOMBSTONE_COLUMN] for row in member_rows(spreadsheet)] == ['', '2026-01-04T12:00:00-05:00', '']
+    assert [r['id'] for r in sheets.read_all('Miembros')] == ['m0', 'm2']
+
+def test_compact_drops_tombstoned_rows_and_moves_live_rows_up():
+    spreadsheet = make_spreadsheet()
+    service = make_sheets_service(spreadsheet)
+    sheets = SheetsStorage(service)
+    members = sheets.insert_many('Miembros', [make_member(id=f'm{i}') for i in range(5)])
+    sheets.delete_many('Miembros', [members[0], members[3]], '2026-01-04T12:00:00-05:00')
+    sheets.read_all('Miembros')
+    assert service.compact('Miembros') == {"success": True, "removed": 2, "rows": 3}
+    assert [row['id'] for row in member_rows(spreadsheet)] == ['m1', 'm2', 'm4']
+    assert [(r['id'], r['_row']) for r in sheets.read_all('Miembros')] == [('m1', 2), ('m2', 3), ('m4', 4)]
+    assert 'Miembros' in service.snapshots  # the read after compacting, not the one before
+
+def test_compact_writes_cells_back_unparsed():
+    spreadsheet = make_spreadsheet()
+    service = make_sheets_service(spreadsheet)
+    sheets = SheetsStorage(service)
+    members = sheets.insert_many('Miembros', [make_member(id='m0'), make_member(id='m1')])
+    # A phone number kept as text in the sheet (typed with a leading apostrophe)
+    header = spreadsheet.tabs['Miembros'].rows[0]
+    spreadsheet.tabs['Miembros'].rows[2][header.index('telefono')] = '02035550101'
+    sheets.delete('Miembros', members[0], '2026-01-04T12:00:00-05:00')
+    assert service.compact('Miembros')['success'] is True
+    assert [(row['id'], row['telefono']) for row in member_rows(spreadsheet)] == [('m1', '02035550101')]
+
+def test_compact_gives_up_if_the_sheet_changes_meanwhile():
+    spreadsheet = make_spreadsheet()
+    service = make_sheets_service(spreadsheet)
+    sheets = SheetsStorage(service)
+    members = sheets.insert_many('Miembros', [make_member(id=f'm{i}') for i in range(3)])
+    sheets.delete('Miembros', members[0], '2026-01-04T12:00:00-05:00')
+    worksheet = spreadsheet.tabs['Miembros']
+    read = worksheet.get_all_values
+
+    def read_then_edit_elsewhere():
+        rows = read()
+        spreadsheet.version += 1  # someone edits the sheet while we hold the rows
+        return rows
+
+    worksheet.get_all_values = read_then_edit_elsewhere
+    assert service.compact('Miembros')['success'] is False
+    assert len(worksheet.rows) == 4
+
+def test_writes_follow_rows_moved_by_another_workers_compaction():
+    spreadsheet = make_spreadsheet()
+    mine, other = SheetsStorage(make_sheets_service(spreadsheet)), SheetsStorage(make_sheets_service(spreadsheet))
+    members = mine.insert_many('Miembros', [make_member(id=f'm{i}') for i in range(4)])
+    # Another worker deletes m0 and compacts: every later row moves up one
+    other.delete('Miembros', other.read_all('Miembros')[0], '2026-01-04T12:00:00-05:00')
+    other.compact('Miembros')
+    # Our '_row' values are now stale; writes must still hit the right records
+    updated = mine.update('Miembros', members[2], {**public(members[2]), 'nombre': 'Rosa'})
+    assert updated['_row'] == 3
+    mine.delete('Miembros', members[3], '2026-01-04T13:00:00-05:00')
+    rows = {row['id']: row for row in member_rows(spreadsheet)}
+    assert (rows['m1']['nombre'], rows['m1'][TOMBSTONE_COLUMN]) == ('José', '')
+    assert (rows['m2']['nombre'], rows['m2'][TOMBSTONE_COLUMN]) == ('Rosa', '')
+    assert rows['m3'][TOMBSTONE_COLUMN] == '2026-01-04T13:00:00-05:00'
+    # Already gone: deleting is a no-op, updating is an error
+    mine.delete('Miembros', members[0], '2026-01-04T13:00:00-05:00')
+    with pytest.raises(ValueError):
+        mine.update('Miembros', members[0], public(members[0]))
+
+def test_read_many_is_one_batch_request_for_every_tab():
+    spreadsheet = make_spreadsheet()
+    spreadsheet.tabs['Amigos'].rows.append(['f1', 'Ana', 'Norwalk', '2026-01-04'])
+    service = make_sheets_service(spreadsheet)
+    spreadsheet.requests = 0
+    result = service.read_many(['Miembros', 'Amigos', 'Asistencia'])
+    assert spreadsheet.requests == 1
+    assert result['Miembros'] == [] and result['Asistencia'] == []
+    assert result['Amigos'] == [{'id': 'f1', 'nombre': 'Ana', 'de_donde_viene': 'Norwalk', 'fecha_registro': '2026-01-04',
+                                 TOMBSTONE_COLUMN: '', '_row': 2}]
+
+def test_rows_are_padded_numbered_and_numericised():
+    header = HEADERS['Amigos'] + ['']  # a stray unnamed column
+    spreadsheet = FakeSpreadsheet({**{name: [list(h)] for name, h in HEADERS.items()}, 'Amigos': [
+        header,
+        ['f1', 'Ana'],                      # trailing cells missing
+        [],                                 # blank row in the middle
+        ['42', 'Beto', '', '', '', 'x'],    # numeric id, value under the unnamed column
+    ]})
+    records = make_sheets_service(spreadsheet).read_all('Amigos')
+    assert [record['_row'] for record in records] == [2, 3, 4]
+    assert records[0] == {'id': 'f1', 'nombre': 'Ana', 'de_donde_viene': '', 'fecha_registro': '',
+                          TOMBSTONE_COLUMN: '', '_row': 2}
+    assert records[1]['id'] == '' and records[1]['_row'] == 3
+    assert records[2]['id'] == 42 and '' not in records[2]
+
+def test_tabs_without_rows_and_missing_headers():
+    spreadsheet = make_spreadsheet()
+    service = make_sheets_service(spreadsheet)
+    spreadsheet.tabs['Miembros'].rows = []
+    assert service.read_all('Miembros') == []
+    assert 'Miembros' not in service.snapshots
+    spreadsheet.tabs['Amigos'].rows = [['id', 'nombre']]
+    with pytest.raises(Exception, match='missing headers'):
+        service.read_all('Amigos')
+
+def test_tail_reads_start_below_the_last_row_read():
+    spreadsheet = make_spreadsheet()
+    mine, other = SheetsStorage(make_sheets_service(spreadsheet)), SheetsStorage(make_sheets_service(spreadsheet))
+    mine.insert('Asistencia', make_attendance('m1', '2026-01-04'))
+    cached = mine.read_all('Asistencia')
+    added = [make_attendance('m2', '2026-01-11'), make_attendance('m3', '2026-01-11')]
+    other.insert_many('Asistencia', added)
+    tail = mine.read_tail('Asistencia', cached)
+    assert [public(r) for r in tail] == added and [r['_row'] for r in tail] == [3, 4]
+    assert mine.read_tail('Asistencia', cached + tail) == []
+    assert mine.service.snapshots['Asistencia']['tail_reads'] == 2
+
+def test_foreign_row_followed_by_a_local_append_is_not_skipped():
+    spreadsheet = make_spreadsheet()
+    mine, other = SheetsStorage(make_sheets_service(spreadsheet)), SheetsStorage(make_sheets_service(spreadsheet))
+    mine.insert('Asistencia', make_attendance('m1', '2026-01-04'))
+    cached = mine.read_all('Asistencia')
+    foreign = other.insert('Asistencia', make_attendance('m2', '2026-01-11'))
+    # Our own write lands below the foreign row and goes straight into our cache
+    cached.append(mine.insert('Asistencia', make_attendance('m3', '2026-01-11')))
+    tail = mine.read_tail('Asistencia', cached)
+    assert [(r['id'], r['_row']) for r in tail] == [(foreign['id'], 3)]
+
+def test_tail_past_the_grid_is_empty_and_counted():
+    spreadsheet = make_spreadsheet()
+    service = make_sheets_service(spreadsheet)
+    SheetsStorage(service).insert('Asistencia', make_attendance('m1', '2026-01-04'))
+    worksheet = spreadsheet.tabs['Asistencia']
+    worksheet.row_count = len(worksheet.rows)  # no empty rows left below the data
+    service.read_all('Asistencia')
+    assert service.read_tail('Asistencia') == []
+    assert service.snapshots['Asistencia']['tail_reads'] == 1
+
+def test_list_tables_picks_up_shards_created_elsewhere():
+    spreadsheet = make_spreadsheet()
+    sheets = SheetsStorage(make_sheets_service(spreadsheet))
+    assert 'Asistencia_2026' not in sheets.list_tables()
+    # Another worker creates this year's shard
+    SheetsStorage(make_sheets_service(spreadsheet)).ensure_table('Asistencia_2026')
+    assert 'Asistencia_2026' in sheets.list_tables()
+    assert sheets.service.expected_headers['Asistencia_2026'] == HEADERS['Asistencia']
+    del spreadsheet.tabs['Asistencia_2026']
+    assert 'Asistencia_2026' not in sheets.list_tables()
@@ -0,0 +1,138 @@
+"""Conformance suite run against every storage backend (throughput: benchmarks/bench_storage.py).
+
+The Sheets backend runs over an in-memory stand-in for SheetsService (same row semantics:
+header in row 1, appends after the last used row, soft deletes via the tombstone column);
+the Mongo backend runs over mongomock; the SQLite backend runs on a temporary file.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from storage import MongoStorage, SheetsStorage, SQLiteStorage  # noqa: E402
+from tests.helpers import FakeSheetsService, make_attendance, make_member, public  # noqa: E402
+
+@pytest.fixture(params=['sheets', 'mongo', 'sqlite'])
+def storage(request, tmp_path):
+    if request.param == 'sheets':
+        return SheetsStorage(FakeSheetsService())
+    if request.param == 'sqlite':
+        return SQLiteStorage(str(tmp_path / 'asistencia.sqlite3'))
+    mongomock = pytest.importorskip('mongomock')
+    return MongoStorage(mongomock.MongoClient()['test_asistencia'])
+
+# Conformance
+
+def test_empty_tables(storage):
+    for table in ('Miembros', 'Amigos', 'Asistencia'):
+        assert storage.read_all(table) == []
+
+def test_insert_then_read_preserves_fields_and_order(storage):
+    members = [make_member(nombre=f'Persona {i}') for i in range(5)]
+    for member in members:
+        storage.insert('Miembros', member)
+    assert [public(r) for r in storage.read_all('Miembros')] == members
+
+def test_insert_returns_a_record_usable_for_update_and_delete(storage):
+    stored = storage.insert('Amigos', {'id': 'f1', 'nombre': 'Ana', 'de_donde_viene': 'Bridgeport', 'fecha_registro': ''})
+    updated = storage.update('Amigos', stored, {**public(stored), 'nombre': 'Ana María'})
+    assert public(updated)['nombre'] == 'Ana María'
+    storage.delete('Amigos', updated, '2026-01-04T12:00:00-05:00')
+    assert storage.read_all('Amigos') == []
+
+def test_update_changes_only_the_target_record(storage):
+    first = storage.insert('Miembros', make_member(id='m1'))
+    storage.insert('Miembros', make_member(id='m2'))
+    storage.update('Miembros', first, make_member(id='m1', telefono='2035559999'))
+    by_id = {r['id']: r for r in storage.read_all('Miembros')}
+    assert str(by_id['m1']['telefono']) == '2035559999'
+    assert str(by_id['m2']['telefono']) == '2035550101'
+    assert [r['id'] for r in storage.read_all('Miembros')] == ['m1', 'm2']
+
+def test_delete_hides_the_record_and_keeps_others_addressable(storage):
+    stored = [storage.insert('Miembros', make_member(id=f'm{i}')) for i in range(4)]
+    storage.delete('Miembros', stored[1], '2026-01-04T12:00:00-05:00')
+    live = storage.read_all('Miembros')
+    assert [r['id'] for r in live] == ['m0', 'm2', 'm3']
+    # Records read after the delete can still be updated in place
+    target = next(r for r in live if r['id'] == 'm3')
+    storage.update('Miembros', target, make_member(id='m3', nombre='Última'))
+    assert {r['id']: r['nombre'] for r in storage.read_all('Miembros')}['m3'] == 'Última'
+
+def test_compact_keeps_live_records(storage):
+    stored = [storage.insert('Amigos', {'id': f'f{i}', 'nombre': f'Amigo {i}', 'de_donde_viene': '', 'fecha_registro': ''}) for i in range(3)]
+    storage.delete('Amigos', stored[0], '2026-01-04T12:00:00-05:00')
+    result = storage.compact('Amigos')
+    assert result['success']
+    assert [r['id'] for r in storage.read_all('Amigos')] == ['f1', 'f2']
+
+def test_attendance_round_trip(storage):
+    record = make_attendance('m1', '2026-01-04')
+    stored = storage.insert('Asistencia', record)
+    storage.update('Asistencia', stored, {**record, 'presente': 'FALSE'})
+    [row] = storage.read_all('Asistencia')
+    assert row['presente'] == 'FALSE'
+    assert row['fecha'] == '2026-01-04'
+
+def test_read_many_matches_read_all(storage):
+    stored = [storage.insert('Miembros', make_member(id=f'm{i}')) for i in range(3)]
+    storage.delete('Miembros', stored[0], '2026-01-04T12:00:00-05:00')
+    storage.insert('Asistencia', make_attendance('m1', '2026-01-04'))
+    tables = ['Miembros', 'Amigos', 'Asistencia']
+    assert storage.read_many(tables) == {table: storage.read_all(table) for table in tables}
+
+def test_read_tail_returns_new_records_or_none(storage):
+    storage.insert('Asistencia', make_attendance('m1', '2026-01-04'))
+    cached = storage.read_all('Asistencia')
+    added = [make_attendance('m2', '2026-01-11'), make_attendance('m3', '2026-01-11')]
+    for record in added:
+        storage.insert('Asistencia', record)
+    tail = storage.read_tail('Asistencia', cached)
+    if storage.name == 'sheets':
+        assert [public(r) for r in tail] == added
+    else:
+        # Only the Sheets backend reads tails; the others are cheap to reread
+        assert tail is None
+
+def test_insert_many_returns_records_usable_for_update(storage):
+    storage.insert('Miembros', make_member(id='m0'))
+    stored = storage.insert_many('Miembros', [make_member(id=f'm{i}') for i in range(1, 4)])
+    storage.update('Miembros', stored[1], make_member(id='m2', nombre='Dos'))
+    assert [(r['id'], r['nombre']) for r in storage.read_all('Miembros')] == [
+        ('m0', 'José'), ('m1', 'José'), ('m2', 'Dos'), ('m3', 'José')
+    ]
+
+def test_batch_update_and_delete(storage):
+    members = storage.insert_many('Miembros', [make_member(id=f'm{i}') for i in range(5)])
+    storage.update_many('Miembros', [(members[1], make_member(id='m1', nombre='Uno')), (members[3], make_member(id='m3', nombre='Tres'))])
+    assert storage.delete_many('Miembros', [members[0], members[2]], '2026-01-04T12:00:00-05:00') is False
+    assert [(r['id'], r['nombre']) for r in storage.read_all('Miembros')] == [('m1', 'Uno'), ('m3', 'Tres'), ('m4', 'José')]
+
+    attendance = storage.insert_many('Asistencia', [make_attendance(f'm{i}', '2026-01-04') for i in range(4)])
+    shifted = storage.delete_many('Asistencia', [attendance[2], attendance[0]], '2026-01-04T12:00:00-05:00')
+    remaining = storage.read_all('Asistencia')
+    assert [r['person_id'] for r in remaining] == ['m1', 'm3']
+    if not shifted:
+        # Records read before the delete are still addressable
+        storage.update('Asistencia', attendance[3], {**public(attendance[3]), 'presente': 'FALSE'})
+        assert storage.read_all('Asistencia')[1]['presente'] == 'FALSE'
+
+def test_sheets_batches_are_one_request_each():
+    service = FakeSheetsService()
+    sheets = SheetsStorage(service)
+    members = sheets.insert_many('Miembros', [make_member(id=f'm{i}') for i in range(10)])
+    attendance = sheets.insert_many('Asistencia', [make_attendance(f'm{i}', '2026-01-04') for i in range(10)])
+    service.calls = 0
+    sheets.update_many('Miembros', [(m, {**public(m), 'nombre': 'X'}) for m in members])
+    sheets.delete_many('Miembros', members[:5], '2026-01-04T12:00:00-05:00')
+    assert sheets.delete_many('Asistencia', attendance[1::2], '2026-01-04T12:00:00-05:00') is True
+    # Each batch: one read checking the target rows still hold those ids, then one write
+    assert service.calls == 6
+    assert [r['person_id'] for r in sheets.read_all('Asistencia')] == ['m0', 'm2', 'm4', 'm6', 'm8']
+
+def test_sheets_insert_many_is_one_write():
+    service = FakeSheetsService()
+    SheetsStorage(service).insert_many('Amigos', [{'id': f'f{i}', 'nombre': 'Ana'} for i in range(50)])
+    assert service.calls == 1
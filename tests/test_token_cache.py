@@ -0,0 +1,65 @@
+"""Verified-token cache: hits, expiry, eviction and skipping repeated signature checks"""
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import jwt
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import token_cache  # noqa: E402
+from token_cache import TokenCache  # noqa: E402
+
+SECRET_KEY = 'test-secret'
+
+def make_token(username, expires_in=3600):
+    exp = int(time.time()) + expires_in
+    return jwt.encode({'sub': username, 'exp': exp}, SECRET_KEY, algorithm='HS256'), exp
+
+def authenticate(cache, token):
+    """Same lookup order as server.get_current_user"""
+    username = cache.get(token)
+    if username is not None:
+        return username
+    payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+    cache.put(token, payload['sub'], payload['exp'])
+    return payload['sub']
+
+def test_hit_after_first_verification():
+    cache = TokenCache()
+    token, _ = make_token('admin')
+    assert authenticate(cache, token) == 'admin'
+    assert authenticate(cache, token) == 'admin'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_expired_entries_are_not_served(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(token_cache, 'time', SimpleNamespace(time=lambda: now[0]))
+    cache = TokenCache()
+    cache.put('tok', 'admin', 1060.0)
+    assert cache.get('tok') == 'admin'
+    now[0] = 1060.0
+    assert cache.get('tok') is None
+    assert 'tok' not in cache.entries
+
+def test_least_recently_used_is_evicted():
+    cache = TokenCache(max_size=2)
+    expires_at = time.time() + 60
+    cache.put('a', 'ana', expires_at)
+    cache.put('b', 'beto', expires_at)
+    cache.get('a')
+    cache.put('c', 'carla', expires_at)
+    assert list(cache.entries) == ['a', 'c']
+
+def test_cached_requests_skip_signature_checks(monkeypatch):
+    tokens = [make_token(f'user{i}')[0] for i in range(20)]
+    decoded = []
+    decode = jwt.decode
+    monkeypatch.setattr(jwt, 'decode', lambda *args, **kwargs: decoded.append(args[0]) or decode(*args, **kwargs))
+    cache = TokenCache()
+    for i in range(1000):
+        assert authenticate(cache, tokens[i % len(tokens)]) == f'user{i % len(tokens)}'
+    # One jwt.decode per distinct token, however many requests carry it
+    assert sorted(decoded) == sorted(tokens)
+    assert (cache.hits, cache.misses) == (1000 - len(tokens), len(tokens))
@@ -0,0 +1,79 @@
+"""User cache over a unique-indexed users collection (mongomock behind a minimal async wrapper)"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from user_store import UserStore, UsernameTaken  # noqa: E402
+
+class AsyncCollection:
+    """The few motor collection methods UserStore uses, over a synchronous collection"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.queries = 0
+
+    async def create_index(self, *args, **kwargs):
+        return self.collection.create_index(*args, **kwargs)
+
+    async def find_one(self, *args, **kwargs):
+        self.queries += 1
+        return self.collection.find_one(*args, **kwargs)
+
+    async def insert_one(self, doc):
+        return self.collection.insert_one(doc)
+
+@pytest.fixture
+def users():
+    mongomock = pytest.importorskip('mongomock')
+    collection = AsyncCollection(mongomock.MongoClient()['test_asistencia']['users'])
+    store = UserStore(collection)
+    asyncio.run(store.ensure_indexes())
+    return collection, store
+
+def test_repeat_lookups_are_served_from_cache(users):
+    collection, store = users
+    asyncio.run(store.create({'username': 'admin', 'password': 'hash'}))
+    for _ in range(3):
+        assert asyncio.run(store.get('admin'))['password'] == 'hash'
+    assert collection.queries == 0
+    store.invalidate('admin')
+    assert asyncio.run(store.get('admin'))['username'] == 'admin'
+    assert collection.queries == 1
+
+def test_duplicate_username_is_rejected_by_the_index(users):
+    _, store = users
+    asyncio.run(store.create({'username': 'admin', 'password': 'a'}))
+    with pytest.raises(UsernameTaken):
+        asyncio.run(store.create({'username': 'admin', 'password': 'b'}))
+    assert asyncio.run(store.get('admin'))['password'] == 'a'
+
+def test_missing_users_are_not_cached(users):
+    collection, store = users
+    assert asyncio.run(store.get('nadie')) is None
+    collection.collection.insert_one({'username': 'nadie', 'password': 'x'})
+    assert asyncio.run(store.get('nadie'))['password'] == 'x'
+
+def test_duplicates_are_checked_while_the_index_is_missing(users):
+    collection, _ = users
+
+    async def unavailable(*args, **kwargs):
+        raise RuntimeError("index build failed")
+
+    collection.create_index = unavailable
+    store = UserStore(collection)
+    with pytest.raises(RuntimeError):
+        asyncio.run(store.ensure_indexes())
+    collection.collection.drop_indexes()
+    asyncio.run(store.create({'username': 'admin', 'password': 'a'}))
+    with pytest.raises(UsernameTaken):
+        asyncio.run(store.create({'username': 'admin', 'password': 'b'}))
+    assert collection.collection.count_documents({'username': 'admin'}) == 1
+    assert not store.unique_index
+    # Once the index can be built, registration relies on it again
+    del collection.create_index
+    asyncio.run(store.create({'username': 'beto', 'password': 'c'}))
+    assert store.unique_index
@@ -0,0 +1,66 @@
+"""Read-your-writes: data version tokens handed out after writes"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from shared_cache import SharedCacheStore  # noqa: E402
+from sheets_cache import SheetsCache  # noqa: E402
+
+def test_write_token_is_satisfied_by_the_cache_that_took_the_write():
+    cache = SheetsCache()
+    cache.set('Asistencia', [{'id': 'a1'}])
+    before = cache.version_token('Asistencia')
+    cache.append_record('Asistencia', {'id': 'a2'})
+    token = cache.version_token('Asistencia')
+    assert token != before
+    assert cache.is_fresh('Asistencia', token)
+    assert cache.is_fresh('Asistencia', before)
+    assert cache.is_fresh('Asistencia', None)
+
+def test_newer_or_foreign_tokens_are_not_satisfied():
+    cache, other = SheetsCache(), SheetsCache()
+    cache.set('Asistencia', [])
+    other.set('Asistencia', [])
+    other.append_record('Asistencia', {'id': 'a1'})
+    # Another process without a shared store: its versions mean nothing here
+    assert not cache.is_fresh('Asistencia', other.version_token('Asistencia'))
+    epoch_version = cache.version_token('Asistencia').rsplit(':', 1)[0]
+    assert not cache.is_fresh('Asistencia', f'{epoch_version}:99')
+    assert not cache.is_fresh('Asistencia', 'garbage')
+    # A write to another table says nothing about this one
+    assert cache.is_fresh('Asistencia', other.version_token('Miembros'))
+
+def test_dropped_entry_is_never_fresh():
+    cache = SheetsCache()
+    cache.set('Asistencia', [])
+    token = cache.version_token('Asistencia')
+    cache.invalidate('Asistencia')
+    assert not cache.is_fresh('Asistencia', token)
+    cache.set('Asistencia', [])
+    assert cache.is_fresh('Asistencia', token)
+
+def test_tokens_cross_workers_through_the_shared_store(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    writer = SheetsCache(store=SharedCacheStore(path))
+    reader = SheetsCache(store=SharedCacheStore(path))
+    writer.set('Asistencia', [{'id': 'a1'}])
+    assert reader.get('Asistencia') == [{'id': 'a1'}]
+    writer.append_record('Asistencia', {'id': 'a2'})
+    token = writer.version_token('Asistencia')
+    assert not reader.is_fresh('Asistencia', token)
+    # The reader syncs on its next lookup and then holds the write
+    assert reader.get('Asistencia') == [{'id': 'a1'}, {'id': 'a2'}]
+    assert reader.is_fresh('Asistencia', token)
+
+def test_empty_tail_keeps_the_version(tmp_path):
+    for cache in (SheetsCache(), SheetsCache(store=SharedCacheStore(str(tmp_path / 'cache.sqlite3')))):
+        cache.set('Asistencia', [{'id': 'a1', '_row': 2}])
+        token = cache.version_token('Asistencia')
+        assert cache.refresh_tail('Asistencia', lambda current: [])
+        # A row read both ways (appended here after the tail was read) is not new either
+        assert cache.refresh_tail('Asistencia', lambda current: [{'id': 'a1', '_row': 2}])
+        assert cache.version_token('Asistencia') == token
+        assert cache.get('Asistencia') == [{'id': 'a1', '_row': 2}]
+        assert cache.refresh_tail('Asistencia', lambda current: [{'id': 'a2', '_row': 3}])
+        assert cache.version_token('Asistencia') != token
@@ -0,0 +1,63 @@
+"""Service windows: parsing, when warming runs and when it next starts"""
+import asyncio
+import sys
+from datetime import datetime, time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from sheets_cache import SheetsCache  # noqa: E402
+from warmup_schedule import WarmupSchedule, parse_windows  # noqa: E402
+
+def test_parse_windows():
+    assert parse_windows('sun 09:00-13:00, Wednesday 18:30-21:00') == [(6, time(9), time(13)), (2, time(18, 30), time(21))]
+    assert parse_windows('') == []
+    with pytest.raises(ValueError):
+        parse_windows('sun 13:00-09:00')
+    with pytest.raises(ValueError):
+        parse_windows('xyz 09:00-10:00')
+
+def test_warming_starts_lead_minutes_before_a_window_and_ends_with_it():
+    schedule = WarmupSchedule(parse_windows('sun 09:00-13:00, wed 18:30-21:00'), lead_minutes=15)
+    # 2026-10-18 is a Sunday
+    assert not schedule.warming(datetime(2026, 10, 18, 8, 44))
+    assert schedule.warming(datetime(2026, 10, 18, 8, 45))
+    assert schedule.warming(datetime(2026, 10, 18, 12, 59))
+    assert not schedule.warming(datetime(2026, 10, 18, 13, 0))
+    assert schedule.next_warmup(datetime(2026, 10, 18, 13, 0)) == datetime(2026, 10, 21, 18, 15)
+    assert schedule.next_warmup(datetime(2026, 10, 22, 7, 0)) == datetime(2026, 10, 25, 8, 45)
+    assert schedule.next_warmup(datetime(2026, 10, 18, 10, 0)) == datetime(2026, 10, 18, 10, 0)
+
+def test_lead_time_can_start_the_day_before():
+    schedule = WarmupSchedule(parse_windows('mon 00:10-02:00'), lead_minutes=30)
+    assert schedule.warming(datetime(2026, 10, 18, 23, 45))
+    assert schedule.next_warmup(datetime(2026, 10, 18, 23, 0)) == datetime(2026, 10, 18, 23, 40)
+
+def test_run_warms_only_inside_windows_and_survives_errors(monkeypatch):
+    clock = iter([datetime(2026, 10, 18, 8, 0), datetime(2026, 10, 18, 9, 0), datetime(2026, 10, 18, 9, 1)])
+    sleeps, calls = [], []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 3:
+            raise asyncio.CancelledError
+
+    async def warm():
+        calls.append(1)
+        raise RuntimeError("quota")
+
+    monkeypatch.setattr(asyncio, 'sleep', fake_sleep)
+    schedule = WarmupSchedule(parse_windows('sun 09:00-13:00'), lead_minutes=15)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(schedule.run(warm, 30, lambda: next(clock)))
+    assert sleeps == [45 * 60, 30, 30]
+    assert len(calls) == 2
+
+def test_expires_within():
+    cache = SheetsCache(cache_duration_seconds=60)
+    assert cache.expires_within('Miembros', 0)
+    cache.set('Miembros', [{'id': '1'}])
+    assert not cache.expires_within('Miembros', 30)
+    assert cache.expires_within('Miembros', 60)